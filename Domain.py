@@ -12,21 +12,28 @@
 /*     http://www.comdyn.cn/                                                 */
 /*****************************************************************************/
 """
-from utils.Singleton import Singleton
 from utils.Outputter import COutputter
 from element.Node import CNode
 from LoadCaseData import CLoadCaseData
 from element.ElementGroup import CElementGroup
 from utils.SkylineMatrix import CSkylineMatrix
+from utils.SparseMatrix import CSparseMatrix
+from utils.ElementOperator import CElementOperator
+from utils.ParallelAssembly import CParallelAssembler
+from utils.Reordering import NodalGraph, ReverseCuthillMcKee, RenumberEquations
+from utils.BlockReader import ReadBlock, CheckOrder
+from utils.ModelCache import CModelCache
+from utils.ResourceEstimator import CResourceEstimate
+from utils.Profiler import CProfiler
+from utils.Options import StorageSchemes
 import numpy as np
 import sys
 
 
-@Singleton
 class Domain(object):
 	"""
 	Domain class : Define the problem domain
-	Only a single instance of Domain class can be created
+	Each instance holds an independent model, with its own outputter
 	"""
 	def __init__(self):
 		super().__init__()
@@ -34,6 +41,10 @@ class Domain(object):
 		# Input file stream for reading data from input data file
 		self.input_file = None
 
+		# Outputter of the domain (COutputter), created by ReadData
+		# if it has not been set
+		self.Output = None
+
 		# Heading information for use in labeling the output
 		self.Title = '0'
 
@@ -48,6 +59,13 @@ class Domain(object):
 		# List of all nodes in the domain
 		self.NodeList = []
 
+		# Coordinates of all nodes, (NUMNP, 3)
+		self.XYZ = None
+
+		# Boundary codes / equation numbers of all nodes, (NUMNP, NDF)
+		# (The XYZ and bcode of each node in NodeList are views of their rows)
+		self.bcode = None
+
 		# Total number of element groups
 		self.NUMEG = 0
 
@@ -66,7 +84,8 @@ class Domain(object):
 		# Total number of equations in the system
 		self.NEQ = 0
 
-		# Global nodal force/displacement vector
+		# Global nodal force/displacement vectors of all load cases,
+		# an NEQ x NLCASE matrix whose column lcase holds load case lcase+1
 		self.Force = None
 
 		# Banded stiffness matrix
@@ -74,6 +93,33 @@ class Domain(object):
 		# skyline of the global stiffness matrix.
 		self.StiffnessMatrix = None
 
+		# Equation renumbering method applied before allocating the
+		# stiffness matrix (see utils.Reordering.ReorderingMethods)
+		self.Reordering = 'none'
+
+		# (NWK, MK) of the stiffness matrix in input node order,
+		# recorded when the equations are renumbered
+		self.ProfileBeforeReordering = None
+
+		# Storage scheme of the stiffness matrix (see StorageSchemes)
+		self.Storage = 'skyline'
+
+		# True if the skyline is factorized in single precision and the
+		# solution refined (see solver.MixedPrecisionSolver)
+		self.MixedPrecision = False
+
+		# Predicted cost of the skyline solution (CResourceEstimate),
+		# calculated when the skyline is allocated
+		self.Estimate = None
+
+		# Stresses of all elements for all load cases,
+		# one (NUME, NLCASE) array for each element group
+		self.ElementStresses = []
+
+		# Profiler timing the phases of the element groups (see
+		# utils.Profiler)
+		self.Profiler = CProfiler()
+
 	def GetMODEX(self):
 		return self.MODEX
 
@@ -89,6 +135,12 @@ class Domain(object):
 	def GetNodeList(self):
 		return self.NodeList
 
+	def GetXYZ(self):
+		return self.XYZ
+
+	def GetBCode(self):
+		return self.bcode
+
 	def GetNUMEG(self):
 		return self.NUMEG
 
@@ -98,8 +150,11 @@ class Domain(object):
 	def GetForce(self):
 		return self.Force
 
-	def GetDisplacement(self):
-		return self.Force
+	def GetDisplacement(self, lcase=None):
+		""" Return displacements of all load cases, or of load case lcase+1 """
+		if lcase is None:
+			return self.Force
+		return self.Force[:, lcase]
 
 	def GetNLCASE(self):
 		return self.NLCASE
@@ -113,15 +168,78 @@ class Domain(object):
 	def GetStiffnessMatrix(self):
 		return self.StiffnessMatrix
 
-	def ReadData(self, input_filename, output_filename):
-		""" Read domain data from the input data file """
+	def GetElementStresses(self):
+		return self.ElementStresses
+
+	def GetReordering(self):
+		return self.Reordering
+
+	def GetStorage(self):
+		return self.Storage
+
+	def GetMixedPrecision(self):
+		return self.MixedPrecision
+
+	def GetProfileBeforeReordering(self):
+		return self.ProfileBeforeReordering
+
+	def GetEstimate(self):
+		return self.Estimate
+
+	def GetOutputter(self):
+		return self.Output
+
+	def SetOutputter(self, Output):
+		self.Output = Output
+
+	def GetProfiler(self):
+		return self.Profiler
+
+	def SetProfiler(self, Profiler):
+		self.Profiler = Profiler
+
+	def ModelSize(self):
+		""" Return the memory in bytes of the nodal and element data """
+		size = self.XYZ.nbytes + self.bcode.nbytes
+		for ElementGrp in self.EleGrpList:
+			size += ElementGrp.GetConnectivity().nbytes + ElementGrp.GetMaterialIndex().nbytes \
+					+ ElementGrp.GetLocationMatrices().nbytes
+
+		return size
+
+	def ReadData(self, input_filename, output_filename, UseCache=False):
+		"""
+		Read domain data from the input data file
+
+		:param UseCache: (bool) define the domain from the binary model cache
+			of the input file (see utils.ModelCache) if it is up to date,
+			otherwise parse the input file and rebuild the cache
+		"""
 		try:
 			self.input_file = open(input_filename)
 		except FileNotFoundError as e:
 			print(e)
 			sys.exit(3)
 
-		Output = COutputter(output_filename)
+		if self.Output is None:
+			self.Output = COutputter(self, output_filename)
+		Output = self.Output
+
+		if UseCache:
+			cache = CModelCache(input_filename)
+			if cache.Load(self):
+				self.input_file.close()
+
+				Output.OutputHeading()
+				Output.OutputNodeInfo()
+
+				self.CalculateEquationNumber()
+				Output.OutputEquationNumber()
+
+				Output.OutputLoadInfo()
+				Output.OutputElementInfo()
+
+				return True
 
 		# Read the heading line
 		self.Title = self.input_file.readline()
@@ -140,6 +258,10 @@ class Domain(object):
 		else:
 			return False
 
+		# Boundary codes as inputted, stored in the model cache
+		if UseCache:
+			bcode = self.bcode.copy()
+
 		# Update equation number
 		self.CalculateEquationNumber()
 		Output.OutputEquationNumber()
@@ -156,18 +278,28 @@ class Domain(object):
 		else:
 			return False
 
+		if UseCache:
+			cache.Save(self, bcode)
+
 		return True
 
 	def ReadNodalPoints(self):
-		""" Read nodal point data """
-		self.NodeList = [CNode() for _ in range(self.NUMNP)]
+		""" Read nodal point data as one block """
+		try:
+			block = ReadBlock(self.input_file, self.NUMNP, 7, "nodal point")
+			CheckOrder(block[:, 0],
+					   "\n*** Error *** Nodes must be inputted in order !"
+					   "\n   Expected node number : {}"
+					   "\n   Provided node number : {}")
+		except ValueError as e:
+			print(e)
+			return False
 
-		for np in range(self.NUMNP):
-			try:
-				self.NodeList[np].Read(self.input_file, np)
-			except ValueError as e:
-				print(e)
-				return False
+		self.bcode = block[:, 1:4].astype(np.int64)
+		self.XYZ = block[:, 4:7].copy()
+
+		self.NodeList = [CNode.View(XYZ, bcode, N + 1)
+						 for N, (XYZ, bcode) in enumerate(zip(self.XYZ, self.bcode))]
 
 		return True
 
@@ -176,15 +308,28 @@ class Domain(object):
 		Calculate global equation numbers corresponding to every
 		degree of freedom of each node
 		"""
-		self.NEQ = 0
+		active = self.bcode == 0
+		self.NEQ = int(np.count_nonzero(active))
+
+		self.bcode[:] = 0
+		self.bcode[active] = np.arange(1, self.NEQ + 1)
+
+	def ReorderEquations(self, method):
+		"""
+		Renumber the equations to reduce the profile of the stiffness
+		matrix. The nodal graph is built from the element connectivity,
+		so nodal data and results keep the original node numbering.
+		"""
+		if method == 'rcm':
+			Connectivity = [ElementGrp.GetConnectivity() for ElementGrp in self.EleGrpList]
+			order = ReverseCuthillMcKee(*NodalGraph(self.NUMNP, Connectivity))
+		else:
+			error_info = "\n*** Error *** Equation renumbering method {} " \
+						 "is not available.".format(method)
+			raise ValueError(error_info)
 
-		for np in range(self.NUMNP):
-			for dof in range(CNode.NDF):
-				if self.NodeList[np].bcode[dof]:
-					self.NodeList[np].bcode[dof] = 0
-				else:
-					self.NEQ += 1
-					self.NodeList[np].bcode[dof] = self.NEQ
+		equation_map = RenumberEquations(self.bcode, order)
+		self.bcode[:] = equation_map[self.bcode]
 
 	def ReadLoadCases(self):
 		""" Read load case data """
@@ -201,7 +346,8 @@ class Domain(object):
 
 	def ReadElements(self):
 		""" Read element data """
-		self.EleGrpList = [CElementGroup() for _ in range(self.NUMEG)]
+		self.EleGrpList = [CElementGroup(self.NodeList, self.XYZ, self.bcode)
+						   for _ in range(self.NUMEG)]
 
 		for EleGrp in range(self.NUMEG):
 			if not self.EleGrpList[EleGrp].Read(self.input_file):
@@ -211,74 +357,224 @@ class Domain(object):
 
 	def CalculateColumnHeights(self):
 		""" Calculate column heights """
-		for EleGrp in range(self.NUMEG):
-			ElementGrp = self.EleGrpList[EleGrp]
-			NUME = ElementGrp.GetNUME()
+		LocationMatrices = []
+		for ElementGrp in self.EleGrpList:
+			ElementGrp.GenerateLocationMatrices()
+			LocationMatrices.append(ElementGrp.GetLocationMatrices())
 
-			for Ele in range(NUME):
-				Element = ElementGrp[Ele]
+		self.StiffnessMatrix.CalculateColumnHeights(LocationMatrices)
+		self.StiffnessMatrix.CalculateMaximumHalfBandwidth()
 
-				Element.GenerateLocationMatrix()
+	def RestoreMatrices(self, StiffnessMatrix, bcode, Reordering='none',
+						ProfileBeforeReordering=None):
+		"""
+		Allocate the Force and use an already factorized skyline stiffness
+		matrix (see utils.FactorCache) instead of AllocateMatrices
 
-				self.StiffnessMatrix.CalculateColumnHeight(
-					Element.GetLocationMatrix(), Element.GetND())
+		:param bcode: (np.ndarray) (NUMNP, 3) equation numbers of StiffnessMatrix
+		"""
+		self.Force = np.zeros((self.NEQ, self.NLCASE), dtype=np.double)
 
-		self.StiffnessMatrix.CalculateMaximumHalfBandwidth()
+		self.Reordering = Reordering
+		self.ProfileBeforeReordering = ProfileBeforeReordering
+		self.Storage = 'skyline'
+		self.MixedPrecision = False
+		self.Estimate = None
+
+		self.bcode[:] = bcode
+		for ElementGrp in self.EleGrpList:
+			ElementGrp.GenerateLocationMatrices()
+
+		self.StiffnessMatrix = StiffnessMatrix
+
+		Output = self.Output
+		Output.OutputTotalSystemData()
+
+	def CheckMemoryBudget(self, MemoryBudget, BudgetAction, BlockSize):
+		"""
+		Check the predicted peak memory of the skyline solution against
+		MemoryBudget bytes. Beyond it, the in core skyline is switched to
+		the out of core skyline if BudgetAction is 'outofcore' and it fits
+		the budget, otherwise the solution is aborted.
+		"""
+		Peak = self.Estimate.PeakMemory(self.Storage, BlockSize, self.MixedPrecision)
+		if Peak <= MemoryBudget:
+			return
+
+		if BudgetAction == 'outofcore' and self.Storage == 'skyline':
+			Peak = self.Estimate.PeakMemory('outofcore', BlockSize)
+			if Peak <= MemoryBudget:
+				self.Storage = 'outofcore'
+				return
+
+		error_info = "\n*** Error *** Predicted peak memory exceeds the memory budget !" \
+					 "\n    Predicted peak memory (MB) = {:.3f}" \
+					 "\n    Memory budget (MB) = {:.3f}".format(Peak/2**20, MemoryBudget/2**20)
+		raise ValueError(error_info)
+
+	def AssembleStiffnessMatrix(self, Workers=1):
+		"""
+		Assemble the banded gloabl stiffness matrix
+
+		:param Workers: (int) number of worker processes scatter-adding the
+			elements into the stiffness matrix in shared memory
+			(see utils.ParallelAssembly), in core skyline storage only
+		"""
+		if Workers > 1 and self.Storage == 'skyline':
+			with CParallelAssembler(self.StiffnessMatrix, Workers) as Assembler:
+				for EleGrp, ElementGrp in enumerate(self.EleGrpList):
+					with self.Profiler.Phase("element group %d"%(EleGrp + 1)):
+						self.Profiler.Count("elements", ElementGrp.GetNUME())
+
+						Assembler.AssembleGroup(ElementGrp)
+			return
 
-	def AssembleStiffnessMatrix(self):
-		""" Assemble the banded gloabl stiffness matrix """
 		# Loop over for all element groups
 		for EleGrp in range(self.NUMEG):
 			ElementGrp = self.EleGrpList[EleGrp]
-			NUME = ElementGrp.GetNUME()
-			size = ElementGrp[0].SizeOfStiffnessMatrix()
-			Matrix = np.zeros(size, dtype=np.double)
 
-			# Loop over for all elements in group EleGrp
-			for Ele in range(NUME):
-				Element = ElementGrp[Ele]
-				Element.ElementStiffness(Matrix)
-				self.StiffnessMatrix.Assembly(Matrix,
-					Element.GetLocationMatrix(), Element.GetND())
+			with self.Profiler.Phase("element group %d"%(EleGrp + 1)):
+				self.Profiler.Count("elements", ElementGrp.GetNUME())
 
-			del Matrix
+				# Packed stiffness matrices of all elements in group EleGrp
+				Matrices = ElementGrp.ElementStiffness()
+
+				# Scatter-add the whole group into the skyline through the
+				# addresses of all packed entries in the banded matrix
+				ScatterIndex = self.StiffnessMatrix.ScatterIndex(
+					ElementGrp.GetLocationMatrices())
+				self.StiffnessMatrix.AssembleGroup(Matrices, ScatterIndex)
+
+				del Matrices, ScatterIndex
+
+	def CalculateElementStresses(self):
+		""" Calculate stresses of all elements for all load cases """
+		self.ElementStresses = []
+		for EleGrp, ElementGrp in enumerate(self.EleGrpList):
+			with self.Profiler.Phase("element group %d"%(EleGrp + 1)):
+				self.Profiler.Count("elements", ElementGrp.GetNUME())
+				self.ElementStresses.append(ElementGrp.ElementStress(self.Force))
 
 	def AssembleForce(self, LoadCase):
-		""" Assemble the global nodal force vector for load case LoadCase """
+		"""
+		Assemble the global nodal force vector for load case LoadCase
+		into column LoadCase-1 of the force matrix
+		"""
 		if LoadCase > self.NLCASE:
 			return False
 
-		LoadData = self.LoadCases[LoadCase - 1]
+		Force = self.Force[:, LoadCase - 1]
+		Force[:] = 0.0
+		self.AssembleLoadVector(self.LoadCases[LoadCase - 1], Force)
 
-		# Loop over for all concentrated loads in load case LoadCase
-		for lnum in range(LoadData.nloads):
-			dof = self.NodeList[LoadData.node[lnum]-1].bcode[LoadData.dof[lnum]-1]
+		return True
 
-			if dof:
-				self.Force[dof - 1] += LoadData.load[lnum]
+	def AssembleLoadVector(self, LoadData, Force):
+		"""
+		Add the concentrated loads of LoadData (CLoadCaseData) to the
+		nodal force vector Force of length NEQ
+		"""
+		# Equation numbers of all concentrated loads in the load case
+		dof = self.bcode[LoadData.node - 1, LoadData.dof - 1]
+		active = dof > 0
 
-		return True
+		np.add.at(Force, dof[active] - 1, LoadData.load[active])
+
+	def AssembleForces(self):
+		""" Assemble the NEQ x NLCASE force matrix of all load cases """
+		for lcase in range(self.NLCASE):
+			self.AssembleForce(lcase + 1)
 
-	def AllocateMatrices(self):
+	def AllocateMatrices(self, Reordering='none', Storage='skyline',
+						 BlockSize=2**24, ScratchFolder=None,
+						 MemoryBudget=None, BudgetAction='abort', MixedPrecision=False):
 		"""
 		Allocate storage for matrices Force, ColumnHeights, DiagonalAddress
 		and StiffnessMatrix and calculate the column heights and address
 		of diagonal elements
+
+		:param Reordering: (str) equation renumbering method applied before
+			the skyline is allocated (see utils.Reordering.ReorderingMethods)
+		:param Storage: (str) storage scheme of the stiffness matrix,
+			'skyline' for CSkylineMatrix, 'sparse' for CSparseMatrix or
+			'ebe' for the matrix-free CElementOperator or 'outofcore' for
+			CSkylineMatrix memory-mapped to a scratch file
+		:param BlockSize: (int) maximum number of entries of the column
+			blocks of the out of core skyline
+		:param ScratchFolder: (str) folder of the scratch file of the out
+			of core skyline (default: the temporary folder)
+		:param MemoryBudget: (int) memory in bytes that the predicted peak
+			memory of the skyline solution must not exceed (default: none)
+		:param BudgetAction: (str) 'abort' or 'outofcore' to switch the
+			skyline storage to the out of core skyline if it fits the budget
+		:param MixedPrecision: (bool) True if the skyline is factorized by
+			the mixed precision solver, whose single precision copy and
+			refinement are included in the predicted peak memory
 		"""
-		# Allocate for global force/displacement vector
-		self.Force = np.zeros(self.NEQ, dtype=np.double)
+		# Allocate for global force/displacement vectors of all load cases
+		self.Force = np.zeros((self.NEQ, self.NLCASE), dtype=np.double)
+
+		self.Reordering = Reordering
+		self.Storage = Storage
+		self.MixedPrecision = MixedPrecision
+		self.Estimate = None
+		if Reordering != 'none':
+			# Skyline profile in input order
+			self.StiffnessMatrix = CSkylineMatrix(self.NEQ)
+			self.CalculateColumnHeights()
+			self.StiffnessMatrix.CalculateDiagnoalAddress()
+
+			self.ProfileBeforeReordering = (
+				self.StiffnessMatrix.size(),
+				self.StiffnessMatrix.GetMaximumHalfBandwidth())
+
+			# Renumber the equations
+			self.ReorderEquations(Reordering)
+
+		if Storage == 'sparse':
+			# Create the stiffness matrix in compressed sparse column storage
+			# and calculate its sparsity pattern
+			self.StiffnessMatrix = CSparseMatrix(self.NEQ)
+
+			LocationMatrices = []
+			for ElementGrp in self.EleGrpList:
+				ElementGrp.GenerateLocationMatrices()
+				LocationMatrices.append(ElementGrp.GetLocationMatrices())
+
+			self.StiffnessMatrix.CalculatePattern(LocationMatrices)
+		elif Storage == 'ebe':
+			# Create the matrix-free element by element stiffness operator
+			self.StiffnessMatrix = CElementOperator(self.NEQ, self.EleGrpList)
+
+			for ElementGrp in self.EleGrpList:
+				ElementGrp.GenerateLocationMatrices()
+
+			self.StiffnessMatrix.CalculateProfile()
+		else:
+			# Create the banded stiffness matrix
+			self.StiffnessMatrix = CSkylineMatrix(self.NEQ)
 
-		# Create the banded stiffness matrix
-		self.StiffnessMatrix = CSkylineMatrix(self.NEQ)
+			# Calculate column heights
+			self.CalculateColumnHeights()
 
-		# Calculate column heights
-		self.CalculateColumnHeights()
+			# Calculate address of diagonal elements in banded matrix
+			self.StiffnessMatrix.CalculateDiagnoalAddress()
 
-		# Calculate address of diagonal elements in banded matrix
-		self.StiffnessMatrix.CalculateDiagnoalAddress()
+			# Predict the cost of the solution from the column heights
+			self.Estimate = CResourceEstimate(
+				self.StiffnessMatrix.GetColumnHeights(), self.NLCASE,
+				[ElementGrp.GetLocationMatrices() for ElementGrp in self.EleGrpList],
+				self.ModelSize())
 
-		# Allocate for banded global stiffness matrix
-		self.StiffnessMatrix.Allocate()
+			if MemoryBudget is not None:
+				self.CheckMemoryBudget(MemoryBudget, BudgetAction, BlockSize)
+				Storage = self.Storage
+
+		# Allocate for global stiffness matrix
+		if Storage == 'outofcore':
+			self.StiffnessMatrix.Allocate(BlockSize, ScratchFolder)
+		else:
+			self.StiffnessMatrix.Allocate()
 
-		Output = COutputter()
+		Output = self.Output
 		Output.OutputTotalSystemData()
@@ -12,6 +12,7 @@
 /*     http://www.comdyn.cn/                                                 */
 /*****************************************************************************/
 """
+from utils.BlockReader import ReadBlock
 import numpy as np
 
 
@@ -25,8 +26,8 @@ class CLoadCaseData(object):
 
 	def Allocate(self, num):
 		self.nloads = num
-		self.node = np.zeros(num, dtype=np.int)
-		self.dof = np.zeros(num, dtype=np.int)
+		self.node = np.zeros(num, dtype=np.int64)
+		self.dof = np.zeros(num, dtype=np.int64)
 		self.load = np.zeros(num, dtype=np.double)
 
 	def Read(self, input_file, lcase):
@@ -37,10 +38,12 @@ class CLoadCaseData(object):
 		:param lcase: check index
 		:return: None
 		"""
-		line = input_file.readline().split()
-
-		LL = int(line[0])
-		NL = int(line[1])
+		try:
+			LL, NL = [int(field) for field in input_file.readline().split()]
+		except ValueError:
+			error_info = "\n*** Error *** Invalid load case !" \
+						 "\n   Expected load case {} and its number of loads".format(lcase + 1)
+			raise ValueError(error_info)
 
 		if LL != lcase + 1:
 			error_info = "\n*** Error *** Load case must be inputted in order !" \
@@ -48,24 +51,10 @@ class CLoadCaseData(object):
 						 "\n   Provided load case : {}".format(lcase + 1, LL)
 			raise ValueError(error_info)
 
-		self.Allocate(NL)
+		# Read the NL load lines as one block
+		block = ReadBlock(input_file, NL, 3, "load case {}".format(lcase + 1))
 
-		for i in range(NL):
-			line = input_file.readline().split()
-			self.node[i] = np.int(line[0])
-			self.dof[i] = np.int(line[1])
-			self.load[i] = np.double(line[2])
-
-	def Write(self, output_file, lcase):
-		"""
-		Write load case data to stream
-
-		:param output_file: (_io.TextIOWrapper) the object of output file
-		:param lcase: the index of load case
-		:return: None
-		"""
-		for i in range(self.nloads):
-			load_info = "%7d%13d%19.6e\n"%(self.node[i], self.dof[i],
-										   self.load[i])
-			print(load_info, end="")
-			output_file.write(load_info)
\ No newline at end of file
+		self.nloads = NL
+		self.node = block[:, 0].astype(np.int64)
+		self.dof = block[:, 1].astype(np.int64)
+		self.load = block[:, 2].copy()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+/*****************************************************************************/
+/*  STAPpy : A python FEM code sharing the same input data file with STAP90  */
+/*     Computational Dynamics Laboratory                                     */
+/*     School of Aerospace Engineering, Tsinghua University                  */
+/*                                                                           */
+/*     Created on Mon Jun 22, 2020                                           */
+/*                                                                           */
+/*     @author: thurcni@163.com, xzhang@tsinghua.edu.cn                      */
+/*     http://www.comdyn.cn/                                                 */
+/*****************************************************************************/
+"""
+from utils.BlockReader import ReadBlock, CheckOrder
+import numpy as np
+
+
+class CLoadCombinations(object):
+	"""
+	Class LoadCombinations superposes the solved basic load cases of the
+	domain with the coefficients of each load combination. The results of
+	the linear problem for combination c are sum_l(C[c, l] * result of load
+	case l+1), evaluated for all combinations with one matrix product.
+
+	Load combination file:
+		NCOMB						number of load combinations
+		ICOMB  C_1  C_2 ... C_NLCASE	one line for each combination, in order
+	"""
+	def __init__(self, ChunkSize=65536):
+		self.NCOMB = 0			#!< Number of load combinations
+		self.Coefficients = None	#!< (NCOMB, NLCASE) coefficients of the load cases
+
+		# Number of elements combined at a time by Envelope
+		self.ChunkSize = ChunkSize
+
+	def GetNCOMB(self):
+		return self.NCOMB
+
+	def GetCoefficients(self):
+		return self.Coefficients
+
+	def SetCoefficients(self, Coefficients):
+		self.Coefficients = np.atleast_2d(np.asarray(Coefficients, dtype=np.double))
+		self.NCOMB = self.Coefficients.shape[0]
+
+	def Read(self, input_file, NLCASE):
+		"""
+		Read the load combinations from stream Input
+
+		:param input_file: (_io.TextIOWrapper) the object of input file
+		:param NLCASE: (int) number of basic load cases of the domain
+		:return: None
+		"""
+		try:
+			NCOMB = int(input_file.readline().split()[0])
+		except (IndexError, ValueError):
+			NCOMB = 0
+
+		if NCOMB < 1:
+			error_info = "\n*** Error *** Invalid number of load combinations !" \
+						 "\n   Expected a positive number NCOMB on the first line"
+			raise ValueError(error_info)
+
+		block = ReadBlock(input_file, NCOMB, NLCASE + 1, "load combination")
+		CheckOrder(block[:, 0],
+				   "\n*** Error *** Load combinations must be inputted in order !"
+				   "\n   Expected load combination : {}"
+				   "\n   Provided load combination : {}")
+
+		self.SetCoefficients(block[:, 1:])
+
+	def Combine(self, Results):
+		"""
+		Superpose the results of the basic load cases
+
+		:param Results: (np.ndarray) (N, NLCASE) results, one load case per column
+		:return: (np.ndarray) (N, NCOMB) results, one combination per column
+		"""
+		return Results @ self.Coefficients.T
+
+	def Displacements(self, FEMData):
+		""" Return the (NEQ, NCOMB) displacements of all combinations """
+		return self.Combine(FEMData.GetDisplacement())
+
+	def ElementStresses(self, FEMData):
+		""" Return one (NUME, NCOMB) array of stresses for each element group """
+		return [self.Combine(stress) for stress in FEMData.GetElementStresses()]
+
+	def Envelope(self, Stresses):
+		"""
+		Return the envelope of the stresses of an element group over all
+		combinations, combining ChunkSize elements at a time
+
+		:param Stresses: (np.ndarray) (NUME, NLCASE) stresses of the load cases
+		:return: (max, combination of max, min, combination of min), arrays
+			of length NUME, the combinations numbered from 1
+		"""
+		NUME = Stresses.shape[0]
+		Max = np.empty(NUME, dtype=np.double)
+		Min = np.empty(NUME, dtype=np.double)
+		MaxCombination = np.empty(NUME, dtype=np.int64)
+		MinCombination = np.empty(NUME, dtype=np.int64)
+
+		for first in range(0, NUME, self.ChunkSize):
+			last = min(first + self.ChunkSize, NUME)
+			combined = self.Combine(Stresses[first:last])
+
+			MaxCombination[first:last] = combined.argmax(axis=1) + 1
+			MinCombination[first:last] = combined.argmin(axis=1) + 1
+			Max[first:last] = np.take_along_axis(
+				combined, MaxCombination[first:last, None] - 1, axis=1)[:, 0]
+			Min[first:last] = np.take_along_axis(
+				combined, MinCombination[first:last, None] - 1, axis=1)[:, 0]
+
+		return Max, MaxCombination, Min, MinCombination
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+/*****************************************************************************/
+/*  STAPpy : A python FEM code sharing the same input data file with STAP90  */
+/*     Computational Dynamics Laboratory                                     */
+/*     School of Aerospace Engineering, Tsinghua University                  */
+/*                                                                           */
+/*     Created on Mon Jun 22, 2020                                           */
+/*                                                                           */
+/*     @author: thurcni@163.com, xzhang@tsinghua.edu.cn                      */
+/*     http://www.comdyn.cn/                                                 */
+/*****************************************************************************/
+"""
+import sys
+sys.path.append('../')
+from LoadCaseData import CLoadCaseData
+from utils.Outputter import FormatTable
+import numpy as np
+
+
+def ReadLoadCases(input_file):
+	"""
+	Generator of the load cases of a load case file, in the load case
+	format of the input data file (LL NL, then NL lines of node, direction
+	and load), read one at a time up to the end of the file
+
+	:param input_file: (_io.TextIOWrapper) the object of load case file
+	:return: (CLoadCaseData) the load cases in turn
+	"""
+	lcase = 0
+	while True:
+		position = input_file.tell()
+		if not input_file.readline().strip():
+			return
+		input_file.seek(position)
+
+		LoadData = CLoadCaseData()
+		LoadData.Read(input_file, lcase)
+		lcase += 1
+
+		yield LoadData
+
+
+class CLoadSweep(object):
+	"""
+	Class LoadSweep solves a stream of load cases with the factorized
+	stiffness matrix, ChunkSize load cases at a time, and writes only the
+	selected displacements and element stresses of each load case to the
+	results file. The memory used does not depend on the number of load
+	cases, which can be checked with Check before the stiffness matrix is
+	factorized.
+	"""
+	def __init__(self, FEMData, DOFs=(), Elements=(), ChunkSize=256):
+		"""
+		:param FEMData: (Domain) the domain, with its equation numbers
+		:param DOFs: (node, direction) pairs of the displacements recorded,
+			numbering starting from 1
+		:param Elements: (group, element) pairs of the element stresses
+			recorded, numbering starting from 1
+		"""
+		self.FEMData = FEMData
+
+		# Solver holding the factorized stiffness matrix, given to Run
+		self.Solver = None
+		self.ChunkSize = ChunkSize
+
+		NUMNP = FEMData.GetNUMNP()
+		EleGrpList = FEMData.GetEleGrpList()
+
+		for node, direction in DOFs:
+			if not (1 <= node <= NUMNP and 1 <= direction <= 3):
+				error_info = "\n*** Error *** Invalid degree of freedom of the load sweep !" \
+							 "\n    Node = {}, direction = {}".format(node, direction)
+				raise ValueError(error_info)
+
+		for group, element in Elements:
+			if not (1 <= group <= len(EleGrpList) and
+					1 <= element <= EleGrpList[group - 1].GetNUME()):
+				error_info = "\n*** Error *** Invalid element of the load sweep !" \
+							 "\n    Element group = {}, element = {}".format(group, element)
+				raise ValueError(error_info)
+
+		self.DOFs = list(DOFs)
+		self.Elements = list(Elements)
+
+		# Equation numbers of the recorded displacements, 0 for fixed DOFs
+		self._equations = np.array([FEMData.GetBCode()[node - 1, direction - 1]
+									for node, direction in self.DOFs], dtype=np.int64)
+
+		# Indices of the recorded elements in each group (numbering
+		# starting from 0), and their columns in the results
+		self._groups = []
+		for group in sorted(set(group for group, _ in self.Elements)):
+			columns = [c for c, (g, _) in enumerate(self.Elements) if g == group]
+			indices = np.array([self.Elements[c][1] - 1 for c in columns], dtype=np.int64)
+			self._groups.append((EleGrpList[group - 1], indices,
+								 len(self.DOFs) + np.array(columns, dtype=np.int64)))
+
+		# Number of load cases solved
+		self.NLCASE = 0
+
+	def GetNLCASE(self):
+		return self.NLCASE
+
+	def Check(self, LoadCases):
+		"""
+		Read the load cases without solving them, and check that their
+		loads refer to existing nodes and directions
+
+		:param LoadCases: iterable of CLoadCaseData, e.g. ReadLoadCases
+		:return: (int) number of load cases
+		"""
+		NUMNP = self.FEMData.GetNUMNP()
+
+		NLCASE = 0
+		for LoadData in LoadCases:
+			NLCASE += 1
+
+			valid = (LoadData.node >= 1) & (LoadData.node <= NUMNP) & \
+					(LoadData.dof >= 1) & (LoadData.dof <= 3)
+			if not valid.all():
+				load = int(np.argmin(valid))
+				error_info = "\n*** Error *** Invalid load of the load sweep !" \
+							 "\n    Load case = {}, load = {}" \
+							 "\n    Node = {}, direction = {}".format(
+					NLCASE, load + 1, LoadData.node[load], LoadData.dof[load])
+				raise ValueError(error_info)
+
+		return NLCASE
+
+	def Run(self, Solver, LoadCases, output_file):
+		"""
+		Solve the load cases and write their results to output_file
+
+		:param Solver: solver holding the factorized stiffness matrix
+		:param LoadCases: iterable of CLoadCaseData, e.g. ReadLoadCases
+		:param output_file: (_io.TextIOWrapper) the object of results file
+		:return: (int) number of load cases solved
+		"""
+		self.Solver = Solver
+		self.WriteHeading(output_file)
+
+		self.NLCASE = 0
+		chunk = []
+		for LoadData in LoadCases:
+			chunk.append(LoadData)
+			if len(chunk) == self.ChunkSize:
+				self.WriteResults(output_file, self.Solve(chunk))
+				chunk = []
+
+		if chunk:
+			self.WriteResults(output_file, self.Solve(chunk))
+
+		return self.NLCASE
+
+	def Solve(self, chunk):
+		"""
+		Solve a chunk of load cases
+
+		:return: (np.ndarray) (len(chunk), len(DOFs) + len(Elements)) results
+		"""
+		Force = np.zeros((self.FEMData.GetNEQ(), len(chunk)), dtype=np.double)
+		for lcase, LoadData in enumerate(chunk):
+			self.FEMData.AssembleLoadVector(LoadData, Force[:, lcase])
+
+		self.Solver.BackSubstitution(Force)
+
+		results = np.zeros((len(chunk), len(self.DOFs) + len(self.Elements)))
+
+		# Displacements of the recorded DOFs, zero for fixed DOFs
+		free = self._equations > 0
+		results[:, :len(self.DOFs)][:, free] = Force[self._equations[free] - 1].T
+
+		for ElementGrp, indices, columns in self._groups:
+			results[:, columns] = ElementGrp.ElementStress(Force, indices).T
+
+		return results
+
+	def WriteHeading(self, output_file):
+		""" Write the labels of the columns of the results file """
+		labels = ["U(%d,%d)"%dof for dof in self.DOFs] + \
+				 ["S(%d,%d)"%element for element in self.Elements]
+
+		output_file.write(" L O A D   S W E E P\n\n")
+		output_file.write("%10s"%"LOAD CASE" + "".join("%18s"%label for label in labels) + "\n")
+
+	def WriteResults(self, output_file, results):
+		""" Write the results of a chunk of load cases """
+		cases = np.arange(self.NLCASE + 1, self.NLCASE + len(results) + 1)
+		output_file.write(FormatTable("%10d" + "%18.6e"*results.shape[1] + "\n",
+									  cases, *results.T))
+
+		self.NLCASE += len(results)
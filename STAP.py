@@ -13,27 +13,227 @@
 /*****************************************************************************/
 
 Usage:
-	$ python STAP.py file_name
+	$ python STAP.py file_name [options]
 or
-	>>> STAP file_name
+	>>> STAP file_name [options]
 
 Command line arguments:
 	file_name: Input file name with the postfix of .dat or without postfix
+
+With the solution mode MODEX = 0 in the control line of the input data
+file, the data is checked and the size of the stiffness matrix predicted
+without assembling it, and the exit status is 1 if errors are found.
+
+Options:
+	--reorder {none,rcm}: Renumber the equations to reduce the profile of
+		the stiffness matrix (default: none, i.e. input node order)
+	--cache: Keep a binary model cache of the input data file in the folder
+		file_name.dat.cache, and read the model from it while the input
+		data file is unchanged
+	--quiet: Write the output file only, without echoing it on the screen
+	--solver {ldlt,sparse,pcg,outofcore,mixed}: Solver of the linear
+		equilibrium equations,
+		ldlt: LDLT factorization of the skyline matrix (default)
+		sparse: sparse direct factorization of the matrix in compressed
+			sparse column storage (requires SciPy, uses CHOLMOD if
+			scikit-sparse is installed)
+		pcg: preconditioned conjugate gradient iterations on the matrix
+			in compressed sparse column storage
+		outofcore: LDLT factorization of the skyline matrix kept in a
+			scratch file, in column blocks
+		mixed: LDLT factorization of the skyline matrix in single
+			precision with iterative refinement in double precision,
+			falling back to the double precision factorization if the
+			refinement stagnates
+	--factor-cache DIR: Keep the factorized stiffness matrix of the ldlt
+		solver in the cache folder DIR, and reuse it instead of assembling
+		and factorizing when the geometry, boundary codes, elements and
+		materials are unchanged
+	--factor-cache-size MB: Maximum size of the factor cache, the least
+		recently used entries are removed beyond it (default: 1024)
+	--workers N: Number of worker processes assembling the skyline
+		stiffness matrix of the ldlt and mixed solvers (default: 1)
+	--threads N: Number of threads factorizing the skyline stiffness matrix
+		of the ldlt and mixed solvers. The matrix is factorized by dense
+		blocks of columns, the threads sharing the triangular solves of
+		each block (default: 1)
+	--combinations FILE: Superpose the solved load cases with the
+		coefficients of the load combinations in FILE, and print the
+		maximum and minimum element stresses over all combinations. FILE
+		holds the number of combinations NCOMB, then one line for each
+		combination with its number and a coefficient for each load case
+	--sweep FILE: Solve the load cases of FILE, in the load case format of
+		the input data file, after the load cases of the input data file.
+		They are read and solved in chunks, and only the displacements
+		and element stresses selected with --sweep-dofs and
+		--sweep-elements are written to file_name.sweep
+	--sweep-dofs NODE:DIRECTION [...]: Displacements recorded by --sweep
+	--sweep-elements GROUP:ELEMENT [...]: Element stresses recorded by
+		--sweep
+	--sweep-chunk N: Number of load cases of --sweep solved at a time
+		(default: 256)
+	--memory-budget MB: Abort before the skyline stiffness matrix is
+		allocated if the predicted peak memory of the skyline solution
+		exceeds MB, skyline solvers ldlt, outofcore and mixed only
+		(default: no budget)
+	--budget-action {abort,outofcore}: Action beyond the memory budget,
+		outofcore switches the ldlt solver to the outofcore solver if
+		its predicted peak memory fits the budget (default: abort)
+	--profile: Write the profile of the run to file_name.profile.json, with
+		the elapsed time and the counters (e.g. elements and estimated
+		operations) of each phase and of each element group
+	--profile-memory: Also record the peak memory of each phase traced by
+		tracemalloc in the profile, which slows down the column by column
+		factorization several times
+	--memory MB: Memory for the column blocks of the outofcore solver, two
+		blocks are resident at a time (default: 256)
+	--preconditioner {jacobi,ic0}: Preconditioner of the pcg solver
+		(default: jacobi)
+	--tolerance TOL: Relative residual tolerance of the pcg solver
+		(default: 1e-10), or backward error tolerance of the mixed solver
+		(default: NEQ, at least 16, times the double precision machine
+		epsilon)
+	--max-iterations N: Maximum number of iterations of the pcg solver
+		for each load case (default: 10*NEQ)
+	--matrix-free: Run the pcg solver on the element by element stiffness
+		operator instead of assembling the stiffness matrix (jacobi
+		preconditioner only)
 """
 from Domain import Domain
+from LoadCombination import CLoadCombinations
+from LoadSweep import CLoadSweep, ReadLoadCases
 from utils.Outputter import COutputter
-from utils.Clock import Clock
+from utils.Profiler import CProfiler
+from utils.Reordering import ReorderingMethods
+from utils.DataCheck import CDataCheck
+from utils.FactorCache import CFactorCache, StiffnessFingerprint
 from solver.LDLTSolver import CLDLTSolver
-from sys import argv, exit
+from solver.SparseSolver import CSparseSolver
+from solver.PCGSolver import CPCGSolver, Preconditioners
+from solver.OutOfCoreLDLTSolver import COutOfCoreLDLTSolver
+from solver.MixedPrecisionSolver import CMixedPrecisionSolver
+from sys import exit
+import argparse
+import os
+
+
+def PrintTimeLog(Output, Profiler):
+	""" Print the elapsed time of the phases of the solution """
+	time_info = "\n S O L U T I O N   T I M E   L O G   I N   S E C \n\n" \
+				"     TIME FOR INPUT PHASE = {:.4f}\n" \
+				"     TIME FOR CALCULATION OF STIFFNESS MATRIX = {:.4f}\n" \
+				"     TIME FOR FACTORIZATION AND LOAD CASE SOLUTIONS = {:.4f}\n" \
+				"     TIME FOR CALCULATION OF STRESSES AND OUTPUT = {:.4f}\n" \
+				"     T O T A L   S O L U T I O N   T I M E = {:.4f}\n".format(
+		Profiler.Elapsed("input"), Profiler.Elapsed("stiffness matrix"),
+		Profiler.Elapsed("solution"), Profiler.Elapsed("stresses"),
+		Profiler.Elapsed()
+	)
+	Output.OutputSolutionTime(time_info)
+
+# dictionary: Define available solvers and the storage scheme of the
+# stiffness matrix used by each of them
+Solvers = {'ldlt': (CLDLTSolver, 'skyline'),
+		   'sparse': (CSparseSolver, 'sparse'),
+		   'pcg': (CPCGSolver, 'sparse'),
+		   'outofcore': (COutOfCoreLDLTSolver, 'outofcore'),
+		   'mixed': (CMixedPrecisionSolver, 'skyline')}
 
 
 if __name__ == "__main__":
-	nargs = len(argv)
-	if nargs != 2:
-		print("Usage: \n\t$ python STAP.py InputFileName")
-		exit(1)
+	parser = argparse.ArgumentParser(
+		description="STAPpy : A python FEM code sharing the same input data "
+					"file with STAP90")
+	parser.add_argument("filename", metavar="InputFileName",
+						help="input file name with the postfix of .dat "
+							 "or without postfix")
+	parser.add_argument("--reorder", choices=list(ReorderingMethods),
+						default="none",
+						help="equation renumbering before the skyline "
+							 "is allocated (default: none)")
+	parser.add_argument("--cache", action="store_true",
+						help="read the model from (and keep) a binary model "
+							 "cache of the input data file")
+	parser.add_argument("--quiet", action="store_true",
+						help="do not echo the output file on the screen")
+	parser.add_argument("--solver", choices=list(Solvers), default="ldlt",
+						help="solver of the linear equilibrium equations "
+							 "(default: ldlt)")
+	parser.add_argument("--factor-cache", metavar="DIR", default=None,
+						help="reuse (and keep) the factorized stiffness matrix "
+							 "of the ldlt solver in the cache folder DIR")
+	parser.add_argument("--factor-cache-size", metavar="MB", type=float, default=1024,
+						help="maximum size of the factor cache (default: 1024)")
+	parser.add_argument("--workers", type=int, default=1,
+						help="number of worker processes assembling the "
+							 "skyline stiffness matrix (default: 1)")
+	parser.add_argument("--threads", type=int, default=1,
+						help="number of threads factorizing the skyline "
+							 "stiffness matrix (default: 1)")
+	parser.add_argument("--combinations", metavar="FILE", default=None,
+						help="superpose the load cases with the load "
+							 "combinations in FILE and print the stress envelope")
+	parser.add_argument("--sweep", metavar="FILE", default=None,
+						help="solve the load cases of FILE in chunks and write "
+							 "the selected results to file_name.sweep")
+	parser.add_argument("--sweep-dofs", metavar="NODE:DIRECTION", nargs="+",
+						default=[], help="displacements recorded by --sweep")
+	parser.add_argument("--sweep-elements", metavar="GROUP:ELEMENT", nargs="+",
+						default=[], help="element stresses recorded by --sweep")
+	parser.add_argument("--sweep-chunk", type=int, default=256,
+						help="number of load cases of --sweep solved at a time "
+							 "(default: 256)")
+	parser.add_argument("--memory-budget", metavar="MB", type=float, default=None,
+						help="abort if the predicted peak memory of the skyline "
+							 "solution exceeds MB")
+	parser.add_argument("--budget-action", choices=['abort', 'outofcore'], default='abort',
+						help="action beyond the memory budget (default: abort)")
+	parser.add_argument("--profile", action="store_true",
+						help="write the time, memory and counters of each phase "
+							 "to file_name.profile.json")
+	parser.add_argument("--profile-memory", action="store_true",
+						help="record the peak memory of each phase in the "
+							 "profile (slow)")
+	parser.add_argument("--memory", type=float, default=256,
+						help="memory in MB for the column blocks of the "
+							 "outofcore solver (default: 256)")
+	parser.add_argument("--preconditioner", choices=list(Preconditioners),
+						default="jacobi",
+						help="preconditioner of the pcg solver (default: jacobi)")
+	parser.add_argument("--tolerance", type=float, default=None,
+						help="relative residual tolerance of the pcg solver "
+							 "(default: 1e-10), or backward error tolerance "
+							 "of the mixed solver (default: NEQ*eps)")
+	parser.add_argument("--max-iterations", type=int, default=None,
+						help="maximum number of pcg iterations for each load "
+							 "case (default: 10*NEQ)")
+	parser.add_argument("--matrix-free", action="store_true",
+						help="run the pcg solver on the element by element "
+							 "stiffness operator without assembling the "
+							 "stiffness matrix")
+	args = parser.parse_args()
 
-	filename = argv[1]
+	if args.matrix_free and (args.solver != 'pcg' or args.preconditioner != 'jacobi'):
+		parser.error("--matrix-free requires --solver pcg with the jacobi preconditioner")
+	if args.factor_cache and args.solver != 'ldlt':
+		parser.error("--factor-cache requires --solver ldlt")
+	if args.memory_budget is not None and (Solvers[args.solver][1] == 'sparse' or args.matrix_free):
+		parser.error("--memory-budget requires a skyline solver (ldlt, outofcore or mixed)")
+	if args.budget_action == 'outofcore' and args.solver != 'ldlt':
+		parser.error("--budget-action outofcore requires --solver ldlt")
+	if args.sweep and not (args.sweep_dofs or args.sweep_elements):
+		parser.error("--sweep requires --sweep-dofs or --sweep-elements")
+
+	# (node, direction) and (group, element) pairs recorded by --sweep
+	try:
+		SweepDOFs = [tuple(int(n) for n in pair.split(':')) for pair in args.sweep_dofs]
+		SweepElements = [tuple(int(n) for n in pair.split(':')) for pair in args.sweep_elements]
+	except ValueError:
+		parser.error("--sweep-dofs and --sweep-elements take pairs of numbers M:N")
+	if any(len(pair) != 2 for pair in SweepDOFs + SweepElements):
+		parser.error("--sweep-dofs and --sweep-elements take pairs of numbers M:N")
+
+	filename = args.filename
 	found = filename.rfind('.')
 
 	# If the input file name is provided with an extension
@@ -50,59 +250,187 @@ if __name__ == "__main__":
 
 	FEMData = Domain()
 
-	timer = Clock()
-	timer.Start()
+	Output = COutputter(FEMData, output_filename, echo=not args.quiet)
+	FEMData.SetOutputter(Output)
+
+	# Nested timers of the phases, tracing the memory of each phase with
+	# --profile-memory
+	args.profile = args.profile or args.profile_memory
+	Profiler = CProfiler(TraceMemory=args.profile_memory)
+	FEMData.SetProfiler(Profiler)
+	Profiler.Start()
 
 	# Read data and define the problem domain
-	if not FEMData.ReadData(input_filename, output_filename):
-		print("*** Error *** Data input failed!")
-		exit(1)
+	with Profiler.Phase("input"):
+		if not FEMData.ReadData(input_filename, output_filename, args.cache):
+			print("*** Error *** Data input failed!")
+			exit(1)
 
-	time_input = timer.ElapsedTime()
+	# Data check mode: validate the input data and predict the size of the
+	# stiffness matrix without assembling it, then stop
+	if FEMData.GetMODEX() == 0:
+		with Profiler.Phase("data check"):
+			Check = CDataCheck(FEMData)
+			valid = Check.Run()
+			Output.OutputDataCheck(Check)
 
-	# Allocate global vectors and matrices, such as the Force, ColumnHeights,
-	# DiagonalAddress and StiffnessMatrix, and calculate the column heights
-	# and address of diagonal elements
-	FEMData.AllocateMatrices()
+		Profiler.Stop()
+		if args.profile:
+			Profiler.WriteJSON(filename + ".profile.json", input=input_filename)
 
-	# Assemble the banded gloabl stiffness matrix
-	FEMData.AssembleStiffnessMatrix()
+		Output.Close()
+		exit(0 if valid else 1)
 
-	time_assemble = timer.ElapsedTime()
+	# Read the load combinations before the solution, so that an invalid
+	# combination file stops the run before the factorization
+	Combinations = None
+	if args.combinations:
+		Combinations = CLoadCombinations()
+		try:
+			with open(args.combinations) as combination_file:
+				Combinations.Read(combination_file, FEMData.GetNLCASE())
+		except OSError:
+			print("*** Error *** Cannot read the load combination file: {}".format(args.combinations))
+			exit(1)
+		except ValueError as e:
+			print(e)
+			exit(1)
+
+	# Check the recorded results and the load cases of the sweep file before
+	# the solution, reading the file once without solving it
+	Sweep = None
+	if args.sweep:
+		try:
+			Sweep = CLoadSweep(FEMData, SweepDOFs, SweepElements, args.sweep_chunk)
+			with open(args.sweep) as sweep_file:
+				Sweep.Check(ReadLoadCases(sweep_file))
+		except OSError:
+			print("*** Error *** Cannot read the load sweep file: {}".format(args.sweep))
+			exit(1)
+		except ValueError as e:
+			print(e)
+			exit(1)
+
+	# Look up the factorized stiffness matrix in the factor cache
+	Factorized = None
+	if args.factor_cache:
+		os.makedirs(args.factor_cache, exist_ok=True)
+		FactorCache = CFactorCache(args.factor_cache, int(args.factor_cache_size*2**20))
+		Fingerprint = StiffnessFingerprint(FEMData, args.reorder)
+		Factorized = FactorCache.Load(Fingerprint)
+
+	SolverType, Storage = Solvers[args.solver]
+	with Profiler.Phase("stiffness matrix"):
+		if Factorized:
+			# Back substitute with the cached factors, skipping the assembly
+			# and factorization of the stiffness matrix
+			K, bcode, info = Factorized
+			FEMData.RestoreMatrices(K, bcode, args.reorder, info["ProfileBeforeReordering"])
+		else:
+			# Allocate global vectors and matrices, such as the Force, ColumnHeights,
+			# DiagonalAddress and StiffnessMatrix, and calculate the column heights
+			# and address of diagonal elements
+			if args.matrix_free:
+				Storage = 'ebe'
+			# Two column blocks of 8 byte entries are resident at a time
+			try:
+				with Profiler.Phase("allocation"):
+					FEMData.AllocateMatrices(args.reorder, Storage,
+											 BlockSize=max(int(args.memory*2**20/16), 1),
+											 ScratchFolder=os.path.dirname(os.path.abspath(output_filename)),
+											 MemoryBudget=None if args.memory_budget is None
+												 else int(args.memory_budget*2**20),
+											 BudgetAction=args.budget_action,
+											 MixedPrecision=args.solver == 'mixed')
+			except ValueError as e:
+				print(e)
+				exit(1)
+
+			# Assemble the banded gloabl stiffness matrix
+			with Profiler.Phase("assembly"):
+				FEMData.AssembleStiffnessMatrix(args.workers)
 
 	# Solve the linear equilibrium equations for displacements
-	Solver = CLDLTSolver(FEMData.GetStiffnessMatrix())
+	if args.solver == 'pcg':
+		Solver = CPCGSolver(FEMData.GetStiffnessMatrix(), args.preconditioner,
+							args.tolerance or 1.0e-10, args.max_iterations)
+	elif args.solver == 'mixed':
+		Solver = CMixedPrecisionSolver(FEMData.GetStiffnessMatrix(),
+									   args.tolerance, Threads=args.threads)
+	elif args.solver == 'ldlt' and FEMData.GetStorage() == 'outofcore':
+		# The skyline has been moved out of core to fit the memory budget
+		Solver = COutOfCoreLDLTSolver(FEMData.GetStiffnessMatrix())
+	elif args.solver == 'ldlt':
+		Solver = CLDLTSolver(FEMData.GetStiffnessMatrix(), Threads=args.threads)
+	else:
+		Solver = SolverType(FEMData.GetStiffnessMatrix())
 
-	# Perform L*D*L(T) factorization of stiffness matrix
-	Solver.LDLT()
+	# Operations of the skyline solution predicted from the column heights
+	Estimate = FEMData.GetEstimate()
 
-	Output = COutputter()
+	with Profiler.Phase("solution"):
+		# Perform L*D*L(T) (or sparse) factorization of stiffness matrix
+		if not Factorized:
+			with Profiler.Phase("factorization"):
+				if Estimate:
+					Profiler.Count("estimated operations", Estimate.FactorizationFlops)
+				Solver.LDLT()
 
-	# Loop over for all load cases
-	for lcase in range(FEMData.GetNLCASE()):
-		# Assemble righ-hand-side vector (force vector)
-		FEMData.AssembleForce(lcase + 1)
+			if args.factor_cache:
+				FactorCache.Save(Fingerprint, FEMData.GetStiffnessMatrix(),
+								 FEMData.GetBCode(), FEMData.GetProfileBeforeReordering())
 
-		# Reduce right-hand-side force vector and back substitute
-		Solver.BackSubstitution(FEMData.GetForce())
+		# Assemble righ-hand-side vectors (force vectors) of all load cases
+		with Profiler.Phase("forces"):
+			FEMData.AssembleForces()
 
-		Output.OutputNodalDisplacement(lcase)
+		# Reduce right-hand-side force vectors and back substitute,
+		# solving all load cases in one pass
+		with Profiler.Phase("back substitution"):
+			Profiler.Count("load cases", FEMData.GetNLCASE())
+			if Estimate:
+				Profiler.Count("estimated operations",
+							   Estimate.BackSubstitutionFlops*FEMData.GetNLCASE())
+			Solver.BackSubstitution(FEMData.GetForce())
 
-	time_solution = timer.ElapsedTime()
+		if args.solver == 'pcg':
+			Output.OutputPCGSolution(Solver)
+		elif args.solver == 'mixed':
+			Output.OutputRefinement(Solver)
 
-	# Calculate and output stresses of all elements
-	Output.OutputElementStress()
+	with Profiler.Phase("stresses"):
+		# Calculate stresses of all elements for all load cases
+		with Profiler.Phase("element stresses"):
+			FEMData.CalculateElementStresses()
 
-	time_stress = timer.ElapsedTime()
+		# Loop over for all load cases
+		with Profiler.Phase("output"):
+			for lcase in range(FEMData.GetNLCASE()):
+				Output.OutputNodalDisplacement(lcase)
 
-	timer.Stop()
+				# Output stresses of all elements
+				Output.OutputElementStress(lcase)
 
-	time_info = "\n S O L U T I O N   T I M E   L O G   I N   S E C \n\n" \
-				"     TIME FOR INPUT PHASE = {}\n" \
-				"     TIME FOR CALCULATION OF STIFFNESS MATRIX = {}\n" \
-				"     TIME FOR FACTORIZATION AND LOAD CASE SOLUTIONS = {}\n" \
-				"     T O T A L   S O L U T I O N   T I M E = {}\n".format(
-		time_input, time_assemble - time_input,
-		time_solution - time_assemble, time_stress
-	)
-	Output.OutputSolutionTime(time_info)
+		# Superpose the load cases with the coefficients of the load combinations
+		if Combinations is not None:
+			with Profiler.Phase("combinations"):
+				Output.OutputLoadCombinations(Combinations)
+
+		# Solve the load cases of the sweep file chunk by chunk, writing the
+		# selected results to the sweep results file
+		if Sweep is not None:
+			with Profiler.Phase("sweep"):
+				with open(args.sweep) as sweep_file, open(filename + ".sweep", 'w') as results_file:
+					Profiler.Count("load cases", Sweep.Run(Solver, ReadLoadCases(sweep_file), results_file))
+
+				Output.OutputLoadSweep(Sweep, filename + ".sweep")
+
+	Profiler.Stop()
+
+	PrintTimeLog(Output, Profiler)
+	Output.Close()
+
+	if args.profile:
+		Profiler.WriteJSON(filename + ".profile.json", input=input_filename,
+						   solver=args.solver, storage=FEMData.GetStorage(),
+						   NEQ=FEMData.GetNEQ(), NLCASE=FEMData.GetNLCASE())
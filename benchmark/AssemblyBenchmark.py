@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+/*****************************************************************************/
+/*  STAPpy : A python FEM code sharing the same input data file with STAP90  */
+/*     Computational Dynamics Laboratory                                     */
+/*     School of Aerospace Engineering, Tsinghua University                  */
+/*                                                                           */
+/*     Created on Mon Jun 22, 2020                                           */
+/*                                                                           */
+/*     @author: thurcni@163.com, xzhang@tsinghua.edu.cn                      */
+/*     http://www.comdyn.cn/                                                 */
+/*****************************************************************************/
+
+Scaling of the shared-memory multiprocess assembly of the skyline
+stiffness matrix on generated truss lattices
+
+Usage:
+	$ python benchmark/AssemblyBenchmark.py [NUME ...] [--workers N ...]
+
+Command line arguments:
+	NUME: Approximate number of elements of a 2D lattice with 20 bays
+		across (default: 100000 1000000)
+	--workers: Numbers of worker processes to time (default: 1 2 4 8),
+		1 is the serial assembly of Domain.AssembleStiffnessMatrix
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmark.MeshGenerator import WriteTrussLattice, LoadModel
+import argparse
+import tempfile
+import time
+import numpy as np
+
+
+def TimeAssembly(FEMData, workers):
+	""" Assemble into a zeroed stiffness matrix, return (time, data) """
+	K = FEMData.GetStiffnessMatrix()
+	K.GetData()[:] = 0.0
+
+	t0 = time.perf_counter()
+	FEMData.AssembleStiffnessMatrix(workers)
+	elapsed = time.perf_counter() - t0
+
+	return elapsed, K.GetData().copy()
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Parallel assembly benchmark")
+	parser.add_argument("sizes", metavar="NUME", type=int, nargs="*",
+						default=[100000, 1000000])
+	parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+	args = parser.parse_args()
+
+	print("CPUs available: {}\n".format(os.cpu_count()))
+	print("%10s%10s%12s%10s%12s%10s%14s"%("NUME", "NEQ", "NWK", "WORKERS",
+										 "TIME (s)", "SPEEDUP", "MAX REL DIFF"))
+
+	with tempfile.TemporaryDirectory() as folder:
+		for size in args.sizes:
+			# A 2D lattice of nx*20 bays has about 61*nx elements
+			input_filename = os.path.join(folder, "lattice.dat")
+			NUME = WriteTrussLattice(input_filename, max(size//61, 1), 20)
+
+			FEMData = LoadModel(input_filename, os.path.join(folder, "lattice.out"),
+								Assemble=False)
+			K = FEMData.GetStiffnessMatrix()
+
+			serial, reference = TimeAssembly(FEMData, 1)
+			for workers in args.workers:
+				if workers == 1:
+					elapsed, data = serial, reference
+				else:
+					elapsed, data = TimeAssembly(FEMData, workers)
+
+				difference = np.abs(data - reference).max()/np.abs(reference).max()
+				print("%10d%10d%12d%10d%12.4f%10.2f%14.3e"%(
+					NUME, K.dim(), K.size(), workers, elapsed,
+					serial/elapsed, difference))
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+/*****************************************************************************/
+/*  STAPpy : A python FEM code sharing the same input data file with STAP90  */
+/*     Computational Dynamics Laboratory                                     */
+/*     School of Aerospace Engineering, Tsinghua University                  */
+/*                                                                           */
+/*     Created on Mon Jun 22, 2020                                           */
+/*                                                                           */
+/*     @author: thurcni@163.com, xzhang@tsinghua.edu.cn                      */
+/*     http://www.comdyn.cn/                                                 */
+/*****************************************************************************/
+
+Compare the entry-by-entry, the column-vectorized and the block LDLT
+factorizations of CLDLTSolver on generated truss lattices
+
+Usage:
+	$ python benchmark/LDLTBenchmark.py [nx ...]
+
+Command line arguments:
+	nx: Number of bays along a 2D lattice with 20 bays across (default
+		10 25 50 100), giving a half bandwidth of about 45 equations
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmark.MeshGenerator import WriteTrussLattice, LoadModel
+from solver.LDLTSolver import CLDLTSolver
+import tempfile
+import time
+import numpy as np
+
+
+def TimeFactorization(K, data, method):
+	"""
+	Factorize a fresh copy of the assembled data with the method of
+	CLDLTSolver named method, return (time, data)
+	"""
+	K.GetData()[:] = data
+	Solver = CLDLTSolver(K)
+
+	t0 = time.perf_counter()
+	getattr(Solver, method)()
+	elapsed = time.perf_counter() - t0
+
+	return elapsed, K.GetData().copy()
+
+
+if __name__ == "__main__":
+	sizes = [int(arg) for arg in sys.argv[1:]] or [10, 25, 50, 100]
+
+	print("%8s%8s%10s%14s%14s%14s%10s%14s"%("NUME", "NEQ", "NWK", "ENTRY (s)",
+										  "COLUMN (s)", "BLOCK (s)", "SPEEDUP",
+										  "MAX REL DIFF"))
+
+	with tempfile.TemporaryDirectory() as folder:
+		for nx in sizes:
+			input_filename = os.path.join(folder, "lattice.dat")
+			NUME = WriteTrussLattice(input_filename, nx, 20)
+
+			FEMData = LoadModel(input_filename,
+								os.path.join(folder, "lattice.out"))
+			K = FEMData.GetStiffnessMatrix()
+			assembled = K.GetData().copy()
+
+			time_entry, entry = TimeFactorization(K, assembled, 'LDLTByEntry')
+			time_column, column = TimeFactorization(K, assembled, 'LDLTByColumn')
+			time_block, block = TimeFactorization(K, assembled, 'LDLTByBlock')
+
+			difference = max(np.abs(column - entry).max(),
+							 np.abs(block - entry).max())/np.abs(entry).max()
+
+			print("%8d%8d%10d%14.4f%14.4f%14.4f%10.1f%14.3e"%(
+				NUME, K.dim(), K.size(), time_entry, time_column, time_block,
+				time_entry/time_block, difference))
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+/*****************************************************************************/
+/*  STAPpy : A python FEM code sharing the same input data file with STAP90  */
+/*     Computational Dynamics Laboratory                                     */
+/*     School of Aerospace Engineering, Tsinghua University                  */
+/*                                                                           */
+/*     Created on Mon Jun 22, 2020                                           */
+/*                                                                           */
+/*     @author: thurcni@163.com, xzhang@tsinghua.edu.cn                      */
+/*     http://www.comdyn.cn/                                                 */
+/*****************************************************************************/
+"""
+from utils.Outputter import COutputter
+from Domain import Domain
+import numpy as np
+import contextlib
+import itertools
+import os
+
+
+def TrussLattice(nx, ny, nz=0, spacing=1.0):
+	"""
+	Generate a parametric truss lattice of nx*ny(*nz) bays
+
+	Each bay is triangulated by connecting every node to its neighbours
+	at all offsets in {0,1}^dim, so the lattice is stable once the nodes
+	on the plane x = 0 are fixed. Nodes are numbered with x varying
+	slowest, which keeps the half bandwidth proportional to the cross
+	section of the lattice.
+
+	:param nx, ny, nz: (int) number of bays in x, y and z (nz = 0 : 2D)
+	:param spacing: (float) bay size
+	:return: (XYZ, bcode, elements) coordinates (NUMNP, 3), boundary codes
+		(NUMNP, 3) and element node numbers (NUME, 2) numbered from 1
+	"""
+	shape = (nx + 1, ny + 1, nz + 1)
+	index = np.arange(np.prod(shape)).reshape(shape)
+
+	grid = np.indices(shape).reshape(3, -1).T
+	XYZ = grid*spacing
+
+	bcode = np.zeros((len(XYZ), 3), dtype=np.int64)
+	bcode[grid[:, 0] == 0] = 1
+	if nz == 0:
+		bcode[:, 2] = 1
+
+	dim = 2 if nz == 0 else 3
+	elements = []
+	for offset in itertools.product((0, 1), repeat=dim):
+		if not any(offset):
+			continue
+		offset = offset + (0,)*(3 - dim)
+		ox, oy, oz = offset
+		first = index[:shape[0] - ox, :shape[1] - oy, :shape[2] - oz]
+		second = index[ox:, oy:, oz:]
+		elements.append(np.column_stack((first.ravel(), second.ravel())))
+
+	elements = np.concatenate(elements)
+	elements = elements[np.lexsort((elements[:, 1], elements[:, 0]))]
+
+	return XYZ, bcode, elements + 1
+
+
+def WriteTrussLattice(filename, nx, ny, nz=0, NLCASE=1, spacing=1.0,
+					  E=2.0e11, Area=1.0e-4, shuffle=False, seed=0):
+	"""
+	Write a truss lattice generated by TrussLattice in STAP90 format
+
+	Load case lcase applies a unit load in direction (lcase % NDIM) + 1 to
+	every node on the free end x = nx*spacing.
+
+	:param shuffle: (bool) randomly permute the node numbering, e.g. to
+		mimic meshes numbered without regard to the bandwidth
+	:return: (int) number of elements written
+	"""
+	XYZ, bcode, elements = TrussLattice(nx, ny, nz, spacing)
+	NUMNP = len(XYZ)
+	NUME = len(elements)
+
+	if shuffle:
+		permutation = np.random.RandomState(seed).permutation(NUMNP)
+		order = np.argsort(permutation)
+		XYZ = XYZ[order]
+		bcode = bcode[order]
+		elements = permutation[elements - 1] + 1
+
+	tip = np.nonzero(XYZ[:, 0] == nx*spacing)[0] + 1
+	ndim = 2 if nz == 0 else 3
+
+	with open(filename, 'w') as output_file:
+		output_file.write("Truss lattice {}x{}x{}\n".format(nx, ny, nz))
+		output_file.write("%5d%5d%5d%5d\n"%(NUMNP, 1, NLCASE, 1))
+
+		nodes = np.column_stack((np.arange(1, NUMNP + 1), bcode))
+		np.savetxt(output_file, np.column_stack((nodes, XYZ)),
+				   fmt="%5d%5d%5d%5d%15.6e%15.6e%15.6e")
+
+		for lcase in range(NLCASE):
+			output_file.write("%5d%5d\n"%(lcase + 1, len(tip)))
+			loads = np.column_stack((tip, np.full(len(tip), lcase % ndim + 1),
+									 np.full(len(tip), -1.0e3*(lcase + 1))))
+			np.savetxt(output_file, loads, fmt="%5d%5d%15.6e")
+
+		output_file.write("%5d%10d%5d\n"%(1, NUME, 1))
+		output_file.write("%5d%15.6e%15.6e\n"%(1, E, Area))
+		np.savetxt(output_file,
+				   np.column_stack((np.arange(1, NUME + 1), elements,
+									np.ones(NUME, dtype=np.int64))),
+				   fmt="%10d%10d%10d%5d")
+
+	return NUME
+
+
+def LoadModel(input_filename, output_filename, Storage='skyline', Assemble=True):
+	"""
+	Read and allocate a model without echoing the output, then assemble
+	its stiffness matrix and the loads of all load cases
+
+	:param Storage: (str) storage scheme of the stiffness matrix (see
+		Domain.AllocateMatrices)
+	:param Assemble: (bool) False to stop after the allocation, e.g. to
+		time the assembly
+	:return: (Domain) the model
+	"""
+	FEMData = Domain()
+	FEMData.SetOutputter(COutputter(FEMData, output_filename, echo=False))
+	with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+		if not FEMData.ReadData(input_filename, output_filename):
+			raise RuntimeError("Data input failed: {}".format(input_filename))
+		FEMData.AllocateMatrices(Storage=Storage)
+
+		if Assemble:
+			FEMData.AssembleStiffnessMatrix()
+			FEMData.AssembleForces()
+
+	return FEMData
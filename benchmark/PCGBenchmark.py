@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+/*****************************************************************************/
+/*  STAPpy : A python FEM code sharing the same input data file with STAP90  */
+/*     Computational Dynamics Laboratory                                     */
+/*     School of Aerospace Engineering, Tsinghua University                  */
+/*                                                                           */
+/*     Created on Mon Jun 22, 2020                                           */
+/*                                                                           */
+/*     @author: thurcni@163.com, xzhang@tsinghua.edu.cn                      */
+/*     http://www.comdyn.cn/                                                 */
+/*****************************************************************************/
+
+Compare the wall time of the PCG solver with the Jacobi and the IC(0)
+preconditioners on generated truss lattices. The setup of IC(0) is
+also given per stored entry of K, and as the number of IC(0) iterations
+of the same wall time: the factorization runs one dot product for each
+stored entry, so its cost grows like that of one iteration and it is
+worth a fixed number of iterations whatever the size of the model
+
+Usage:
+	$ python benchmark/PCGBenchmark.py [nx ...]
+
+Command line arguments:
+	nx: Number of bays along a 2D lattice with 20 bays across (default
+		50 200 800), the lattice of 800 bays having about 33,000 equations
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmark.MeshGenerator import WriteTrussLattice, LoadModel
+from solver.PCGSolver import CPCGSolver
+import tempfile
+import time
+
+
+def TimeSolution(K, Force, Preconditioner):
+	"""
+	Set up the preconditioner and solve the load cases of a copy of Force,
+	return (setup time, solution time, total number of iterations)
+	"""
+	Solver = CPCGSolver(K, Preconditioner)
+
+	t0 = time.perf_counter()
+	Solver.LDLT()
+	t1 = time.perf_counter()
+	Solver.BackSubstitution(Force.copy())
+	t2 = time.perf_counter()
+
+	return t1 - t0, t2 - t1, sum(Solver.GetIterations())
+
+
+if __name__ == "__main__":
+	sizes = [int(arg) for arg in sys.argv[1:]] or [50, 200, 800]
+
+	print("%8s%8s%9s%8s%12s%10s%12s%12s%12s%12s%12s%10s"%(
+		"NUME", "NEQ", "NWK", "ITER J", "JACOBI (s)", "ITER IC0", "SETUP (s)",
+		"US/ENTRY", "SETUP/ITER", "SOLVE (s)", "IC0 (s)", "SPEEDUP"))
+
+	with tempfile.TemporaryDirectory() as folder:
+		for nx in sizes:
+			input_filename = os.path.join(folder, "lattice.dat")
+			NUME = WriteTrussLattice(input_filename, nx, 20)
+
+			FEMData = LoadModel(input_filename, os.path.join(folder, "lattice.out"), Storage='sparse')
+			K = FEMData.GetStiffnessMatrix()
+			Force = FEMData.GetForce()
+
+			setup_jacobi, solve_jacobi, iterations_jacobi = TimeSolution(K, Force, 'jacobi')
+			setup_ic0, solve_ic0, iterations_ic0 = TimeSolution(K, Force, 'ic0')
+
+			time_jacobi = setup_jacobi + solve_jacobi
+			time_ic0 = setup_ic0 + solve_ic0
+
+			print("%8d%8d%9d%8d%12.4f%10d%12.4f%12.2f%12.0f%12.4f%12.4f%10.1f"%(
+				NUME, K.dim(), K.size(), iterations_jacobi, time_jacobi, iterations_ic0,
+				setup_ic0, setup_ic0/K.size()*1.0e6,
+				setup_ic0/solve_ic0*max(iterations_ic0, 1),
+				solve_ic0, time_ic0, time_jacobi/time_ic0))
+			sys.stdout.flush()
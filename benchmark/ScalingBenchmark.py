@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+/*****************************************************************************/
+/*  STAPpy : A python FEM code sharing the same input data file with STAP90  */
+/*     Computational Dynamics Laboratory                                     */
+/*     School of Aerospace Engineering, Tsinghua University                  */
+/*                                                                           */
+/*     Created on Mon Jun 22, 2020                                           */
+/*                                                                           */
+/*     @author: thurcni@163.com, xzhang@tsinghua.edu.cn                      */
+/*     http://www.comdyn.cn/                                                 */
+/*****************************************************************************/
+
+Time every phase of the skyline solution of generated 2D and 3D truss
+lattices from 10^2 to 10^6 elements, and compare the timing and memory
+curves with the stored baselines
+
+Usage:
+	$ python benchmark/ScalingBenchmark.py [options]
+
+Options:
+	--max-elements N: Largest lattice of the ladder 10^2, 10^3, ..., 10^6
+		elements (default: 10^4)
+	--dimensions {2,3} [...]: Lattices benchmarked (default: 2 3)
+	--repeat N: Number of runs of each lattice, the fastest run of each
+		phase being recorded (default: 1)
+	--no-memory: Skip the run tracing the peak memory of each phase with
+		tracemalloc, which slows down the factorization several times
+	--baseline FILE: Baselines compared with (default:
+		benchmark/ScalingBaselines.json)
+	--save-baseline: Record the results as the baselines of their lattices
+		instead of comparing them
+	--tolerance T: Relative slowdown of a phase over its baseline reported
+		as a regression (default: 0.5)
+	--memory-tolerance T: Relative growth of the peak memory of a phase
+		over its baseline reported as a regression (default: 0.1)
+	--json FILE: Write the timing and memory curves to FILE
+
+The exit status is 1 if a phase regressed. The lattices have a constant
+cross section (10 bays in 2D, 4x4 bays in 3D) and grow in length, so the
+half bandwidth is the same at all sizes; the baselines hold for the
+machine that recorded them.
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmark.MeshGenerator import WriteTrussLattice
+from solver.LDLTSolver import CLDLTSolver
+from utils.Outputter import COutputter
+from Domain import Domain
+import contextlib
+import tracemalloc
+import argparse
+import tempfile
+import json
+import time
+
+# Phases of the solution timed separately, in the order they run
+Phases = ['read', 'allocate', 'assemble', 'factorize', 'solve', 'stress']
+
+# Bays across the lattices of each dimension
+CrossSections = {2: (10, 0), 3: (4, 4)}
+
+# Ladder of lattice sizes (number of elements)
+Sizes = [10**2, 10**3, 10**4, 10**5, 10**6]
+
+# Phases faster than this (in seconds) or growing by less than this (in
+# bytes) are not reported as regressions, being dominated by noise
+MinimumTime = 0.05
+MinimumMemory = 2**16
+
+
+def LatticeBays(NUME, dimension):
+	"""
+	Return the bays (nx, ny, nz) of the lattice of the given dimension
+	with about NUME elements
+	"""
+	ny, nz = CrossSections[dimension]
+
+	# Number of elements of the lattice, linear in nx: a*nx + b
+	def Elements(nx):
+		offsets = [(ox, oy, oz) for ox in (0, 1) for oy in (0, 1)
+				   for oz in ((0, 1) if nz else (0,)) if ox or oy or oz]
+		return sum((nx + 1 - ox)*(ny + 1 - oy)*(nz + 1 - oz) for ox, oy, oz in offsets)
+
+	a = Elements(1) - Elements(0)
+	b = Elements(0)
+
+	return max(int(round((NUME - b)/a)), 1), ny, nz
+
+
+@contextlib.contextmanager
+def Measure(results, phase, TraceMemory):
+	"""
+	Record the elapsed time of the phase in results['time'], or with
+	TraceMemory its peak memory over the memory at its start in
+	results['memory']
+	"""
+	if TraceMemory:
+		tracemalloc.reset_peak()
+		start = tracemalloc.get_traced_memory()[0]
+		yield
+		results['memory'][phase] = tracemalloc.get_traced_memory()[1] - start
+	else:
+		t0 = time.perf_counter()
+		yield
+		results['time'][phase] = time.perf_counter() - t0
+
+
+def RunPhases(input_filename, output_filename, TraceMemory=False):
+	"""
+	Run the phases of the skyline solution of the input data file
+
+	:return: (dict) {'time': {phase: seconds}} or, with TraceMemory,
+		{'memory': {phase: bytes}}, and the size of the model
+	"""
+	results = {'time': {}, 'memory': {}}
+
+	FEMData = Domain()
+	Output = COutputter(FEMData, output_filename, echo=False)
+	FEMData.SetOutputter(Output)
+
+	if TraceMemory:
+		tracemalloc.start()
+
+	with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+		with Measure(results, 'read', TraceMemory):
+			if not FEMData.ReadData(input_filename, output_filename):
+				raise RuntimeError("Data input failed: {}".format(input_filename))
+
+		with Measure(results, 'allocate', TraceMemory):
+			FEMData.AllocateMatrices()
+
+		with Measure(results, 'assemble', TraceMemory):
+			FEMData.AssembleStiffnessMatrix()
+
+		Solver = CLDLTSolver(FEMData.GetStiffnessMatrix())
+		with Measure(results, 'factorize', TraceMemory):
+			Solver.LDLT()
+
+		FEMData.AssembleForces()
+		with Measure(results, 'solve', TraceMemory):
+			Solver.BackSubstitution(FEMData.GetForce())
+
+		with Measure(results, 'stress', TraceMemory):
+			FEMData.CalculateElementStresses()
+			for lcase in range(FEMData.GetNLCASE()):
+				Output.OutputElementStress(lcase)
+
+	Output.Close()
+
+	if TraceMemory:
+		tracemalloc.stop()
+
+	results['NEQ'] = int(FEMData.GetNEQ())
+	results['NWK'] = int(FEMData.GetStiffnessMatrix().size())
+
+	return results
+
+
+def Benchmark(dimension, NUME, folder, repeat=1, TraceMemory=True):
+	"""
+	Run the phases of the lattice of the given dimension with about NUME
+	elements, recording the fastest time of each phase over repeat runs
+	"""
+	nx, ny, nz = LatticeBays(NUME, dimension)
+
+	input_filename = os.path.join(folder, "lattice.dat")
+	output_filename = os.path.join(folder, "lattice.out")
+	elements = WriteTrussLattice(input_filename, nx, ny, nz)
+
+	results = None
+	for run in range(repeat):
+		times = RunPhases(input_filename, output_filename)
+		if results is None:
+			results = times
+		else:
+			for phase in Phases:
+				results['time'][phase] = min(results['time'][phase], times['time'][phase])
+
+	if TraceMemory:
+		results['memory'] = RunPhases(input_filename, output_filename, True)['memory']
+
+	results.update({'dimension': dimension, 'size': NUME, 'NUME': elements,
+					'bays': [nx, ny, nz]})
+
+	return results
+
+
+def Key(results):
+	""" Key of the lattice of the results in the baselines """
+	return "%dD-%d"%(results['dimension'], results['size'])
+
+
+def Regressions(results, baselines, tolerance, MemoryTolerance):
+	""" Return the messages of the phases slower or larger than their baseline """
+	baseline = baselines.get(Key(results))
+	if baseline is None:
+		return []
+
+	messages = []
+	for phase in Phases:
+		time_base = baseline['time'].get(phase)
+		time_now = results['time'][phase]
+		if time_base is not None and time_now > time_base*(1 + tolerance) \
+				and time_now - time_base > MinimumTime:
+			messages.append("%s %s: time %.4f s, baseline %.4f s"%(
+				Key(results), phase, time_now, time_base))
+
+		memory_base = baseline['memory'].get(phase)
+		memory_now = results['memory'].get(phase)
+		if memory_base is not None and memory_now is not None \
+				and memory_now > memory_base*(1 + MemoryTolerance) \
+				and memory_now - memory_base > MinimumMemory:
+			messages.append("%s %s: memory %.2f MB, baseline %.2f MB"%(
+				Key(results), phase, memory_now/2**20, memory_base/2**20))
+
+	return messages
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(
+		description="Scaling benchmark of the phases of the skyline solution")
+	parser.add_argument("--max-elements", type=int, default=10**4,
+						help="largest lattice of the ladder (default: 10^4)")
+	parser.add_argument("--dimensions", type=int, nargs="+", choices=[2, 3],
+						default=[2, 3], help="lattices benchmarked (default: 2 3)")
+	parser.add_argument("--repeat", type=int, default=1,
+						help="number of runs of each lattice (default: 1)")
+	parser.add_argument("--no-memory", action="store_true",
+						help="do not trace the peak memory of the phases")
+	parser.add_argument("--baseline", metavar="FILE",
+						default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+											 "ScalingBaselines.json"),
+						help="baselines compared with")
+	parser.add_argument("--save-baseline", action="store_true",
+						help="record the results as the baselines")
+	parser.add_argument("--tolerance", type=float, default=0.5,
+						help="relative slowdown reported as a regression "
+							 "(default: 0.5)")
+	parser.add_argument("--memory-tolerance", type=float, default=0.1,
+						help="relative memory growth reported as a regression "
+							 "(default: 0.1)")
+	parser.add_argument("--json", metavar="FILE", default=None,
+						help="write the timing and memory curves to FILE")
+	args = parser.parse_args()
+
+	baselines = {}
+	if os.path.exists(args.baseline):
+		with open(args.baseline) as baseline_file:
+			baselines = json.load(baseline_file)
+
+	print("%4s%9s%9s%10s"%("DIM", "NUME", "NEQ", "NWK")
+		  + "".join("%11s"%phase.upper() for phase in Phases) + "%11s"%"PEAK (MB)")
+
+	curves = []
+	regressions = []
+	with tempfile.TemporaryDirectory() as folder:
+		for dimension in args.dimensions:
+			for size in Sizes:
+				if size > args.max_elements:
+					break
+
+				results = Benchmark(dimension, size, folder, args.repeat,
+									not args.no_memory)
+				curves.append(results)
+
+				peak = max(results['memory'].values(), default=0)
+				print("%4d%9d%9d%10d"%(dimension, results['NUME'], results['NEQ'], results['NWK'])
+					  + "".join("%11.4f"%results['time'][phase] for phase in Phases)
+					  + "%11.2f"%(peak/2**20))
+				sys.stdout.flush()
+
+				if args.save_baseline:
+					baselines[Key(results)] = {'time': results['time'],
+											   'memory': results['memory']}
+				else:
+					regressions += Regressions(results, baselines, args.tolerance,
+											   args.memory_tolerance)
+
+	if args.json:
+		with open(args.json, 'w') as json_file:
+			json.dump(curves, json_file, indent=1)
+
+	if args.save_baseline:
+		with open(args.baseline, 'w') as baseline_file:
+			json.dump(baselines, baseline_file, indent=1, sort_keys=True)
+		print("\nBaselines saved to {}".format(args.baseline))
+	elif regressions:
+		print("\n*** Error *** Performance regressions:\n    " + "\n    ".join(regressions))
+		sys.exit(1)
+	else:
+		print("\nNo regression over the baselines")
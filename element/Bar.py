@@ -20,66 +20,23 @@ from element.Element import CElement
 
 class CBar(CElement):
 	""" Bar Element class """
-	def __init__(self):
-		super().__init__()
-		self._NEN = 2 # Each element has 2 nodes
-		self._nodes = [None for _ in range(self._NEN)]
+	NEN = 2 # Each element has 2 nodes
+	ND = 6
 
-		self._ND = 6
-		self._LocationMatrix = np.zeros(self._ND, dtype=np.int)
-
-	def Read(self, input_file, Ele, MaterialSets, NodeList):
-		"""
-		Read element data from stream Input
-
-		:param input_file: (_io.TextIOWrapper) the object of input file
-		:param Ele: (int) check index
-		:param MaterialSets: (list(CMaterial)) the material list in Domain
-		:param NodeList: (list(CNode)) the node list in Domain
-		:return: None
-		"""
-		line = input_file.readline().split()
-
-		N = int(line[0])
-		if N != Ele + 1:
-			error_info = "\n*** Error *** Elements must be inputted in order !" \
-						 "\n   Expected element : {}" \
-						 "\n   Provided element : {}".format(Ele + 1, N)
-			raise ValueError(error_info)
-
-		# left node number and right node number
-		N1 = int(line[1]); N2 = int(line[2])
-		MSet = int(line[3])
-		self._ElementMaterial = MaterialSets[MSet - 1]
-		self._nodes[0] = NodeList[N1 - 1]
-		self._nodes[1] = NodeList[N2 - 1]
-
-	def Write(self, output_file, Ele):
-		"""
-		Write element data to stream
-
-		:param output_file: (_io.TextIOWrapper) the object of output file
-		:param Ele: the element number
-		:return: None
-		"""
-		element_info = "%5d%11d%9d%12d\n"%(Ele+1, self._nodes[0].NodeNumber,
-										   self._nodes[1].NodeNumber,
-										   self._ElementMaterial.nset)
-
-		# print the element info on the screen
-		print(element_info, end='')
-		# write the element info to output file
-		output_file.write(element_info)
+	__slots__ = ()
 
 	def GenerateLocationMatrix(self):
 		"""
 		Generate location matrix: the global equation number that
 		corresponding to each DOF of the element
 		"""
+		LocationMatrix = self.GetLocationMatrix()
+		nodes = self.GetNodes()
+
 		i = 0
-		for N in range(self._NEN):
+		for N in range(self.NEN):
 			for D in range(3):
-				self._LocationMatrix[i] = self._nodes[N].bcode[D]
+				LocationMatrix[i] = nodes[N].bcode[D]
 				i += 1
 
 	def SizeOfStiffnessMatrix(self):
@@ -102,9 +59,10 @@ class CBar(CElement):
 
 		# Calculate bar length
 		# dx = x2-x1, dy = y2-y1, dz = z2-z1
+		nodes = self.GetNodes()
 		DX = np.zeros(3)
 		for i in range(3):
-			DX[i] = self._nodes[1].XYZ[i] - self._nodes[0].XYZ[i]
+			DX[i] = nodes[1].XYZ[i] - nodes[0].XYZ[i]
 
 		# Quadratic polynomial (dx^2, dy^2, dz^2, dx*dy, dy*dz, dx*dz)
 		DX2 = np.zeros(6)
@@ -119,7 +77,7 @@ class CBar(CElement):
 		L = np.sqrt(L2)
 
 		# Calculate element stiffness matrix
-		material = self._ElementMaterial
+		material = self.GetElementMaterial()
 
 		k = material.E * material.Area/L/L2
 
@@ -145,17 +103,65 @@ class CBar(CElement):
 		stiffness[19] = -k * DX2[4]
 		stiffness[20] = -k * DX2[5]
 
+	# Quadratic polynomial term and sign of each entry of the packed
+	# element stiffness matrix (see ElementStiffness)
+	PackedQuadratic = np.array([0, 1, 3, 2, 4, 5, 0, 5, 3, 0, 1,
+								3, 4, 1, 3, 2, 4, 5, 2, 4, 5])
+	PackedSign = np.array([1, 1, 1, 1, 1, 1, 1, -1, -1, -1, 1,
+						   1, -1, -1, -1, 1, 1, 1, -1, -1, -1], dtype=np.double)
+
+	@classmethod
+	def GroupStiffness(cls, group):
+		""" Calculate the stiffness matrices of all bars in group """
+		return cls.BatchStiffness(*cls.BatchInputs(group))
+
+	@classmethod
+	def BatchInputs(cls, group):
+		""" Return the nodal coordinates, Young's modulus and area of all bars """
+		return (group.GetElementCoordinates(), group.GetMaterialProperty('E'),
+				group.GetMaterialProperty('Area'))
+
+	@classmethod
+	def BatchStiffness(cls, XYZ, E, Area):
+		"""
+		Calculate the stiffness matrices of a batch of bars with the same
+		operations as ElementStiffness, entry for entry
+
+		:param XYZ: (np.ndarray) (NUME, 2, 3) nodal coordinates of the bars
+		:param E: (np.ndarray) (NUME,) Young's modulus of the bars
+		:param Area: (np.ndarray) (NUME,) sectional area of the bars
+		:return: (np.ndarray) (NUME, 21) packed element stiffness matrices
+		"""
+		DX = XYZ[:, 1, :] - XYZ[:, 0, :]
+
+		# Quadratic polynomial (dx^2, dy^2, dz^2, dx*dy, dy*dz, dx*dz)
+		DX2 = np.empty((len(DX), 6))
+		DX2[:, 0] = DX[:, 0] * DX[:, 0]
+		DX2[:, 1] = DX[:, 1] * DX[:, 1]
+		DX2[:, 2] = DX[:, 2] * DX[:, 2]
+		DX2[:, 3] = DX[:, 0] * DX[:, 1]
+		DX2[:, 4] = DX[:, 1] * DX[:, 2]
+		DX2[:, 5] = DX[:, 0] * DX[:, 2]
+
+		L2 = DX2[:, 0] + DX2[:, 1] + DX2[:, 2]
+		L = np.sqrt(L2)
+
+		k = E * Area/L/L2
+
+		return (k[:, np.newaxis]*cls.PackedSign) * DX2[:, cls.PackedQuadratic]
+
 	def ElementStress(self, stress, displacement):
 		"""
 		Calculate element stress
 		"""
-		material = self._ElementMaterial
+		material = self.GetElementMaterial()
+		nodes = self.GetNodes()
 
 		DX = np.zeros(3)
 		L2 = 0
 
 		for i in range(3):
-			DX[i] = self._nodes[1].XYZ[i] - self._nodes[0].XYZ[i]
+			DX[i] = nodes[1].XYZ[i] - nodes[0].XYZ[i]
 			L2 += (DX[i] * DX[i])
 
 		S = np.zeros(6)
@@ -163,7 +169,50 @@ class CBar(CElement):
 			S[i] = -DX[i]*material.E/L2
 			S[i+3] = -S[i]
 
+		LocationMatrix = self.GetLocationMatrix()
+
 		stress[0] = 0.0
 		for i in range(6):
-			if self._LocationMatrix[i]:
-				stress[0] += (S[i]*displacement[self._LocationMatrix[i]-1])
+			if LocationMatrix[i]:
+				stress[0] += (S[i]*displacement[LocationMatrix[i]-1])
+
+	@classmethod
+	def GroupStress(cls, group, Displacement, Elements=None):
+		"""
+		Calculate the stresses of all bars in group (or of the bars with
+		indices Elements) for all load cases
+		"""
+		if Elements is None:
+			Elements = slice(None)
+		return cls.BatchStress(group.GetElementCoordinates()[Elements],
+							   group.GetMaterialProperty('E')[Elements],
+							   group.GetLocationMatrices()[Elements], Displacement)
+
+	@staticmethod
+	def BatchStress(XYZ, E, LocationMatrices, Displacement):
+		"""
+		Calculate the stresses of a batch of bars for all load cases with
+		the same operations as ElementStress
+
+		:param XYZ: (np.ndarray) (NUME, 2, 3) nodal coordinates of the bars
+		:param E: (np.ndarray) (NUME,) Young's modulus of the bars
+		:param LocationMatrices: (np.ndarray) (NUME, 6) location matrices
+		:param Displacement: (np.ndarray) (NEQ, NLCASE) displacements
+		:return: (np.ndarray) (NUME, NLCASE) stresses
+		"""
+		DX = XYZ[:, 1, :] - XYZ[:, 0, :]
+		L2 = DX[:, 0]*DX[:, 0] + DX[:, 1]*DX[:, 1] + DX[:, 2]*DX[:, 2]
+
+		S = np.empty((len(DX), 6))
+		for i in range(3):
+			S[:, i] = -DX[:, i]*E/L2
+			S[:, i+3] = -S[:, i]
+
+		# Displacements of the element DOFs, zero for DOFs without equation
+		U = np.vstack((np.zeros((1, Displacement.shape[1])), Displacement))
+
+		stress = np.zeros((len(DX), Displacement.shape[1]))
+		for i in range(6):
+			stress += S[:, i, np.newaxis]*U[LocationMatrices[:, i]]
+
+		return stress
@@ -12,6 +12,7 @@
 /*     http://www.comdyn.cn/                                                 */
 /*****************************************************************************/
 """
+import numpy as np
 import abc
 
 
@@ -19,32 +20,25 @@ class CElement(metaclass=abc.ABCMeta):
 	"""
 	Element base class
 	All type of element classes should be derived from this base class
+
+	The data of all elements in a group are stored as arrays in the
+	CElementGroup; an element object is a lightweight view of one row
+	of these arrays.
 	"""
-	def __init__(self):
-		# Number of nodes per element
-		self._NEN = 0
+	# Number of nodes per element
+	NEN = 0
 
-		# Node list of the element
-		self._nodes = []
+	# Dimension of the location matrix
+	ND = 0
 
-		# Material of the element
-		self._ElementMaterial = None
+	__slots__ = ('_group', '_index')
 
-		# Location Matrix of the element
-		self._LocationMatrix = None
+	def __init__(self, group, index):
+		# Element group storing the data of this element
+		self._group = group
 
-		# Dimension of the location matrix
-		self._ND = 0
-
-	@abc.abstractmethod
-	def Read(self, input_file, Ele, MaterialSets, NodeList):
-		""" Read element data from stream Input """
-		pass
-
-	@abc.abstractmethod
-	def Write(self, output_file, Ele):
-		""" Write element data to stream """
-		pass
+		# Index of the element in its group (numbering starting from 0)
+		self._index = index
 
 	@abc.abstractmethod
 	def GenerateLocationMatrix(self):
@@ -62,26 +56,70 @@ class CElement(metaclass=abc.ABCMeta):
 		"""
 		pass
 
+	@classmethod
+	def GroupStiffness(cls, group):
+		"""
+		Calculate the stiffness matrices of all elements in group, returned
+		as a (NUME, SizeOfStiffnessMatrix) array. Element types with a
+		batched kernel override this element by element evaluation.
+		"""
+		NUME = group.GetNUME()
+		Matrices = np.zeros((NUME, cls(group, 0).SizeOfStiffnessMatrix()))
+		for Ele in range(NUME):
+			cls(group, Ele).ElementStiffness(Matrices[Ele])
+
+		return Matrices
+
+	@classmethod
+	def BatchInputs(cls, group):
+		"""
+		Return the arrays (element along the first axis) from which
+		BatchStiffness calculates the stiffness matrices of any subset of
+		the elements of group, or None if the element type has no batched
+		kernel
+		"""
+		return None
+
 	@abc.abstractmethod
 	def ElementStress(self, stress, displacement):
 		""" Calculate element stress """
 		pass
 
+	@classmethod
+	def GroupStress(cls, group, Displacement, Elements=None):
+		"""
+		Calculate the stresses of all elements in group (or of the elements
+		with indices Elements) for all load cases (columns of Displacement),
+		returned as a (NUME, NLCASE) array. Element types with a batched
+		kernel override this element by element evaluation.
+		"""
+		if Elements is None:
+			Elements = range(group.GetNUME())
+		NLCASE = Displacement.shape[1]
+		stress = np.zeros((len(Elements), NLCASE))
+		for row, Ele in enumerate(Elements):
+			for lcase in range(NLCASE):
+				cls(group, Ele).ElementStress(stress[row, lcase:lcase+1],
+											  Displacement[:, lcase])
+
+		return stress
+
 	def GetNodes(self):
 		""" Return nodes of the element """
-		return self._nodes
+		NodeList = self._group.GetNodeList()
+		return [NodeList[N] for N in self._group.GetConnectivity()[self._index]]
 
 	def GetElementMaterial(self):
 		""" Return material of the element """
-		return self._ElementMaterial
+		return self._group.GetMaterial(self._group.GetMaterialIndex()[self._index])
 
 	def GetLocationMatrix(self):
-		""" Return the Location Matrix of the element """
-		return self._LocationMatrix
+		""" Return the Location Matrix of the element (a view of its group) """
+		return self._group.GetLocationMatrices()[self._index]
 
 	def GetND(self):
 		""" Return the dimension of the location matrix """
-		return self._ND
+		return self.ND
 
 	@abc.abstractmethod
 	def SizeOfStiffnessMatrix(self):
@@ -16,6 +16,8 @@ import sys
 sys.path.append('../')
 from element.Bar import CBar
 from element.Material import CBarMaterial
+from utils.BlockReader import ReadBlock, CheckOrder
+import numpy as np
 
 # dictionary: Define set of element types
 ElementTypes = {0:'UNDEFINED',
@@ -30,11 +32,18 @@ ElementTypes = {0:'UNDEFINED',
 
 class CElementGroup(object):
 	""" Element group class """
-	def __init__(self):
-		from Domain import Domain
-		FEMData = Domain()
-		# List of all nodes in the domain, obtained from CDomain object
-		self._NodeList = FEMData.GetNodeList()
+	def __init__(self, NodeList, XYZ, bcode):
+		"""
+		:param NodeList: (list(CNode)) list of all nodes in the domain
+		:param XYZ: (np.ndarray) (NUMNP, 3) nodal coordinates of the domain
+		:param bcode: (np.ndarray) (NUMNP, 3) equation numbers of the domain
+		"""
+		# List of all nodes in the domain
+		self._NodeList = NodeList
+
+		# Nodal coordinates and equation numbers (NUMNP, 3) of the domain
+		self._XYZ = XYZ
+		self._bcode = bcode
 
 		# Element type of this group
 		self._ElementType = 0
@@ -42,8 +51,18 @@ class CElementGroup(object):
 		# Number of elements in this group
 		self._NUME = 0
 
-		# Element List in this group
-		self._ElementList = []
+		# Element class of this group (e.g. CBar), element objects returned
+		# by operator [] are views of the arrays below
+		self._ElementClass = None
+
+		# Node indices (numbering starting from 0) of all elements, (NUME, NEN)
+		self._Connectivity = None
+
+		# Material set index (numbering starting from 0) of all elements
+		self._MaterialIndex = None
+
+		# Location matrices of all elements, (NUME, ND)
+		self._LocationMatrix = None
 
 		# Number of material/section property sets in this group
 		self._NUMMAT = 0
@@ -52,12 +71,33 @@ class CElementGroup(object):
 		self._MaterialList = []
 
 	def __getitem__(self, item):
-		""" operator [] """
-		return self._ElementList[item]
+		""" operator [], return a view of element item """
+		if item < 0:
+			item += self._NUME
+		if not 0 <= item < self._NUME:
+			raise IndexError("Element index {} out of range".format(item))
+
+		return self._ElementClass(self, item)
+
+	def __len__(self):
+		return self._NUME
 
 	def GetMaterial(self, index):
 		return self._MaterialList[index]
 
+	def GetNodeList(self):
+		return self._NodeList
+
+	def GetConnectivity(self):
+		return self._Connectivity
+
+	def GetMaterialIndex(self):
+		return self._MaterialIndex
+
+	def GetLocationMatrices(self):
+		""" Return the (NUME, ND) location matrices of all elements """
+		return self._LocationMatrix
+
 	def GetElementType(self):
 		return self._ElementType
 
@@ -67,16 +107,57 @@ class CElementGroup(object):
 	def GetNUMMAT(self):
 		return self._NUMMAT
 
+	def GetElementClass(self):
+		return self._ElementClass
+
+	def GetElementCoordinates(self):
+		""" Return the (NUME, NEN, 3) nodal coordinates of all elements """
+		return self._XYZ[self._Connectivity]
+
+	def GetMaterialProperty(self, name):
+		"""
+		Return material property name (e.g. 'E') of all elements
+
+		:return: (np.ndarray) (NUME,) property of the material set of each element
+		"""
+		values = np.array([getattr(material, name) for material in self._MaterialList],
+						  dtype=np.double)
+		return values[self._MaterialIndex]
+
+	def ElementStiffness(self):
+		"""
+		Calculate the packed stiffness matrices of all elements in this
+		group, a (NUME, SizeOfStiffnessMatrix) array
+		"""
+		return self._ElementClass.GroupStiffness(self)
+
+	def ElementStress(self, Displacement, Elements=None):
+		"""
+		Calculate the stresses of all elements in this group, or of the
+		elements with indices Elements (numbering starting from 0)
+
+		:param Displacement: (np.ndarray) (NEQ, NLCASE) displacements
+		:return: (np.ndarray) (NUME, NLCASE) stresses, or (len(Elements), NLCASE)
+		"""
+		return self._ElementClass.GroupStress(self, Displacement, Elements)
+
+	def GenerateLocationMatrices(self):
+		"""
+		Generate the location matrices of all elements: the global equation
+		numbers corresponding to each DOF of the element nodes
+		"""
+		self._LocationMatrix[:] = self._bcode[self._Connectivity].reshape(self._NUME, -1)
+
 	def AllocateElements(self, amount):
 		"""
-		Allocate array of derived elements
+		Allocate arrays of derived elements
 
 		:param amount: (int) the amount of elements
 		:return:
 		"""
 		element_type = ElementTypes.get(self._ElementType)
 		if element_type == 'Bar':
-			self._ElementList = [CBar() for _ in range(amount)]
+			self._ElementClass = CBar
 		elif element_type == 'Q4':
 			# implementation for other element types by yourself
 			# ...
@@ -86,6 +167,10 @@ class CElementGroup(object):
 						 "AllocateElement.".format(self._ElementType)
 			raise ValueError(error_info)
 
+		self._Connectivity = np.zeros((amount, self._ElementClass.NEN), dtype=np.int64)
+		self._MaterialIndex = np.zeros(amount, dtype=np.int64)
+		self._LocationMatrix = np.zeros((amount, self._ElementClass.ND), dtype=np.int64)
+
 	def AllocateMaterials(self, amount):
 		"""
 		Allocate array of derived materials
@@ -117,6 +202,29 @@ class CElementGroup(object):
 
 		return True
 
+	def Restore(self, ElementType, Materials, Connectivity, MaterialIndex):
+		"""
+		Define the element group from arrays, e.g. from the binary model cache
+
+		:param ElementType: (int) element type of this group
+		:param Materials: (list(dict)) attributes of each material set
+		:param Connectivity: (np.ndarray) (NUME, NEN) node indices
+		:param MaterialIndex: (np.ndarray) (NUME,) material set indices
+		:return: None
+		"""
+		self._ElementType = ElementType
+		self._NUME = len(Connectivity)
+		self._NUMMAT = len(Materials)
+
+		self.AllocateMaterials(self._NUMMAT)
+		for material, attributes in zip(self._MaterialList, Materials):
+			for name, value in attributes.items():
+				setattr(material, name, value)
+
+		self.AllocateElements(self._NUME)
+		self._Connectivity = Connectivity
+		self._MaterialIndex = MaterialIndex
+
 	def ReadElementData(self, input_file):
 		""" Read bar element data from the input data file """
 		# Read material/section property lines
@@ -133,12 +241,20 @@ class CElementGroup(object):
 		# Read element data lines
 		self.AllocateElements(self._NUME)
 
-		# Loop over for all elements in this element group
-		for Ele in range(self._NUME):
-			try:
-				self[Ele].Read(input_file, Ele, self._MaterialList, self._NodeList)
-			except ValueError as e:
-				print(e)
-				return False
+		# Read all element lines (element number, nodes, material set)
+		# of this element group as one block
+		NEN = self._ElementClass.NEN
+		try:
+			block = ReadBlock(input_file, self._NUME, NEN + 2, "element")
+			CheckOrder(block[:, 0],
+					   "\n*** Error *** Elements must be inputted in order !"
+					   "\n   Expected element : {}"
+					   "\n   Provided element : {}")
+		except ValueError as e:
+			print(e)
+			return False
+
+		self._Connectivity[:] = block[:, 1:NEN + 1] - 1
+		self._MaterialIndex[:] = block[:, NEN + 1] - 1
 
 		return True
@@ -29,10 +29,6 @@ class CMaterial(metaclass=abc.ABCMeta):
 	def Read(self, input_file, mset):
 		pass
 
-	@abc.abstractmethod
-	def Write(self, output_file):
-		pass
-
 
 class CBarMaterial(CMaterial):
 	""" Material class for bar element """
@@ -46,23 +42,12 @@ class CBarMaterial(CMaterial):
 		"""
 		line = input_file.readline().split()
 
-		self.nset = np.int(line[0])
+		self.nset = int(line[0])
 		if self.nset != mset + 1:
 			error_info = "\n*** Error *** Material sets must be inputted in order !" \
 						 "\n   Expected set : {}" \
 						 "\n   Provided set : {}".format(mset + 1, self.nset)
 			raise ValueError(error_info)
 
-		self.E = np.double(line[1])
-		self.Area = np.double(line[2])
-
-	def Write(self, output_file):
-		"""
-		Write material data to Stream
-		"""
-		material_info = "%5d%16.6e%16.6e\n"%(self.nset, self.E, self.Area)
-
-		# print the material info on the screen
-		print(material_info, end='')
-		# write the material info to output file
-		output_file.write(material_info)
\ No newline at end of file
+		self.E = float(line[1])
+		self.Area = float(line[2])
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+/*****************************************************************************/
+/*  STAPpy : A python FEM code sharing the same input data file with STAP90  */
+/*     Computational Dynamics Laboratory                                     */
+/*     School of Aerospace Engineering, Tsinghua University                  */
+/*                                                                           */
+/*     Created on Mon Jun 22, 2020                                           */
+/*                                                                           */
+/*     @author: thurcni@163.com, xzhang@tsinghua.edu.cn                      */
+/*     http://www.comdyn.cn/                                                 */
+/*****************************************************************************/
+"""
+import sys
+sys.path.append('../')
+from solver.Solver import CSolver
+from solver.LDLTSolver import CLDLTSolver
+import numpy as np
+
+
+class CMixedPrecisionSolver(CSolver):
+	"""
+	Mixed precision LDLT solver: A single precision copy of the skyline
+	matrix is factorized, and the double precision solution is recovered
+	by iterative refinement with residuals of the double precision matrix.
+	If the refinement stagnates, the matrix is factorized in double
+	precision instead and the refinement continues with these factors.
+
+	The refinement stops on the normwise backward error of each load case,
+	|f - K*u| <= Tolerance*(|K|*|u| + |f|) in the infinity norm, which
+	the double precision factorization itself attains for Tolerance of
+	the order of NEQ*eps.
+	"""
+	def __init__(self, K, Tolerance=None, MaxRefinements=10, Threads=1):
+		self.K = K			# Global Stiffness matrix in Skyline storage
+
+		# Convergence criterion on the backward error of each load case
+		# (default: NEQ, at least 16, times the double precision machine
+		# epsilon)
+		if Tolerance is None:
+			Tolerance = max(K.dim(), 16)*np.finfo(np.double).eps
+		self.Tolerance = Tolerance
+
+		# Maximum number of refinement steps with the factors of one precision
+		self.MaxRefinements = MaxRefinements
+
+		# Number of threads of the factorizations
+		self.Threads = Threads
+
+		# Solver of the single (or, after the fallback, double) precision factors
+		self.Factor = None
+
+		# True if the double precision factorization has been used
+		self.Fallback = False
+
+		# |K| in the infinity norm
+		self.NormK = 0.0
+
+		# Number of refinement steps, relative residual norms |f - K*u|/|f|
+		# and backward errors reached for each load case, and whether all
+		# backward errors are within the tolerance
+		self.Refinements = 0
+		self.Residuals = None
+		self.BackwardErrors = None
+		self.Converged = False
+
+	def GetResiduals(self):
+		return self.Residuals
+
+	def GetBackwardErrors(self):
+		return self.BackwardErrors
+
+	def LDLT(self):
+		""" LDLT facterization of the single precision copy of K """
+		self.Fallback = False
+		self.NormK = self.K.Multiply(np.ones(self.K.dim()), Absolute=True).max(initial=0.0)
+		self.Factor = CLDLTSolver(self.K.AsType(np.float32), Threads=self.Threads)
+
+		try:
+			self.Factor.LDLT()
+		except ValueError:
+			# A pivot lost in single precision
+			self.FactorizeDouble()
+
+	def FactorizeDouble(self):
+		""" LDLT facterization of a double precision copy of K """
+		self.Fallback = True
+
+		# Release the single precision factors before the copy
+		self.Factor = None
+		self.Factor = CLDLTSolver(self.K.AsType(np.double), Threads=self.Threads)
+		self.Factor.LDLT()
+
+	def Residual(self, Force, Displacement):
+		"""
+		Return the residual f - K*u of all load cases, calculated in one
+		pass over K, and the backward error of each load case
+		"""
+		R = Force - self.K.Multiply(Displacement)
+
+		scale = self.NormK*np.abs(Displacement).max(axis=0, initial=0.0) + \
+				np.abs(Force).max(axis=0, initial=0.0)
+		scale[scale == 0] = 1.0
+
+		return R, np.abs(R).max(axis=0, initial=0.0)/scale
+
+	def BackSubstitution(self, Force):
+		"""
+		Solve with the single precision factors and refine the solution.
+		Force is a vector or a matrix with one load case per column, and
+		is overwritten by the displacements
+		"""
+		Forces = Force.reshape(self.K.dim(), -1)
+		F = Forces.copy()
+
+		U = F.copy()
+		self.Factor.BackSubstitution(U)
+		R, self.BackwardErrors = self.Residual(F, U)
+
+		self.Refinements = 0
+		steps = 0
+		previous = None
+		while self.BackwardErrors.max() > self.Tolerance:
+			# Stagnation: the factors are not accurate enough for K
+			if steps == self.MaxRefinements or \
+					(previous is not None and self.BackwardErrors.max() > 0.5*previous):
+				if self.Fallback:
+					break
+
+				self.FactorizeDouble()
+				U[:] = F
+				self.Factor.BackSubstitution(U)
+				R, self.BackwardErrors = self.Residual(F, U)
+				steps = 0
+				previous = None
+				continue
+
+			# Correction with the current factors
+			self.Factor.BackSubstitution(R)
+			U += R
+
+			previous = self.BackwardErrors.max()
+			R, self.BackwardErrors = self.Residual(F, U)
+			self.Refinements += 1
+			steps += 1
+
+		self.Converged = bool(self.BackwardErrors.max() <= self.Tolerance)
+
+		norm = np.linalg.norm(F, axis=0)
+		norm[norm == 0] = 1.0
+		self.Residuals = np.linalg.norm(R, axis=0)/norm
+
+		Forces[:] = U
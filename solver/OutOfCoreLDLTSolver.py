@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+/*****************************************************************************/
+/*  STAPpy : A python FEM code sharing the same input data file with STAP90  */
+/*     Computational Dynamics Laboratory                                     */
+/*     School of Aerospace Engineering, Tsinghua University                  */
+/*                                                                           */
+/*     Created on Mon Jun 22, 2020                                           */
+/*                                                                           */
+/*     @author: thurcni@163.com, xzhang@tsinghua.edu.cn                      */
+/*     http://www.comdyn.cn/                                                 */
+/*****************************************************************************/
+"""
+import sys
+sys.path.append('../')
+from solver.Solver import CSolver
+import numpy as np
+
+
+class COutOfCoreLDLTSolver(CSolver):
+	"""
+	Out of core LDLT solver: The skyline matrix is kept in a memory-mapped
+	scratch file and factorized block by block with the column reduction
+	scheme. At most two column blocks are resident at a time: the block
+	being factorized and one previous block it is reduced against.
+	"""
+	def __init__(self, K):
+		self.K = K			# Global Stiffness matrix in out of core Skyline storage
+
+		# Diagonal D of the factorization, kept in core
+		self.D = None
+
+	def Column(self, block, first, j):
+		""" Return a view of column j in the block starting at column first """
+		DiagonalAddress = self.K.GetDiagonalAddress()
+		offset = DiagonalAddress[first - 1]
+
+		return block[DiagonalAddress[j - 1] - offset:DiagonalAddress[j] - offset]
+
+	def LDLT(self):
+		""" LDLT facterization of the column blocks in turn """
+		N = self.K.dim()
+		ColumnHeights = self.K.GetColumnHeights()
+		blocks = self.K.ColumnBlocks()
+
+		self.D = np.zeros(N, dtype=np.double)
+
+		for b, (first, last) in enumerate(blocks):
+			B = self.K.ReadColumnBlock(first, last)
+
+			# First row of the skyline of the columns in the block
+			columns = np.arange(first, last + 1)
+			first_row = int((columns - ColumnHeights[first - 1:last]).min())
+
+			# Reduce with the previous blocks reaching into the skyline
+			for previous_first, previous_last in blocks[:b]:
+				if previous_last <= first_row:
+					continue
+
+				A = self.K.ReadColumnBlock(previous_first, previous_last)
+				self.ReduceColumns(B, first, range(first, last + 1),
+								   A, previous_first, previous_last)
+				del A
+
+			# Reduce with the columns of the block itself and factorize
+			for j in range(first, last + 1):
+				self.ReduceColumns(B, first, [j], B, first, j - 1)
+				self.FactorizeColumn(self.Column(B, first, j), j)
+
+			self.K.WriteColumnBlock(first, last, B)
+			del B
+
+	def ReduceColumns(self, B, first, columns, A, previous_first, previous_last):
+		"""
+		Reduce the given columns of block B (starting at column first) with
+		the factorized columns previous_first:previous_last of block A
+		"""
+		ColumnHeights = self.K.GetColumnHeights()
+
+		for j in columns:
+			mj = j - ColumnHeights[j - 1]
+			Kj = self.Column(B, first, j)
+
+			for i in range(max(mj + 1, previous_first), min(j - 1, previous_last) + 1):
+				m = max(i - ColumnHeights[i - 1], mj)
+				if m == i:
+					continue
+
+				# Rows i-1 down to m of column i and column j
+				Ki = self.Column(A, previous_first, i)
+				Kj[j - i] -= np.dot(Ki[1:i - m + 1], Kj[j - i + 1:j - m + 1])
+
+	def FactorizeColumn(self, Kj, j):
+		""" Divide the reduced column j by D and calculate its pivot """
+		Hj = len(Kj) - 1
+		if Hj:
+			# Rows j-1 down to mj
+			U = Kj[1:].copy()
+			L = U/self.D[j - Hj - 1:j - 1][::-1]
+
+			Kj[0] -= np.dot(L, U)		# D_jj = K_jj - sum(L_rj*U_rj)
+			Kj[1:] = L				# L_rj = U_rj / D_rr
+
+		if Kj[0] <= sys.float_info.min:
+			error_info = "\n*** Error *** Stiffness matrix is not positive definite !" \
+						 "\n    Euqation no = {}" \
+						 "\n    Pivot = {}".format(j, Kj[0])
+			raise ValueError(error_info)
+
+		self.D[j - 1] = Kj[0]
+
+	def BackSubstitution(self, Force):
+		"""
+		Solve displacement by back substitution, reading the column blocks
+		forward for the reduction and backward for the back substitution
+
+		:param Force: (np.ndarray) load vector of length NEQ, or NEQ x NLCASE
+			matrix holding one load case per column. Overwritten in place
+			by the displacements.
+		"""
+		ColumnHeights = self.K.GetColumnHeights()
+		blocks = self.K.ColumnBlocks()
+
+		# Reduce right-hand-side load vector (LV = R)
+		for first, last in blocks:
+			B = self.K.ReadColumnBlock(first, last)
+			for i in range(first, last + 1):
+				mi = i - ColumnHeights[i - 1]
+				if mi == i:
+					continue
+
+				# V_i = R_i - sum_j (L_ji V_j), j = i-1 down to mi
+				Force[i - 1] -= np.dot(self.Column(B, first, i)[1:],
+									   Force[mi - 1:i - 1][::-1])
+			del B
+
+		# Back substitute (Vbar = D^(-1) V, L^T a = Vbar)
+		Force /= self.D.reshape(self.D.shape + (1,)*(Force.ndim - 1))
+
+		for first, last in reversed(blocks):
+			B = self.K.ReadColumnBlock(first, last)
+			for j in range(last, first - 1, -1):
+				mj = j - ColumnHeights[j - 1]
+				if mj == j:
+					continue
+
+				# a_i = Vbar_i - L_ij Vbar_j, i = mj:j-1
+				Force[mj - 1:j - 1] -= np.multiply.outer(self.Column(B, first, j)[:0:-1],
+														 Force[j - 1])
+			del B
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+/*****************************************************************************/
+/*  STAPpy : A python FEM code sharing the same input data file with STAP90  */
+/*     Computational Dynamics Laboratory                                     */
+/*     School of Aerospace Engineering, Tsinghua University                  */
+/*                                                                           */
+/*     Created on Mon Jun 22, 2020                                           */
+/*                                                                           */
+/*     @author: thurcni@163.com, xzhang@tsinghua.edu.cn                      */
+/*     http://www.comdyn.cn/                                                 */
+/*****************************************************************************/
+"""
+import sys
+sys.path.append('../')
+from solver.Solver import CSolver
+from utils.Options import Preconditioners
+import numpy as np
+
+# The triangular solves of IC(0) are run by SuperLU if SciPy is installed
+try:
+	import scipy.sparse.linalg
+except ImportError:
+	scipy = None
+
+
+def LevelSchedule(targets, sources, N, reverse=False):
+	"""
+	Group the unknowns of a unit triangular system into levels, so that
+	all unknowns of a level only depend on unknowns of previous levels
+	and are solved together
+
+	:param targets: (np.ndarray) unknown (numbering starting from 0)
+		updated by each off-diagonal entry
+	:param sources: (np.ndarray) unknown the update of each entry depends on
+	:param N: (int) number of unknowns
+	:param reverse: (bool) True if the unknowns depend on unknowns with
+		larger numbers (backward substitution)
+	:return: (list) (unknowns, entries, sources, starts) of each level,
+		unknown unknowns[k] is updated by entries[starts[k]:starts[k+1]]
+	"""
+	entries = np.argsort(targets, kind='stable')
+	pointers = np.zeros(N + 1, dtype=np.int64)
+	np.cumsum(np.bincount(targets, minlength=N), out=pointers[1:])
+
+	sorted_sources = sources[entries]
+	level = np.zeros(N, dtype=np.int64)
+	for n in (range(N - 1, -1, -1) if reverse else range(N)):
+		depends = sorted_sources[pointers[n]:pointers[n + 1]]
+		if len(depends):
+			level[n] = level[depends].max() + 1
+
+	# Sort the entries by level, and by target within a level
+	entries = entries[np.argsort(level[targets[entries]], kind='stable')]
+	entry_level = level[targets[entries]]
+	bounds = np.searchsorted(entry_level, np.arange(1, level.max(initial=0) + 2))
+
+	schedule = []
+	for first, last in zip(bounds[:-1], bounds[1:]):
+		level_entries = entries[first:last]
+		unknowns, starts = np.unique(targets[level_entries], return_index=True)
+		schedule.append((unknowns, level_entries, sources[level_entries], starts))
+
+	return schedule
+
+
+def SolveUnitTriangular(schedule, values, b):
+	"""
+	Solve a unit triangular system with the level schedule of its
+	off-diagonal entries values, b is overwritten by the solution
+	"""
+	for unknowns, entries, sources, starts in schedule:
+		b[unknowns] -= np.add.reduceat(values[entries]*b[sources], starts)
+
+
+class CPCGSolver(CSolver):
+	"""
+	PCG solver: An iterative solver using the preconditioned conjugate
+	gradient method on the stiffness matrix in compressed sparse column
+	storage, or on the matrix-free element by element stiffness operator
+	(Jacobi preconditioner only). The load cases are solved one by one,
+	each starting from the solution of the previous load case.
+	"""
+	def __init__(self, K, Preconditioner='jacobi', Tolerance=1.0e-10, MaxIterations=None):
+		self.K = K			# Global Stiffness matrix in CSC storage or operator
+
+		# Preconditioner, see Preconditioners
+		self.Preconditioner = Preconditioner
+
+		# Convergence criterion |f - K*u| <= Tolerance*|f|
+		self.Tolerance = Tolerance
+
+		# Maximum number of iterations of each load case
+		self.MaxIterations = 10*K.dim() if MaxIterations is None else MaxIterations
+
+		# Inverse of the diagonal of K (Jacobi), or D and U of the
+		# incomplete factorization U(T)*D*U of K in the storage of K (IC(0))
+		self.M = None
+
+		# Diagonal shift applied to K to complete the IC(0) factorization
+		self.Shift = 0.0
+
+		# SuperLU factorization of the unit upper triangular U of IC(0),
+		# applied by the compiled triangular solves of SuperLU if SciPy is
+		# installed, and level schedules of the triangular solves with
+		# U(T) and U otherwise
+		self.TriangularFactor = None
+		self.ForwardSchedule = None
+		self.BackwardSchedule = None
+
+		# Number of iterations and relative residual norms of each load case
+		self.Iterations = []
+		self.ResidualHistory = []
+
+	def GetIterations(self):
+		return self.Iterations
+
+	def GetResidualHistory(self):
+		return self.ResidualHistory
+
+	def LDLT(self):
+		"""
+		Set up the preconditioner. The stiffness matrix itself is not
+		factorized by the iterative solver.
+		"""
+		if self.Preconditioner == 'jacobi':
+			diagonal = self.K.Diagonal()
+			if not np.all(diagonal > 0):
+				j = int(np.argmin(diagonal > 0))
+				error_info = "\n*** Error *** Stiffness matrix is not positive definite !" \
+							 "\n    Euqation no = {}" \
+							 "\n    Pivot = {}".format(j + 1, diagonal[j])
+				raise ValueError(error_info)
+			self.M = 1.0/diagonal
+		elif self.Preconditioner == 'ic0':
+			if not hasattr(self.K, 'GetRowIndex'):
+				error_info = "\n*** Error *** Preconditioner ic0 requires the " \
+							 "stiffness matrix in compressed sparse column storage."
+				raise ValueError(error_info)
+
+			self.IncompleteCholesky()
+
+			if scipy is not None:
+				self.FactorizeTriangular()
+				return
+
+			rows = self.K.GetRowIndex() - 1
+			columns = self.K.GetColumnIndex() - 1
+			upper = rows < columns
+			self.ForwardSchedule = LevelSchedule(
+				columns[upper], rows[upper], self.K.dim())
+			self.BackwardSchedule = LevelSchedule(
+				rows[upper], columns[upper], self.K.dim(), reverse=True)
+
+			# Map the scheduled entries from the off-diagonal entries to self.M
+			offdiagonal = np.flatnonzero(upper)
+			for schedule in (self.ForwardSchedule, self.BackwardSchedule):
+				for k, (unknowns, entries, sources, starts) in enumerate(schedule):
+					schedule[k] = (unknowns, offdiagonal[entries], sources, starts)
+		else:
+			error_info = "\n*** Error *** Preconditioner {} is not available.".format(
+				self.Preconditioner)
+			raise ValueError(error_info)
+
+	def FactorizeTriangular(self):
+		"""
+		Set up the SuperLU factorization of the unit upper triangular U of
+		IC(0). Without column ordering nor row pivoting, SuperLU keeps U as
+		its upper factor with an identity lower factor, so that no fill-in
+		occurs and each solve is one compiled triangular substitution.
+		"""
+		N = self.K.dim()
+		pointers = self.K.GetColumnPointer()
+
+		values = self.M.copy()
+		values[pointers[1:] - 1] = 1.0
+		U = scipy.sparse.csc_matrix((values, self.K.GetRowIndex() - 1, pointers),
+									shape=(N, N))
+
+		self.TriangularFactor = scipy.sparse.linalg.splu(
+			U, permc_spec='NATURAL', diag_pivot_thresh=0.0)
+
+	def IncompleteCholesky(self):
+		"""
+		Incomplete L*D*L(T) factorization without fill-in, IC(0). If a
+		pivot is not positive, the factorization is restarted with the
+		diagonal of K scaled by (1 + Shift).
+		"""
+		Shift = 0.0
+		while not self.FactorizeIC0(Shift):
+			Shift = max(2.0*Shift, 1.0e-3)
+			if Shift > 1.0:
+				error_info = "\n*** Error *** Incomplete Cholesky factorization failed !" \
+							 "\n    Stiffness matrix is not positive definite"
+				raise ValueError(error_info)
+
+		self.Shift = Shift
+
+	def FactorizeIC0(self, Shift):
+		"""
+		Factorize K with its diagonal scaled by (1 + Shift) into self.M.
+
+		Each column of the factor depends on the factorized columns of its
+		pattern, a chain running through all the columns of a connected
+		model, so the factorization reduces one stored entry at a time with
+		a dot product. Its cost grows like NWK, as the cost of one PCG
+		iteration does, and is about that of 150 to 200 iterations of
+		IC(0) PCG: IC(0) pays off on models needing far more Jacobi
+		iterations than that (see benchmark/PCGBenchmark.py)
+		"""
+		N = self.K.dim()
+		pointers = self.K.GetColumnPointer()
+		rows = self.K.GetRowIndex() - 1
+		diagonal = pointers[1:] - 1
+
+		M = self.K.GetData().copy()
+		M[diagonal] *= 1.0 + Shift
+
+		# Column j of G scattered to its rows, zero elsewhere
+		w = np.zeros(N, dtype=np.double)
+
+		for j in range(N):
+			first, last = pointers[j], diagonal[j]
+			rows_j = rows[first:last]
+
+			# G(r, j) = D(r)*U(r, j), reduced in place in column j of M.
+			# The rows of column i are above row i, where w holds the
+			# reduced G(r, j) of the pattern of column j
+			G = M[first:last]
+			w[rows_j] = G
+			for p in range(last - first):
+				i = rows_j[p]
+				a, b = pointers[i], diagonal[i]
+				if a < b:
+					G[p] -= np.dot(M[a:b], w[rows[a:b]])
+					w[i] = G[p]
+			w[rows_j] = 0.0
+
+			U = G/M[diagonal[rows_j]]
+			M[diagonal[j]] -= np.dot(G, U)
+			G[:] = U
+
+			if M[diagonal[j]] <= 0:
+				return False
+
+		self.M = M
+		return True
+
+	def Precondition(self, r):
+		""" Return the preconditioned residual z = M^(-1)*r """
+		if self.Preconditioner == 'jacobi':
+			return self.M*r
+
+		D = self.M[self.K.GetColumnPointer()[1:] - 1]
+
+		if self.TriangularFactor is not None:
+			z = self.TriangularFactor.solve(r, trans='T')
+			z /= D
+			return self.TriangularFactor.solve(z)
+
+		z = r.copy()
+		SolveUnitTriangular(self.ForwardSchedule, self.M, z)
+		z /= D
+		SolveUnitTriangular(self.BackwardSchedule, self.M, z)
+
+		return z
+
+	def BackSubstitution(self, Force):
+		"""
+		Solve the load cases one by one. Force is a vector or a matrix
+		with one load case per column, and is overwritten by the displacements
+		"""
+		Forces = Force.reshape(self.K.dim(), -1)
+
+		self.Iterations = []
+		self.ResidualHistory = []
+
+		u = np.zeros(self.K.dim(), dtype=np.double)
+		for lcase in range(Forces.shape[1]):
+			f = Forces[:, lcase].copy()
+
+			# Warm start from the solution of the previous load case,
+			# scaled to minimize the energy norm of the error
+			Ku = self.K.Multiply(u)
+			uKu = np.dot(u, Ku)
+			alpha = np.dot(u, f)/uKu if uKu > 0 else 0.0
+
+			u *= alpha
+			history = self.ConjugateGradient(f, u, f - alpha*Ku)
+
+			self.Iterations.append(len(history) - 1)
+			self.ResidualHistory.append(np.array(history))
+
+			if history[-1] > self.Tolerance:
+				error_info = "\n*** Error *** PCG solver did not converge !" \
+							 "\n    Load case = {}" \
+							 "\n    Iterations = {}" \
+							 "\n    Relative residual = {}".format(
+					lcase + 1, len(history) - 1, history[-1])
+				raise ValueError(error_info)
+
+			Forces[:, lcase] = u
+
+	def ConjugateGradient(self, f, u, r):
+		"""
+		Preconditioned conjugate gradient iterations for K*u = f
+
+		:param u: (np.ndarray) initial guess, overwritten by the solution
+		:param r: (np.ndarray) initial residual f - K*u
+		:return: (list) relative residual norms |r|/|f| of all iterations
+		"""
+		norm_f = np.linalg.norm(f)
+		if norm_f == 0:
+			u[:] = 0.0
+			return [0.0]
+
+		history = [np.linalg.norm(r)/norm_f]
+
+		z = self.Precondition(r)
+		p = z.copy()
+		rz = np.dot(r, z)
+
+		while history[-1] > self.Tolerance and len(history) <= self.MaxIterations:
+			q = self.K.Multiply(p)
+			alpha = rz/np.dot(p, q)
+
+			u += alpha*p
+			r -= alpha*q
+			history.append(np.linalg.norm(r)/norm_f)
+
+			z = self.Precondition(r)
+			rz_new = np.dot(r, z)
+			p *= rz_new/rz
+			p += z
+			rz = rz_new
+
+		return history
@@ -28,5 +28,8 @@ class CSolver(metaclass=abc.ABCMeta):
 
 	@abc.abstractmethod
 	def BackSubstitution(self, Force):
-		""" Reduce right-hand-side load vector and back substitute """
+		"""
+		Reduce right-hand-side load vector and back substitute.
+		Force is a vector or a matrix with one load case per column.
+		"""
 		pass
\ No newline at end of file
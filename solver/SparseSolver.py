@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+/*****************************************************************************/
+/*  STAPpy : A python FEM code sharing the same input data file with STAP90  */
+/*     Computational Dynamics Laboratory                                     */
+/*     School of Aerospace Engineering, Tsinghua University                  */
+/*                                                                           */
+/*     Created on Mon Jun 22, 2020                                           */
+/*                                                                           */
+/*     @author: thurcni@163.com, xzhang@tsinghua.edu.cn                      */
+/*     http://www.comdyn.cn/                                                 */
+/*****************************************************************************/
+"""
+import sys
+sys.path.append('../')
+from solver.Solver import CSolver
+import numpy as np
+
+try:
+	import scipy.sparse.linalg
+except ImportError:
+	scipy = None
+
+# CHOLMOD (scikit-sparse) is used for the Cholesky factorization if installed
+try:
+	from sksparse.cholmod import cholesky, CholmodError
+except ImportError:
+	cholesky = None
+
+
+class CSparseSolver(CSolver):
+	"""
+	Sparse direct solver: An in core solver using compressed sparse column
+	storage. The stiffness matrix is factorized by the sparse Cholesky
+	factorization of CHOLMOD if scikit-sparse is installed, and by the
+	sparse LU factorization of SuperLU otherwise. Both reorder the
+	equations internally to reduce the fill-in.
+	"""
+	def __init__(self, K):
+		self.K = K			# Global Stiffness matrix in CSC storage
+
+		# Factorization of K, set by LDLT
+		self.factor = None
+
+	def LDLT(self):
+		""" Sparse factorization of the stiffness matrix """
+		if scipy is None:
+			raise ImportError("CSparseSolver requires SciPy")
+
+		A = self.K.ToCSC()
+
+		if cholesky is not None:
+			try:
+				self.factor = cholesky(A)
+			except CholmodError:
+				self.NotPositiveDefinite()
+			return
+
+		# The stiffness matrix is symmetric positive definite, so the
+		# diagonal is taken as pivot with a symmetric ordering
+		try:
+			self.factor = scipy.sparse.linalg.splu(
+				A, permc_spec='MMD_AT_PLUS_A', diag_pivot_thresh=0.0,
+				options=dict(SymmetricMode=True))
+		except RuntimeError:
+			self.NotPositiveDefinite()
+
+		# A zero pivot does not stop SuperLU when pivoting is disabled
+		if not np.all(self.factor.U.diagonal() > 0):
+			self.NotPositiveDefinite()
+
+	def NotPositiveDefinite(self):
+		error_info = "\n*** Error *** Stiffness matrix is not positive definite !" \
+					 "\n    Sparse factorization failed"
+		raise ValueError(error_info)
+
+	def BackSubstitution(self, Force):
+		"""
+		Solve with the sparse factorization. Force is a vector or a matrix
+		with one load case per column, and is overwritten by the displacements
+		"""
+		Force[:] = self.factor(Force) if cholesky is not None \
+			else self.factor.solve(Force)
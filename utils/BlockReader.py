@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+/*****************************************************************************/
+/*  STAPpy : A python FEM code sharing the same input data file with STAP90  */
+/*     Computational Dynamics Laboratory                                     */
+/*     School of Aerospace Engineering, Tsinghua University                  */
+/*                                                                           */
+/*     Created on Mon Jun 22, 2020                                           */
+/*                                                                           */
+/*     @author: thurcni@163.com, xzhang@tsinghua.edu.cn                      */
+/*     http://www.comdyn.cn/                                                 */
+/*****************************************************************************/
+"""
+import numpy as np
+import itertools
+
+
+def ReadBlock(input_file, rows, columns, name="data"):
+	"""
+	Read a fixed-size block of the input data file in one shot
+
+	:param input_file: (_io.TextIOWrapper) the object of input file
+	:param rows: (int) number of lines in the block
+	:param columns: (int) number of fields in each line
+	:param name: (str) name of the block used in the error message
+	:return: (np.ndarray) (rows, columns) array of doubles
+	"""
+	error_info = "\n*** Error *** Invalid {} block !" \
+				 "\n   Expected {} lines of {} numbers".format(name, rows, columns)
+
+	if rows <= 0:
+		return np.zeros((0, columns), dtype=np.double)
+
+	# The lines are taken by readline called from C, which keeps tell()
+	# available unlike iterating over the file. loadtxt raises on a field
+	# that is not a number or on lines with different numbers of fields
+	lines = itertools.islice(iter(input_file.readline, ''), rows)
+	try:
+		block = np.loadtxt(lines, dtype=np.double, ndmin=2)
+	except ValueError:
+		raise ValueError(error_info)
+
+	if block.shape != (rows, columns):
+		raise ValueError(error_info)
+
+	return block
+
+
+def CheckOrder(numbers, error_info):
+	"""
+	Check that numbers are 1, 2, ..., len(numbers)
+
+	:param numbers: (np.ndarray) numbers read from the first column of a block
+	:param error_info: (str) message formatted with the expected and the
+		provided number of the first entry out of order
+	"""
+	expected = np.arange(1, len(numbers) + 1)
+	wrong = np.flatnonzero(numbers != expected)
+
+	if len(wrong):
+		raise ValueError(error_info.format(expected[wrong[0]], int(numbers[wrong[0]])))
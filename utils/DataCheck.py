@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+/*****************************************************************************/
+/*  STAPpy : A python FEM code sharing the same input data file with STAP90  */
+/*     Computational Dynamics Laboratory                                     */
+/*     School of Aerospace Engineering, Tsinghua University                  */
+/*                                                                           */
+/*     Created on Mon Jun 22, 2020                                           */
+/*                                                                           */
+/*     @author: thurcni@163.com, xzhang@tsinghua.edu.cn                      */
+/*     http://www.comdyn.cn/                                                 */
+/*****************************************************************************/
+"""
+import sys
+sys.path.append('../')
+from utils.SkylineMatrix import SkylineColumnHeights
+from utils.Reordering import ConnectedComponents
+from utils.ResourceEstimator import CResourceEstimate
+import numpy as np
+
+# Direction names of the nodal degrees of freedom
+Directions = ['X', 'Y', 'Z']
+
+
+class CDataCheck(object):
+	"""
+	CDataCheck class validates the input data of the domain without
+	assembling the stiffness matrix (solution mode MODEX = 0), and predicts
+	the size of the skyline stiffness matrix and the memory of the solution.
+
+	Errors make the solution fail: references out of range, elements with
+	coincident nodes (e.g. zero-length bars), and rigid body modes left
+	free by the boundary conditions. Warnings flag suspicious data:
+	duplicate elements and loads on fixed degrees of freedom.
+	"""
+	def __init__(self, FEMData):
+		self.FEMData = FEMData
+
+		# Messages of the problems found
+		self.Errors = []
+		self.Warnings = []
+
+		# Predicted number of equations, number of matrix elements,
+		# maximum half bandwidth of the skyline and memory in bytes
+		self.NEQ = FEMData.GetNEQ()
+		self.NWK = None
+		self.MK = None
+		self.Memory = None
+
+	def GetErrors(self):
+		return self.Errors
+
+	def GetWarnings(self):
+		return self.Warnings
+
+	def Run(self):
+		"""
+		Run all checks, and predict the profile if the element references
+		are valid
+
+		:return: (bool) True if no error was found
+		"""
+		self.Errors = []
+		self.Warnings = []
+
+		if self.CheckReferences():
+			self.CheckElements()
+			self.CheckRigidBodyModes()
+			self.PredictProfile()
+		self.CheckLoads()
+
+		return not self.Errors
+
+	def CheckReferences(self):
+		""" Check the node and material references of all elements """
+		NUMNP = self.FEMData.GetNUMNP()
+		valid = True
+
+		for EleGrp, ElementGrp in enumerate(self.FEMData.GetEleGrpList()):
+			nodes = ElementGrp.GetConnectivity()
+			wrong = np.flatnonzero(((nodes < 0) | (nodes >= NUMNP)).any(axis=1))
+			if len(wrong):
+				self.Errors.append(
+					"Element group {}: {} elements refer to nodes out of range 1 to {},"
+					" e.g. element {}".format(EleGrp + 1, len(wrong), NUMNP, wrong[0] + 1))
+				valid = False
+
+			materials = ElementGrp.GetMaterialIndex()
+			wrong = np.flatnonzero((materials < 0) | (materials >= ElementGrp.GetNUMMAT()))
+			if len(wrong):
+				self.Errors.append(
+					"Element group {}: {} elements refer to material sets out of range 1 to {},"
+					" e.g. element {}".format(EleGrp + 1, len(wrong),
+											 ElementGrp.GetNUMMAT(), wrong[0] + 1))
+				valid = False
+
+		return valid
+
+	def CheckElements(self):
+		""" Check for elements with coincident nodes and duplicate elements """
+		for EleGrp, ElementGrp in enumerate(self.FEMData.GetEleGrpList()):
+			if not ElementGrp.GetNUME():
+				continue
+
+			# Coincident nodes, e.g. zero-length bars
+			XYZ = ElementGrp.GetElementCoordinates()
+			NEN = XYZ.shape[1]
+			coincident = np.zeros(len(XYZ), dtype=bool)
+			for a in range(NEN):
+				for b in range(a + 1, NEN):
+					coincident |= (XYZ[:, a] == XYZ[:, b]).all(axis=1)
+
+			wrong = np.flatnonzero(coincident)
+			if len(wrong):
+				self.Errors.append(
+					"Element group {}: {} elements have coincident nodes (zero length),"
+					" e.g. element {}".format(EleGrp + 1, len(wrong), wrong[0] + 1))
+
+			# Elements on the same set of nodes
+			nodes = np.sort(ElementGrp.GetConnectivity(), axis=1)
+			_, first, counts = np.unique(nodes, axis=0, return_index=True, return_counts=True)
+			duplicated = first[counts > 1]
+			if len(duplicated):
+				self.Warnings.append(
+					"Element group {}: {} elements are duplicated, e.g. element {}".format(
+						EleGrp + 1, int((counts[counts > 1] - 1).sum()), duplicated.min() + 1))
+
+	def CheckRigidBodyModes(self):
+		"""
+		Check that every connected part of the mesh is restrained in each
+		direction, and that no node with free DOFs is left without elements
+		"""
+		NUMNP = self.FEMData.GetNUMNP()
+		bcode = self.FEMData.GetBCode()
+		Connectivity = [ElementGrp.GetConnectivity() for ElementGrp in self.FEMData.GetEleGrpList()]
+
+		connected = np.zeros(NUMNP, dtype=bool)
+		for nodes in Connectivity:
+			connected[nodes.ravel()] = True
+
+		wrong = np.flatnonzero(~connected & (bcode > 0).any(axis=1))
+		if len(wrong):
+			self.Errors.append(
+				"{} nodes with free degrees of freedom are not connected to any element,"
+				" e.g. node {}".format(len(wrong), wrong[0] + 1))
+
+		component = ConnectedComponents(NUMNP, Connectivity)
+		ncomponent = component.max(initial=-1) + 1
+		components = np.flatnonzero(np.bincount(component[connected], minlength=ncomponent))
+
+		for direction in range(3):
+			# Number of fixed DOFs of each connected part in the direction
+			fixed = np.bincount(component, weights=bcode[:, direction] == 0,
+								minlength=ncomponent)[components]
+			free = components[fixed == 0]
+			if len(free):
+				node = np.flatnonzero(component == free[0])[0]
+				self.Errors.append(
+					"{} parts of the structure are free to move in the {} direction"
+					" (rigid body mode), e.g. the part of node {}".format(
+						len(free), Directions[direction], node + 1))
+
+	def CheckLoads(self):
+		""" Check the loads for references out of range and loads on fixed DOFs """
+		NUMNP = self.FEMData.GetNUMNP()
+		bcode = self.FEMData.GetBCode()
+
+		for lcase, LoadData in enumerate(self.FEMData.GetLoadCases()):
+			valid = (LoadData.node >= 1) & (LoadData.node <= NUMNP) & \
+					(LoadData.dof >= 1) & (LoadData.dof <= 3)
+			wrong = np.flatnonzero(~valid)
+			if len(wrong):
+				self.Errors.append(
+					"Load case {}: {} loads refer to nodes or directions out of range,"
+					" e.g. load {}".format(lcase + 1, len(wrong), wrong[0] + 1))
+
+			dof = np.zeros(LoadData.nloads, dtype=np.int64)
+			dof[valid] = bcode[LoadData.node[valid] - 1, LoadData.dof[valid] - 1]
+			wrong = np.flatnonzero(valid & (dof == 0))
+			if len(wrong):
+				self.Warnings.append(
+					"Load case {}: {} loads are applied to fixed degrees of freedom and"
+					" ignored, e.g. node {} direction {}".format(
+						lcase + 1, len(wrong), LoadData.node[wrong[0]], LoadData.dof[wrong[0]]))
+
+	def PredictProfile(self):
+		"""
+		Predict NWK and MK of the skyline stiffness matrix from the location
+		matrices, and the peak memory of the in core skyline solution (see
+		CResourceEstimate)
+		"""
+		LocationMatrices = []
+		for ElementGrp in self.FEMData.GetEleGrpList():
+			ElementGrp.GenerateLocationMatrices()
+			LocationMatrices.append(ElementGrp.GetLocationMatrices())
+
+		Estimate = CResourceEstimate(SkylineColumnHeights(self.NEQ, LocationMatrices),
+									 self.FEMData.GetNLCASE(), LocationMatrices,
+									 self.FEMData.ModelSize())
+		self.NWK = Estimate.NWK
+		self.MK = Estimate.MK
+		self.Memory = Estimate.PeakMemory()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+/*****************************************************************************/
+/*  STAPpy : A python FEM code sharing the same input data file with STAP90  */
+/*     Computational Dynamics Laboratory                                     */
+/*     School of Aerospace Engineering, Tsinghua University                  */
+/*                                                                           */
+/*     Created on Mon Jun 22, 2020                                           */
+/*                                                                           */
+/*     @author: thurcni@163.com, xzhang@tsinghua.edu.cn                      */
+/*     http://www.comdyn.cn/                                                 */
+/*****************************************************************************/
+"""
+import sys
+sys.path.append('../')
+from utils.SkylineMatrix import PackedDOFs
+import numpy as np
+
+
+class CElementOperator(object):
+	"""
+	CElementOperator class is a matrix-free (element by element) stiffness
+	operator. The packed stiffness matrices of the elements are kept per
+	element group, and K*x is evaluated by gathering the element DOFs
+	through the location matrices, multiplying by the element stiffness
+	matrices and scatter-adding the results. The global stiffness matrix
+	is never assembled, so the storage grows with the number of elements.
+	"""
+	def __init__(self, N, EleGrpList, ChunkSize=65536):
+		super().__init__()
+
+		# Dimension of the stiffness matrix
+		self._NEQ = N
+
+		# Element groups of the domain
+		self._EleGrpList = EleGrpList
+
+		# Number of elements multiplied at once, which bounds the size of
+		# the temporary arrays of Multiply
+		self._ChunkSize = ChunkSize
+
+		# Maximum half bandwith
+		self._MK = 0
+
+		# Number of stored entries of the packed element stiffness matrices
+		self._NWK = 0
+
+		# (Matrices, LocationMatrices) of the assembled element groups
+		self._groups = []
+
+		# Diagonal of the stiffness matrix
+		self._diagonal = None
+
+	def CalculateProfile(self):
+		"""
+		Calculate the maximum half bandwidth and the storage of the
+		element stiffness matrices from the location matrices
+		"""
+		self._MK = 1
+		self._NWK = 0
+		for ElementGrp in self._EleGrpList:
+			LM = ElementGrp.GetLocationMatrices()
+			ND = LM.shape[1]
+			self._NWK += LM.shape[0]*ND*(ND + 1)//2
+
+			first = np.where(LM > 0, LM, self._NEQ + 1).min(axis=1)
+			self._MK = max(self._MK, int((LM.max(axis=1) - first).max(initial=0)) + 1)
+
+	def Allocate(self):
+		""" Allocate storage for the diagonal """
+		self._groups = []
+		self._diagonal = np.zeros(self._NEQ, dtype=np.double)
+
+	def GetMaximumHalfBandwidth(self):
+		""" Return the maximum half bandwidth """
+		return self._MK
+
+	def dim(self):
+		""" Return the dimension of the stiffness matrix """
+		return self._NEQ
+
+	def size(self):
+		""" Return the number of stored entries of the element matrices """
+		return self._NWK
+
+	def Diagonal(self):
+		""" Return the diagonal of the stiffness matrix """
+		return self._diagonal
+
+	def ScatterIndex(self, LocationMatrices):
+		"""
+		The entries of the element stiffness matrices are scattered
+		through the location matrices themselves
+		"""
+		return LocationMatrices
+
+	def AssembleGroup(self, Matrices, ScatterIndex):
+		"""
+		Add the packed element stiffness matrices of a whole element group
+		to the operator
+
+		:param Matrices: (np.ndarray) (NUME, ND*(ND+1)/2) packed element
+			stiffness matrices
+		:param ScatterIndex: (np.ndarray) (NUME, ND) location matrices
+			returned by ScatterIndex
+		"""
+		self._groups.append((Matrices, ScatterIndex))
+
+		# Column j of a packed matrix starts at j*(j+1)/2 with the diagonal
+		ND = ScatterIndex.shape[1]
+		diagonal = np.arange(ND)*(np.arange(ND) + 1)//2
+		self._diagonal += np.bincount(ScatterIndex.ravel(),
+									  weights=Matrices[:, diagonal].ravel(),
+									  minlength=self._NEQ + 1)[1:]
+
+	def Multiply(self, x):
+		"""
+		Return K*x, evaluated element by element
+
+		:param x: (np.ndarray) vector of length NEQ
+		"""
+		# Displacement 0 of the DOFs without equation number
+		x = np.concatenate(([0.0], x))
+		y = np.zeros(self._NEQ + 1, dtype=np.double)
+
+		for Matrices, LM in self._groups:
+			ND = LM.shape[1]
+
+			# Index of entry (i, j) of the full element matrix in packed storage
+			i, j = PackedDOFs(ND)
+			full = np.empty((ND, ND), dtype=np.int64)
+			full[i, j] = full[j, i] = np.arange(len(i))
+
+			for first in range(0, len(LM), self._ChunkSize):
+				LMc = LM[first:first + self._ChunkSize]
+				ye = np.einsum('eij,ej->ei',
+							   Matrices[first:first + self._ChunkSize][:, full], x[LMc])
+				y += np.bincount(LMc.ravel(), weights=ye.ravel(), minlength=self._NEQ + 1)
+
+		return y[1:]
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+/*****************************************************************************/
+/*  STAPpy : A python FEM code sharing the same input data file with STAP90  */
+/*     Computational Dynamics Laboratory                                     */
+/*     School of Aerospace Engineering, Tsinghua University                  */
+/*                                                                           */
+/*     Created on Mon Jun 22, 2020                                           */
+/*                                                                           */
+/*     @author: thurcni@163.com, xzhang@tsinghua.edu.cn                      */
+/*     http://www.comdyn.cn/                                                 */
+/*****************************************************************************/
+"""
+import sys
+sys.path.append('../')
+from utils.SkylineMatrix import CSkylineMatrix
+import numpy as np
+import hashlib
+import shutil
+import json
+import os
+
+# Version of the cache layout, entries of other versions are not used
+FACTOR_CACHE_VERSION = 1
+
+
+def StiffnessFingerprint(FEMData, Reordering='none'):
+	"""
+	Return the SHA-256 hash of everything the factorized stiffness matrix
+	depends on: the nodal coordinates, the equation numbers, the element
+	types, connectivity and materials, and the equation renumbering method
+
+	:param FEMData: (Domain) the domain, with the equation numbers
+		calculated but not yet renumbered
+	"""
+	sha = hashlib.sha256()
+	sha.update("{} {}\n".format(FACTOR_CACHE_VERSION, Reordering).encode())
+
+	sha.update(np.ascontiguousarray(FEMData.GetXYZ(), dtype=np.double).tobytes())
+	sha.update(np.ascontiguousarray(FEMData.GetBCode(), dtype=np.int64).tobytes())
+
+	for ElementGrp in FEMData.GetEleGrpList():
+		materials = [sorted((name, float(value)) for name, value
+							in vars(ElementGrp.GetMaterial(mset)).items())
+					 for mset in range(ElementGrp.GetNUMMAT())]
+		sha.update("{} {}\n".format(ElementGrp.GetElementType(), materials).encode())
+
+		sha.update(np.ascontiguousarray(ElementGrp.GetConnectivity(), dtype=np.int64).tobytes())
+		sha.update(np.ascontiguousarray(ElementGrp.GetMaterialIndex(), dtype=np.int64).tobytes())
+
+	return sha.hexdigest()
+
+
+class CFactorCache(object):
+	"""
+	On-disk cache of factorized skyline stiffness matrices
+
+	Each entry is a folder named by the stiffness fingerprint (see
+	StiffnessFingerprint) holding the factorized _data, _ColumnHeights
+	and _DiagonalAddress, the renumbered equation numbers and entry.json.
+	Entries are evicted least recently used first when the total size
+	of the cache exceeds MaxSize bytes.
+	"""
+	def __init__(self, folder, MaxSize=2**30):
+		# Folder of the cache entries
+		self._folder = folder
+
+		# Maximum total size of the cache in bytes
+		self._MaxSize = MaxSize
+
+	def _Path(self, key, name=None):
+		folder = os.path.join(self._folder, key)
+		return folder if name is None else os.path.join(folder, name)
+
+	def Load(self, key):
+		"""
+		Return the cached entry key, with the factors memory-mapped
+
+		:return: (CSkylineMatrix, bcode, info) or None if key is not cached,
+			info holds the reordering data of the entry
+		"""
+		try:
+			with open(self._Path(key, "entry.json")) as entry_file:
+				info = json.load(entry_file)
+		except (OSError, ValueError):
+			return None
+
+		if info.get("version") != FACTOR_CACHE_VERSION:
+			return None
+
+		# Mark the entry as recently used
+		os.utime(self._Path(key, "entry.json"))
+
+		K = CSkylineMatrix(info["NEQ"])
+		K.Restore(np.load(self._Path(key, "data.npy"), mmap_mode='r'),
+				  np.load(self._Path(key, "ColumnHeights.npy")),
+				  np.load(self._Path(key, "DiagonalAddress.npy")))
+
+		return K, np.load(self._Path(key, "bcode.npy")), info
+
+	def Save(self, key, K, bcode, ProfileBeforeReordering=None):
+		"""
+		Store the factorized skyline matrix K as entry key and evict the
+		least recently used entries beyond the size of the cache
+
+		:param bcode: (np.ndarray) (NUMNP, 3) equation numbers of K
+		:param ProfileBeforeReordering: (NWK, MK) in input order if the
+			equations have been renumbered
+		"""
+		size = K.GetData().nbytes + bcode.nbytes
+		if size > self._MaxSize:
+			return
+
+		# Write to a temporary folder first so that an entry is complete
+		temporary = self._Path(key + ".tmp")
+		os.makedirs(temporary, exist_ok=True)
+
+		np.save(os.path.join(temporary, "data.npy"), K.GetData())
+		np.save(os.path.join(temporary, "ColumnHeights.npy"), K.GetColumnHeights())
+		np.save(os.path.join(temporary, "DiagonalAddress.npy"), K.GetDiagonalAddress())
+		np.save(os.path.join(temporary, "bcode.npy"), bcode)
+
+		info = {"version": FACTOR_CACHE_VERSION,
+				"NEQ": int(K.dim()),
+				"ProfileBeforeReordering": None if ProfileBeforeReordering is None
+					else [int(value) for value in ProfileBeforeReordering]}
+		with open(os.path.join(temporary, "entry.json"), 'w') as entry_file:
+			json.dump(info, entry_file)
+
+		shutil.rmtree(self._Path(key), ignore_errors=True)
+		os.replace(temporary, self._Path(key))
+
+		self.Evict()
+
+	def Evict(self):
+		""" Remove least recently used entries until the cache fits MaxSize """
+		entries = []
+		for key in os.listdir(self._folder):
+			manifest = self._Path(key, "entry.json")
+			if not os.path.exists(manifest):
+				continue
+
+			size = sum(os.path.getsize(self._Path(key, name))
+					   for name in os.listdir(self._Path(key)))
+			entries.append((os.path.getmtime(manifest), size, key))
+
+		total = sum(size for _, size, _ in entries)
+		for _, size, key in sorted(entries):
+			if total <= self._MaxSize:
+				break
+
+			shutil.rmtree(self._Path(key), ignore_errors=True)
+			total -= size
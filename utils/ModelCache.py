@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+/*****************************************************************************/
+/*  STAPpy : A python FEM code sharing the same input data file with STAP90  */
+/*     Computational Dynamics Laboratory                                     */
+/*     School of Aerospace Engineering, Tsinghua University                  */
+/*                                                                           */
+/*     Created on Mon Jun 22, 2020                                           */
+/*                                                                           */
+/*     @author: thurcni@163.com, xzhang@tsinghua.edu.cn                      */
+/*     http://www.comdyn.cn/                                                 */
+/*****************************************************************************/
+"""
+import sys
+sys.path.append('../')
+from LoadCaseData import CLoadCaseData
+from element.ElementGroup import CElementGroup
+from element.Node import CNode
+import numpy as np
+import hashlib
+import json
+import os
+
+# Version of the cache layout, caches of other versions are rebuilt
+CACHE_VERSION = 1
+
+
+def FileHash(filename):
+	""" Return the SHA-256 hash of the content of a file """
+	sha = hashlib.sha256()
+	with open(filename, 'rb') as input_file:
+		for chunk in iter(lambda: input_file.read(1 << 20), b''):
+			sha.update(chunk)
+
+	return sha.hexdigest()
+
+
+class CModelCache(object):
+	"""
+	Binary model cache of a STAP90 input data file
+
+	The nodal coordinates and boundary codes, the loads and the element
+	connectivity are stored as .npy files in the folder <input>.cache,
+	together with model.json holding the control data, the material sets
+	and the content hash of the input file. A cache whose hash does not
+	match the input file is stale and rebuilt after the input is parsed.
+	"""
+	def __init__(self, input_filename):
+		# Folder of the cache files
+		self._folder = input_filename + ".cache"
+
+		# Content hash of the input data file
+		self._hash = FileHash(input_filename)
+
+	def GetFolder(self):
+		return self._folder
+
+	def _Path(self, name):
+		return os.path.join(self._folder, name)
+
+	def IsValid(self):
+		""" Return True if the cache exists and matches the input file """
+		try:
+			with open(self._Path("model.json")) as manifest_file:
+				manifest = json.load(manifest_file)
+		except (OSError, ValueError):
+			return False
+
+		return manifest.get("version") == CACHE_VERSION and \
+			manifest.get("hash") == self._hash
+
+	def Save(self, FEMData, bcode):
+		"""
+		Write the model of FEMData to the cache
+
+		:param FEMData: (Domain) the domain read from the input file
+		:param bcode: (np.ndarray) (NUMNP, 3) boundary codes as read from the
+			input file, i.e. before the equation numbers are calculated
+		"""
+		os.makedirs(self._folder, exist_ok=True)
+
+		# Remove the manifest first so that an interrupted update is stale
+		if os.path.exists(self._Path("model.json")):
+			os.remove(self._Path("model.json"))
+
+		np.save(self._Path("XYZ.npy"), FEMData.GetXYZ())
+		np.save(self._Path("bcode.npy"), bcode)
+
+		LoadCases = FEMData.GetLoadCases()
+		for name, dtype in (("node", np.int64), ("dof", np.int64), ("load", np.double)):
+			np.save(self._Path("load_{}.npy".format(name)),
+					np.concatenate([np.ascontiguousarray(getattr(LoadData, name), dtype=dtype)
+									for LoadData in LoadCases] or [np.zeros(0, dtype)]))
+
+		groups = []
+		for EleGrp, ElementGrp in enumerate(FEMData.GetEleGrpList()):
+			np.save(self._Path("group{}_connectivity.npy".format(EleGrp)),
+					ElementGrp.GetConnectivity())
+			np.save(self._Path("group{}_material.npy".format(EleGrp)),
+					ElementGrp.GetMaterialIndex())
+
+			materials = [{name: float(value) if isinstance(value, float) else int(value)
+						  for name, value in vars(ElementGrp.GetMaterial(mset)).items()}
+						 for mset in range(ElementGrp.GetNUMMAT())]
+			groups.append({"ElementType": ElementGrp.GetElementType(),
+						   "Materials": materials})
+
+		manifest = {"version": CACHE_VERSION,
+					"hash": self._hash,
+					"Title": FEMData.GetTitle(),
+					"NUMNP": FEMData.GetNUMNP(),
+					"NUMEG": FEMData.GetNUMEG(),
+					"NLCASE": FEMData.GetNLCASE(),
+					"MODEX": FEMData.GetMODEX(),
+					"NLOAD": [int(LoadData.nloads) for LoadData in LoadCases],
+					"groups": groups}
+
+		with open(self._Path("model.json.tmp"), 'w') as manifest_file:
+			json.dump(manifest, manifest_file)
+		os.replace(self._Path("model.json.tmp"), self._Path("model.json"))
+
+	def Load(self, FEMData):
+		"""
+		Define the domain FEMData from the cache, memory-mapping the arrays
+
+		:return: (bool) False if the cache is missing or stale
+		"""
+		if not self.IsValid():
+			return False
+
+		with open(self._Path("model.json")) as manifest_file:
+			manifest = json.load(manifest_file)
+
+		FEMData.Title = manifest["Title"]
+		FEMData.NUMNP = manifest["NUMNP"]
+		FEMData.NUMEG = manifest["NUMEG"]
+		FEMData.NLCASE = manifest["NLCASE"]
+		FEMData.MODEX = manifest["MODEX"]
+
+		# The boundary codes are overwritten by the equation numbers,
+		# so they are mapped copy-on-write
+		FEMData.XYZ = np.load(self._Path("XYZ.npy"), mmap_mode='r')
+		FEMData.bcode = np.load(self._Path("bcode.npy"), mmap_mode='c')
+		FEMData.NodeList = [CNode.View(XYZ, bcode, N + 1) for N, (XYZ, bcode)
+							in enumerate(zip(FEMData.XYZ, FEMData.bcode))]
+
+		loads = [np.load(self._Path("load_{}.npy".format(name)), mmap_mode='r')
+				 for name in ("node", "dof", "load")]
+		offsets = np.concatenate(([0], np.cumsum(manifest["NLOAD"], dtype=np.int64)))
+
+		FEMData.LoadCases = [CLoadCaseData() for _ in range(FEMData.NLCASE)]
+		for lcase, LoadData in enumerate(FEMData.LoadCases):
+			first, last = offsets[lcase], offsets[lcase + 1]
+			LoadData.nloads = int(last - first)
+			LoadData.node, LoadData.dof, LoadData.load = [
+				values[first:last] for values in loads]
+
+		FEMData.EleGrpList = [CElementGroup(FEMData.NodeList, FEMData.XYZ, FEMData.bcode)
+							  for _ in range(FEMData.NUMEG)]
+		for EleGrp, group in enumerate(manifest["groups"]):
+			FEMData.EleGrpList[EleGrp].Restore(
+				group["ElementType"], group["Materials"],
+				np.load(self._Path("group{}_connectivity.npy".format(EleGrp)), mmap_mode='r'),
+				np.load(self._Path("group{}_material.npy".format(EleGrp)), mmap_mode='r'))
+
+		return True
@@ -11,21 +11,17 @@
 /*     @author: thurcni@163.com, xzhang@tsinghua.edu.cn                      */
 /*     http://www.comdyn.cn/                                                 */
 /*****************************************************************************/
-"""
-
 
-class Singleton(object):
-	_Instance = {}
-
-	def __init__(self, cls):
-		self.cls = cls
+Names of the solution options, shared by the domain, the solvers and the
+outputter. This module must not import any other module of STAPpy
+"""
 
-	def __call__(self, *args, **kwargs):
-		instance = self._Instance.get(self.cls, None)
-		if not instance:
-			instance = self.cls(*args, **kwargs)
-			self._Instance[self.cls] = instance
-		return instance
+# dictionary: Define available storage schemes of the stiffness matrix
+StorageSchemes = {'skyline': 'SKYLINE',
+				  'sparse': 'COMPRESSED SPARSE COLUMN',
+				  'ebe': 'ELEMENT BY ELEMENT (MATRIX-FREE)',
+				  'outofcore': 'SKYLINE (OUT OF CORE)'}
 
-	def __getattr__(self, item):
-		return getattr(self.cls, item, None)
+# dictionary: Define available preconditioners of the PCG solver
+Preconditioners = {'jacobi': 'JACOBI',
+				   'ic0': 'INCOMPLETE CHOLESKY IC(0)'}
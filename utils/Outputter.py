@@ -14,8 +14,9 @@
 """
 import sys
 sys.path.append('../')
-from utils.Singleton import Singleton
 from element.ElementGroup import ElementTypes
+from utils.Reordering import ReorderingMethods
+from utils.Options import StorageSchemes, Preconditioners
 import datetime
 import numpy as np
 
@@ -25,19 +26,51 @@ month = ["January", "February", "March", "April", "May", "June",
 		 "July", "August", "September", "October", "November", "December"]
 
 
-@Singleton
+def FormatTable(fmt, *columns):
+	"""
+	Format a whole table in one shot
+
+	:param fmt: (str) format of one line of the table
+	:param columns: (np.ndarray) values of each field of the format
+	:return: (str) the formatted lines
+	"""
+	rows = len(columns[0])
+	values = np.empty((rows, len(columns)), dtype=object)
+	for i, column in enumerate(columns):
+		values[:, i] = np.asarray(column).tolist()
+
+	return (fmt*rows)%tuple(values.ravel())
+
+
 class COutputter(object):
-	""" Singleton: Outputer class is used to output results """
-	def __init__(self, filename=""):
+	""" Outputer class is used to output the results of the domain FEMData """
+	def __init__(self, FEMData, filename="", echo=True):
+		# Domain whose data and results are output
+		self.FEMData = FEMData
+
 		try:
 			self._output_file = open(filename, 'w')
 		except FileNotFoundError as e:
 			print(e)
 			sys.exit(3)
 
+		# Echo the output on the screen
+		# (Printing dominates the output time of large models)
+		self._echo = echo
+
 	def GetOutputFile(self):
 		return self._output_file
 
+	def Close(self):
+		""" Close the output file """
+		self._output_file.close()
+
+	def Write(self, info):
+		""" Write info to the output file and echo it on the screen """
+		if self._echo:
+			print(info, end="")
+		self._output_file.write(info)
+
 	def PrintTime(self):
 		""" Output current time and date """
 		t = datetime.datetime.now()
@@ -47,30 +80,23 @@ class COutputter(object):
 		time_info += (str(t.year) + ", ")
 		time_info += (weekday[t.weekday()] + ")\n\n")
 
-		print(time_info, end="")
-		self._output_file.write(time_info)
+		self.Write(time_info)
 
 	def OutputHeading(self):
 		""" Print program logo """
-		from Domain import Domain
-		FEMData = Domain()
+		FEMData = self.FEMData
 
 		title_info = "TITLE : " + FEMData.GetTitle() + "\n"
-		print(title_info, end="")
-		self._output_file.write(title_info)
+		self.Write(title_info)
 
 		self.PrintTime()
 
 	def OutputNodeInfo(self):
 		""" Print nodal data """
-		from Domain import Domain
-		FEMData = Domain()
-
-		NodeList = FEMData.GetNodeList()
+		FEMData = self.FEMData
 
 		pre_info = "C O N T R O L   I N F O R M A T I O N\n\n"
-		print(pre_info, end="")
-		self._output_file.write(pre_info)
+		self.Write(pre_info)
 
 		NUMNP = FEMData.GetNUMNP()
 		NUMEG = FEMData.GetNUMEG()
@@ -83,53 +109,47 @@ class COutputter(object):
 				   "\t  SOLUTION MODE  . . . . . . . . . . . . . . (MODEX)  =%6d\n" \
 				   "\t\t EQ.0, DATA CHECK\n" \
 				   "\t\t EQ.1, EXECUTION\n\n"%(NUMNP, NUMEG, NLCASE, MODEX)
-		print(pre_info, end="")
-		self._output_file.write(pre_info)
+		self.Write(pre_info)
 
 		pre_info = " N O D A L   P O I N T   D A T A\n\n" \
 				   "    NODE       BOUNDARY                         NODAL POINT\n" \
 				   "   NUMBER  CONDITION  CODES                     COORDINATES\n"
-		print(pre_info, end="")
-		self._output_file.write(pre_info)
+		self.Write(pre_info)
 
-		for n in range(NUMNP):
-			NodeList[n].Write(self._output_file)
+		XYZ = FEMData.GetXYZ()
+		bcode = FEMData.GetBCode()
+		self.Write(FormatTable("%9d%5d%5d%5d%18.6e%15.6e%15.6e\n",
+							   np.arange(1, NUMNP + 1), bcode[:, 0], bcode[:, 1],
+							   bcode[:, 2], XYZ[:, 0], XYZ[:, 1], XYZ[:, 2]))
 
-		print("\n", end="")
-		self._output_file.write("\n")
+		self.Write("\n")
 
 	def OutputEquationNumber(self):
 		""" Output equation numbers """
-		from Domain import Domain
-		FEMData = Domain()
-
-		NodeList = FEMData.GetNodeList()
+		FEMData = self.FEMData
 
 		NUMNP = FEMData.GetNUMNP()
 
 		pre_info = " EQUATION NUMBERS\n\n" \
 				   "   NODE NUMBER   DEGREES OF FREEDOM\n" \
 				   "        N           X    Y    Z\n"
-		print(pre_info, end="")
-		self._output_file.write(pre_info)
+		self.Write(pre_info)
 
-		for n in range(NUMNP):
-			NodeList[n].WriteEquationNo(self._output_file)
+		bcode = FEMData.GetBCode()
+		self.Write(FormatTable("%9d       %5d%5d%5d\n", np.arange(1, NUMNP + 1),
+							   bcode[:, 0], bcode[:, 1], bcode[:, 2]))
 
-		print("\n", end="")
-		self._output_file.write("\n")
+		self.Write("\n")
 
 	def OutputElementInfo(self):
 		""" Output element data """
 		# Print element group control line
-		from Domain import Domain
-		FEMData = Domain()
+		FEMData = self.FEMData
 
 		NUMEG = FEMData.GetNUMEG()
 
 		pre_info = " E L E M E N T   G R O U P   D A T A\n\n\n"
-		print(pre_info, end="")
-		self._output_file.write(pre_info)
+		self.Write(pre_info)
 
 		for EleGrp in range(NUMEG):
 			ElementType = FEMData.GetEleGrpList()[EleGrp].GetElementType()
@@ -142,8 +162,7 @@ class COutputter(object):
 					   "     EQ.3, NOT AVAILABLE\n\n" \
 					   " NUMBER OF ELEMENTS. . . . . . . . . . .( NPAR(2) ) . . =%5d\n\n" \
 					   %(ElementType, NUME)
-			print(pre_info, end="")
-			self._output_file.write(pre_info)
+			self.Write(pre_info)
 
 			element_type = ElementTypes.get(ElementType)
 			if element_type == 'Bar':
@@ -159,8 +178,7 @@ class COutputter(object):
 
 	def PrintBarElementData(self, EleGrp):
 		""" Output bar element data """
-		from Domain import Domain
-		FEMData = Domain()
+		FEMData = self.FEMData
 
 		ElementGroup = FEMData.GetEleGrpList()[EleGrp]
 		NUMMAT = ElementGroup.GetNUMMAT()
@@ -171,29 +189,31 @@ class COutputter(object):
 				   "  SET       YOUNG'S     CROSS-SECTIONAL\n" \
 				   " NUMBER     MODULUS          AREA\n" \
 				   "               E              A\n"%NUMMAT
-		print(pre_info, end="")
-		self._output_file.write(pre_info)
+		self.Write(pre_info)
 
-		for mset in range(NUMMAT):
-			ElementGroup.GetMaterial(mset).Write(self._output_file)
+		materials = [ElementGroup.GetMaterial(mset) for mset in range(NUMMAT)]
+		self.Write(FormatTable("%5d%16.6e%16.6e\n",
+							   [material.nset for material in materials],
+							   [material.E for material in materials],
+							   [material.Area for material in materials]))
 
 		pre_info = "\n\n E L E M E N T   I N F O R M A T I O N\n" \
 				   " ELEMENT     NODE     NODE       MATERIAL\n" \
 				   " NUMBER-N      I        J       SET NUMBER\n"
-		print(pre_info, end="")
-		self._output_file.write(pre_info)
+		self.Write(pre_info)
 
 		NUME = ElementGroup.GetNUME()
-		for Ele in range(NUME):
-			ElementGroup[Ele].Write(self._output_file, Ele)
+		nodes = ElementGroup.GetConnectivity() + 1
+		# Material set numbers, echoed as inputted (see utils.DataCheck)
+		self.Write(FormatTable("%5d%11d%9d%12d\n", np.arange(1, NUME + 1),
+							   nodes[:, 0], nodes[:, 1],
+							   ElementGroup.GetMaterialIndex() + 1))
 
-		print("\n", end="")
-		self._output_file.write("\n")
+		self.Write("\n")
 
 	def OutputLoadInfo(self):
 		""" Print load data """
-		from Domain import Domain
-		FEMData = Domain()
+		FEMData = self.FEMData
 
 		for lcase in range(FEMData.GetNLCASE()):
 			LoadData = FEMData.GetLoadCases()[lcase]
@@ -204,48 +224,43 @@ class COutputter(object):
 					   "    NODE       DIRECTION      LOAD\n" \
 					   "   NUMBER                   MAGNITUDE\n"%(lcase + 1,
 																  LoadData.nloads)
-			print(pre_info, end="")
-			self._output_file.write(pre_info)
+			self.Write(pre_info)
 
-			LoadData.Write(self._output_file, lcase+1)
+			self.Write(FormatTable("%7d%13d%19.6e\n", LoadData.node,
+								   LoadData.dof, LoadData.load))
 
-			print("\n", end="")
-			self._output_file.write("\n")
+			self.Write("\n")
 
 	def OutputNodalDisplacement(self, lcase):
 		""" Print nodal displacement """
-		from Domain import Domain
-		FEMData = Domain()
-		NodeList = FEMData.GetNodeList()
-		displacement = FEMData.GetDisplacement()
+		FEMData = self.FEMData
+		displacement = FEMData.GetDisplacement(lcase)
 
 		pre_info = " LOAD CASE%5d\n\n\n" \
 				   " D I S P L A C E M E N T S\n\n" \
 				   "  NODE           X-DISPLACEMENT    Y-DISPLACEMENT    Z-DISPLACEMENT\n" \
 				   %(lcase+1)
-		print(pre_info, end="")
-		self._output_file.write(pre_info)
-
-		for n in range(FEMData.GetNUMNP()):
-			NodeList[n].WriteNodalDisplacement(self._output_file, displacement)
+		self.Write(pre_info)
 
-		print("\n", end="")
-		self._output_file.write("\n")
+		# Displacements of all DOFs, zero for DOFs without equation number
+		bcode = FEMData.GetBCode()
+		U = np.concatenate(([0.0], displacement))[bcode]
+		self.Write(FormatTable("%5d        %18.6e%18.6e%18.6e\n",
+							   np.arange(1, FEMData.GetNUMNP() + 1),
+							   U[:, 0], U[:, 1], U[:, 2]))
 
-	def OutputElementStress(self):
-		""" Calculate stresses """
-		from Domain import Domain
-		FEMData = Domain()
+		self.Write("\n")
 
-		displacement = FEMData.GetDisplacement()
+	def OutputElementStress(self, lcase):
+		""" Output stresses of load case lcase+1 """
+		FEMData = self.FEMData
 
 		NUMEG = FEMData.GetNUMEG()
 
 		for ELeGrpIndex in range(NUMEG):
 			pre_info = " S T R E S S  C A L C U L A T I O N S  F O R  E L E M E N T  G R O U P%5d\n\n" \
 					   %(ELeGrpIndex+1)
-			print(pre_info, end="")
-			self._output_file.write(pre_info)
+			self.Write(pre_info)
 
 			EleGrp = FEMData.GetEleGrpList()[ELeGrpIndex]
 			NUME = EleGrp.GetNUME()
@@ -255,19 +270,56 @@ class COutputter(object):
 			if element_type == 'Bar':
 				pre_info = "  ELEMENT             FORCE            STRESS\n" \
 						   "  NUMBER\n"
-				print(pre_info, end="")
-				self._output_file.write(pre_info)
+				self.Write(pre_info)
 
-				stress = np.zeros(1)
+				stress = FEMData.GetElementStresses()[ELeGrpIndex][:, lcase]
+				force = stress*EleGrp.GetMaterialProperty('Area')
 
-				for Ele in range(NUME):
-					Element = EleGrp[Ele]
-					Element.ElementStress(stress, displacement)
+				self.Write(FormatTable("%5d%22.6e%18.6e\n", np.arange(1, NUME + 1),
+									   force, stress))
+			elif element_type == 'Q4':
+				# implementation for other element types by yourself
+				# ...
+				pass  # comment or delete this line after implementation
+			else:
+				error_info = "\n*** Error *** Elment type {} has not been " \
+							 "implemented.\n\n".format(ElementType)
+				raise ValueError(error_info)
+
+	def OutputLoadCombinations(self, Combinations):
+		""" Print the load combinations and the stress envelope of each element group """
+		FEMData = self.FEMData
+
+		Coefficients = Combinations.GetCoefficients()
+		NCOMB, NLCASE = Coefficients.shape
+
+		pre_info = " L O A D   C O M B I N A T I O N S\n\n" \
+				   "     NUMBER OF LOAD COMBINATIONS  . =%6d\n\n" \
+				   "  COMBINATION   COEFFICIENTS OF LOAD CASES 1 TO %d\n"%(NCOMB, NLCASE)
+		self.Write(pre_info)
+
+		self.Write(FormatTable("%13d" + "%14.6e"*NLCASE + "\n", np.arange(1, NCOMB + 1),
+							   *Coefficients.T))
+		self.Write("\n")
+
+		for ELeGrpIndex, EleGrp in enumerate(FEMData.GetEleGrpList()):
+			pre_info = " S T R E S S   E N V E L O P E   F O R   E L E M E N T   G R O U P%5d\n\n" \
+					   %(ELeGrpIndex+1)
+			self.Write(pre_info)
 
-					material = Element.GetElementMaterial()
-					stress_info = "%5d%22.6e%18.6e\n"%(Ele+1, stress[0]*material.Area, stress[0])
-					print(stress_info, end="")
-					self._output_file.write(stress_info)
+			ElementType = EleGrp.GetElementType()
+			element_type = ElementTypes.get(ElementType)
+			if element_type == 'Bar':
+				pre_info = "  ELEMENT    MAXIMUM STRESS  COMBINATION    MINIMUM STRESS  COMBINATION\n" \
+						   "  NUMBER\n"
+				self.Write(pre_info)
+
+				Max, MaxCombination, Min, MinCombination = Combinations.Envelope(
+					FEMData.GetElementStresses()[ELeGrpIndex])
+
+				self.Write(FormatTable("%5d%22.6e%13d%18.6e%13d\n",
+									   np.arange(1, EleGrp.GetNUME() + 1),
+									   Max, MaxCombination, Min, MinCombination))
 			elif element_type == 'Q4':
 				# implementation for other element types by yourself
 				# ...
@@ -277,24 +329,127 @@ class COutputter(object):
 							 "implemented.\n\n".format(ElementType)
 				raise ValueError(error_info)
 
+			self.Write("\n")
+
+	def OutputLoadSweep(self, Sweep, filename):
+		""" Print the size of the load sweep and its results file """
+		pre_info = " L O A D   S W E E P\n\n" \
+				   "     NUMBER OF LOAD CASES . . . . . =%8d\n" \
+				   "     NUMBER OF RESULTS PER CASE . . =%8d\n" \
+				   "     RESULTS FILE . . . . . . . . . = %s\n\n"%(
+			Sweep.GetNLCASE(), len(Sweep.DOFs) + len(Sweep.Elements), filename)
+		self.Write(pre_info)
+
+	def OutputDataCheck(self, Check):
+		""" Print the problems found by the data check and the predicted system size """
+		pre_info = " D A T A   C H E C K\n\n" \
+				   "     NUMBER OF EQUATIONS . . . . . . . . . . . . . .(NEQ) = {}\n".format(Check.NEQ)
+		if Check.NWK is not None:
+			pre_info += "     PREDICTED NUMBER OF MATRIX ELEMENTS . . . . . .(NWK) = {}\n" \
+						"     PREDICTED MAXIMUM HALF BANDWIDTH  . . . . . . .(MK ) = {}\n" \
+						"     ESTIMATED MEMORY OF THE SOLUTION (MB)  . . . . . . . = {:.3f}\n".format(
+				Check.NWK, Check.MK, Check.Memory/2**20)
+		pre_info += "     NUMBER OF ERRORS . . . . . . . . . . . . . . . . . . = {}\n" \
+					"     NUMBER OF WARNINGS . . . . . . . . . . . . . . . . . = {}\n\n".format(
+			len(Check.GetErrors()), len(Check.GetWarnings()))
+		self.Write(pre_info)
+
+		for error in Check.GetErrors():
+			self.Write(" *** Error *** {}\n".format(error))
+		for warning in Check.GetWarnings():
+			self.Write(" *** Warning *** {}\n".format(warning))
+		self.Write("\n")
+
 	def OutputTotalSystemData(self):
 		""" Print total system data """
-		from Domain import Domain
-		FEMData = Domain()
+		FEMData = self.FEMData
 
 		pre_info = "	TOTAL SYSTEM DATA\n\n" \
 				   "     NUMBER OF EQUATIONS . . . . . . . . . . . . . .(NEQ) = {}\n" \
 				   "     NUMBER OF MATRIX ELEMENTS . . . . . . . . . . .(NWK) = {}\n" \
 				   "     MAXIMUM HALF BANDWIDTH  . . . . . . . . . . . .(MK ) = {}\n" \
-				   "     MEAN HALF BANDWIDTH . . . . . . . . . . . . . .(MM ) = {}\n\n\n".format(
+				   "     MEAN HALF BANDWIDTH . . . . . . . . . . . . . .(MM ) = {}\n".format(
 			FEMData.GetNEQ(), FEMData.GetStiffnessMatrix().size(),
 			FEMData.GetStiffnessMatrix().GetMaximumHalfBandwidth(),
 			FEMData.GetStiffnessMatrix().size()/FEMData.GetNEQ()
 		)
-		print(pre_info, end="")
-		self._output_file.write(pre_info)
+
+		if FEMData.GetStorage() != 'skyline':
+			pre_info += "     STIFFNESS MATRIX STORAGE . . . . . . . . . . . . . . = {}\n".format(
+				StorageSchemes[FEMData.GetStorage()])
+		if FEMData.GetStorage() == 'outofcore':
+			pre_info += "     NUMBER OF COLUMN BLOCKS  . . . . . . . . . . . . . . = {}\n" \
+						"     MAXIMUM SIZE OF A COLUMN BLOCK . . . . . . . . . . . = {}\n".format(
+				len(FEMData.GetStiffnessMatrix().ColumnBlocks()),
+				FEMData.GetStiffnessMatrix().GetBlockSize())
+
+		# Predicted cost of the skyline solution
+		Estimate = FEMData.GetEstimate()
+		if Estimate is not None:
+			Memory = Estimate.Memory(FEMData.GetStorage(),
+									 FEMData.GetStiffnessMatrix().GetBlockSize(),
+									 FEMData.GetMixedPrecision())
+			pre_info += "     ESTIMATED FACTORIZATION OPERATIONS . . . . . . . . . = {:.3e}\n" \
+						"     ESTIMATED OPERATIONS PER LOAD CASE SOLUTION  . . . . = {:.3e}\n" \
+						"     ESTIMATED PEAK MEMORY OF ASSEMBLY (MB) . . . . . . . = {:.3f}\n" \
+						"     ESTIMATED PEAK MEMORY OF FACTORIZATION (MB)  . . . . = {:.3f}\n" \
+						"     ESTIMATED PEAK MEMORY OF SOLUTION (MB) . . . . . . . = {:.3f}\n" \
+						"     ESTIMATED PEAK MEMORY OF STRESSES (MB) . . . . . . . = {:.3f}\n".format(
+				Estimate.FactorizationFlops, Estimate.BackSubstitutionFlops,
+				Memory['assembly']/2**20, Memory['factorization']/2**20,
+				Memory['solution']/2**20, Memory['stress']/2**20)
+
+		# Profile in input node order if the equations have been renumbered
+		if FEMData.GetReordering() != 'none':
+			NWK, MK = FEMData.GetProfileBeforeReordering()
+			pre_info += "     EQUATION RENUMBERING . . . . . . . . . . . . . . . . = {}\n" \
+						"     NUMBER OF MATRIX ELEMENTS IN INPUT ORDER  . . .(NWK) = {}\n" \
+						"     MAXIMUM HALF BANDWIDTH IN INPUT ORDER . . . . .(MK ) = {}\n".format(
+				ReorderingMethods[FEMData.GetReordering()], NWK, MK)
+
+		pre_info += "\n\n"
+		self.Write(pre_info)
+
+	def OutputPCGSolution(self, Solver):
+		""" Print iteration counts and residual history of the PCG solver """
+		pre_info = " I T E R A T I V E   S O L U T I O N\n\n" \
+				   "     PRECONDITIONER . . . . . . . . . . . . . . . . . . . = {}\n" \
+				   "     CONVERGENCE TOLERANCE  . . . . . . . . . . . . . . . = {:e}\n" \
+				   "     MAXIMUM NUMBER OF ITERATIONS . . . . . . . . . . . . = {}\n".format(
+			Preconditioners[Solver.Preconditioner], Solver.Tolerance, Solver.MaxIterations)
+		if Solver.Shift > 0:
+			pre_info += "     DIAGONAL SHIFT OF IC(0) FACTORIZATION  . . . . . . . = {:e}\n".format(
+				Solver.Shift)
+		self.Write(pre_info + "\n")
+
+		for lcase, history in enumerate(Solver.GetResidualHistory()):
+			self.Write(" LOAD CASE%5d     NUMBER OF ITERATIONS = %d\n\n"
+					   "  ITERATION     RELATIVE RESIDUAL\n"
+					   %(lcase + 1, Solver.GetIterations()[lcase]))
+			self.Write(FormatTable("%10d        %13.6e\n",
+								   np.arange(len(history)), history))
+			self.Write("\n")
+
+		self.Write("\n")
+
+	def OutputRefinement(self, Solver):
+		""" Print the iterative refinement of the mixed precision solver """
+		pre_info = " M I X E D   P R E C I S I O N   S O L U T I O N\n\n" \
+				   "     FACTORIZATION PRECISION  . . . . . . . . . . . . . . = {}\n" \
+				   "     BACKWARD ERROR TOLERANCE . . . . . . . . . . . . . . = {:e}\n" \
+				   "     NUMBER OF REFINEMENT STEPS . . . . . . . . . . . . . = {}\n" \
+				   "     CONVERGED  . . . . . . . . . . . . . . . . . . . . . = {}\n\n" \
+				   " LOAD CASE     RELATIVE RESIDUAL     BACKWARD ERROR\n".format(
+			"DOUBLE (SINGLE PRECISION REFINEMENT STAGNATED)" if Solver.Fallback else "SINGLE",
+			Solver.Tolerance, Solver.Refinements, "YES" if Solver.Converged else "NO")
+		self.Write(pre_info)
+
+		Residuals = Solver.GetResiduals()
+		self.Write(FormatTable("%10d        %13.6e      %13.6e\n",
+							   np.arange(1, len(Residuals) + 1), Residuals,
+							   Solver.GetBackwardErrors()))
+		self.Write("\n\n")
 
 	def OutputSolutionTime(self, time_info):
 		""" Print CPU time used for solution """
-		print(time_info, end="")
-		self._output_file.write(time_info)
+		self.Write(time_info)
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+/*****************************************************************************/
+/*  STAPpy : A python FEM code sharing the same input data file with STAP90  */
+/*     Computational Dynamics Laboratory                                     */
+/*     School of Aerospace Engineering, Tsinghua University                  */
+/*                                                                           */
+/*     Created on Mon Jun 22, 2020                                           */
+/*                                                                           */
+/*     @author: thurcni@163.com, xzhang@tsinghua.edu.cn                      */
+/*     http://www.comdyn.cn/                                                 */
+/*****************************************************************************/
+"""
+import sys
+sys.path.append('../')
+from utils.SkylineMatrix import SkylineScatterIndex
+from multiprocessing import shared_memory
+import multiprocessing
+import numpy as np
+
+
+def ColorElements(LocationMatrices, seed=0):
+	"""
+	Color the elements of a group so that no two elements of the same
+	color share a global equation (Jones-Plassmann coloring: in each
+	round, the uncolored elements whose random priority is the largest
+	on all their equations receive the next color, and those whose
+	priority is the smallest on all their equations the color after)
+
+	:param LocationMatrices: (np.ndarray) (NUME, ND) location matrices
+	:return: (np.ndarray) (NUME,) color of each element, numbered from 0
+	"""
+	NUME, ND = LocationMatrices.shape
+
+	# (equation, element) pairs sorted by equation
+	elements = np.repeat(np.arange(NUME), ND)
+	equations = LocationMatrices.ravel()
+	active = equations > 0
+	order = np.argsort(equations[active], kind='stable')
+	elements = elements[active][order]
+	equations = equations[active][order]
+
+	priority = np.random.default_rng(seed).permutation(NUME)
+	color = np.full(NUME, -1, dtype=np.int64)
+
+	ncolor = 0
+	while True:
+		uncolored = color < 0
+		if not uncolored.any():
+			return color
+
+		live = uncolored[elements]
+		elements, equations = elements[live], equations[live]
+
+		# Largest and smallest priority among the uncolored elements
+		# of each equation
+		p = priority[elements]
+		starts = np.flatnonzero(np.r_[True, equations[1:] != equations[:-1]])
+		segment = np.cumsum(np.r_[True, equations[1:] != equations[:-1]]) - 1
+
+		for extremum in (np.maximum, np.minimum):
+			if len(p):
+				losers = elements[p != extremum.reduceat(p, starts)[segment]]
+			else:
+				losers = elements
+			winners = uncolored & (np.bincount(losers, minlength=NUME) == 0)
+
+			color[winners] = ncolor
+			uncolored &= ~winners
+			ncolor += 1
+
+
+def _Attach(blocks, name, shape, dtype):
+	"""
+	Return an array on the shared memory block name (in a worker), the
+	block being added to blocks to be closed after the task
+	"""
+	blocks.append(shared_memory.SharedMemory(name=name))
+
+	return np.ndarray(shape, dtype=dtype, buffer=blocks[-1].buf)
+
+
+def _ScatterElements(task):
+	""" Scatter-add the elements first:last of the color-sorted group """
+	blocks = []
+	try:
+		_Scatter(blocks, *task)
+	finally:
+		# Detach from the blocks, so that the blocks of a group released
+		# by the parent are freed
+		for block in blocks:
+			block.close()
+
+
+def _Scatter(blocks, ElementClass, data, DiagonalAddress, LocationMatrices,
+			 order, inputs, first, last):
+	data = _Attach(blocks, *data)
+	elements = _Attach(blocks, *order)[first:last]
+
+	# Stiffness matrices and scatter indices of the elements of the task
+	Matrices = ElementClass.BatchStiffness(
+		*[_Attach(blocks, *array)[elements] for array in inputs])
+	index = SkylineScatterIndex(_Attach(blocks, *DiagonalAddress),
+								_Attach(blocks, *LocationMatrices)[elements])
+
+	# Elements of one color share no equation, so no entry of data is
+	# updated twice and the workers never write to the same address
+	active = index >= 0
+	data[index[active]] += Matrices[active]
+
+
+class CParallelAssembler(object):
+	"""
+	CParallelAssembler class assembles the element stiffness matrices into
+	the data of a stiffness matrix in shared memory with a pool of worker
+	processes. The elements of a group are colored, and the elements of
+	each color are split among the workers, which calculate the stiffness
+	matrices of their elements with the batched kernel of the element type
+	(see CElement.BatchInputs) and scatter-add them straight into the
+	shared data, updating disjoint entries without locks. Only the inputs
+	of the kernel are copied to shared memory.
+	"""
+	def __init__(self, K, workers):
+		# Stiffness matrix, its data is moved to shared memory
+		self.K = K
+
+		# Number of worker processes
+		self.workers = workers
+
+		# Descriptors of the data and diagonal addresses of K in shared memory
+		self._SharedData = None
+		self._SharedDiagonalAddress = None
+
+		# Pool of worker processes and shared memory blocks created
+		self._pool = None
+		self._blocks = []
+
+	def __enter__(self):
+		data, self._SharedData = self.Share(self.K.GetData())
+		self.K.SetData(data, self._blocks[-1])
+		self._SharedDiagonalAddress = self.Share(self.K.GetDiagonalAddress())[1]
+		self._pool = multiprocessing.Pool(self.workers)
+		return self
+
+	def __exit__(self, *exc_info):
+		self._pool.close()
+		self._pool.join()
+
+		# The data stays mapped in this process after the names are removed
+		for block in self._blocks:
+			block.unlink()
+
+	def Share(self, array):
+		""" Copy array to a new shared memory block, return (array, descriptor) """
+		block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+		self._blocks.append(block)
+
+		shared = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+		shared[...] = array
+
+		return shared, (block.name, array.shape, array.dtype)
+
+	def Release(self, *descriptors):
+		""" Free the shared memory blocks of temporary arrays """
+		for name, _, _ in descriptors:
+			for block in self._blocks:
+				if block.name == name:
+					self._blocks.remove(block)
+					block.close()
+					block.unlink()
+					break
+
+	def AssembleGroup(self, ElementGrp):
+		"""
+		Assemble the element stiffness matrices of a whole element group
+		color by color. Element types without a batched kernel are
+		assembled by this process into the shared data.
+
+		:param ElementGrp: (CElementGroup) element group
+		"""
+		ElementClass = ElementGrp.GetElementClass()
+		LocationMatrices = ElementGrp.GetLocationMatrices()
+
+		inputs = ElementClass.BatchInputs(ElementGrp)
+		if inputs is None:
+			self.K.AssembleGroup(ElementGrp.ElementStiffness(),
+								 self.K.ScatterIndex(LocationMatrices))
+			return
+
+		color = ColorElements(LocationMatrices)
+		order = np.argsort(color, kind='stable')
+		bounds = np.searchsorted(color[order], np.arange(color.max(initial=-1) + 2))
+
+		# Only the descriptors of the temporary arrays are kept, so that
+		# their blocks can be closed
+		temporary = [self.Share(np.ascontiguousarray(array))[1]
+					 for array in (LocationMatrices, order) + tuple(inputs)]
+		del inputs
+
+		task = (ElementClass, self._SharedData, self._SharedDiagonalAddress,
+				temporary[0], temporary[1], temporary[2:])
+		for first, last in zip(bounds[:-1], bounds[1:]):
+			chunks = np.linspace(first, last, self.workers + 1).astype(np.int64)
+			self._pool.map(_ScatterElements,
+						   [task + (start, stop)
+							for start, stop in zip(chunks[:-1], chunks[1:]) if stop > start])
+
+		self.Release(*temporary)
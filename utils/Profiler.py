@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+/*****************************************************************************/
+/*  STAPpy : A python FEM code sharing the same input data file with STAP90  */
+/*     Computational Dynamics Laboratory                                     */
+/*     School of Aerospace Engineering, Tsinghua University                  */
+/*                                                                           */
+/*     Created on Mon Jun 22, 2020                                           */
+/*                                                                           */
+/*     @author: thurcni@163.com, xzhang@tsinghua.edu.cn                      */
+/*     http://www.comdyn.cn/                                                 */
+/*****************************************************************************/
+"""
+from contextlib import contextmanager
+import tracemalloc
+import json
+import time
+
+
+class CPhase(object):
+	"""
+	CPhase class records a named phase of the solution: its elapsed time,
+	number of calls, peak traced memory, counters and nested phases
+	"""
+	def __init__(self, name):
+		self.name = name
+
+		# Total elapsed time in seconds and number of times the phase ran
+		self.time = 0.0
+		self.calls = 0
+
+		# Peak traced memory in bytes while the phase ran, None if the
+		# memory is not traced
+		self.memory = None
+
+		# Counters of the phase, e.g. number of elements or operations
+		self.counters = {}
+
+		# Nested phases in the order they first ran
+		self.phases = {}
+
+		# Start time and peak traced memory of the running phase
+		self._t0 = None
+		self._peak = 0
+
+	def Child(self, name):
+		""" Return the nested phase name, created if it has not run yet """
+		if name not in self.phases:
+			self.phases[name] = CPhase(name)
+
+		return self.phases[name]
+
+	def Report(self):
+		""" Return the phase and its nested phases as a dictionary """
+		report = {"name": self.name, "time": self.time, "calls": self.calls}
+		if self.memory is not None:
+			report["memory"] = self.memory
+		if self.counters:
+			report["counters"] = dict(self.counters)
+		if self.phases:
+			report["phases"] = [phase.Report() for phase in self.phases.values()]
+
+		return report
+
+
+class CProfiler(object):
+	"""
+	CProfiler class times nested, named phases with time.perf_counter,
+	and with TraceMemory records the peak memory of each phase traced by
+	tracemalloc (which slows down the allocations while it traces).
+
+	The phases are opened with the context manager Phase, and a phase
+	running again under the same parent accumulates its time and counters:
+
+		with Profiler.Phase("assembly"):
+			with Profiler.Phase("element group 1"):
+				Profiler.Count("elements", NUME)
+	"""
+	def __init__(self, TraceMemory=False):
+		self.TraceMemory = TraceMemory
+
+		# Root phase of the whole run and stack of the running phases
+		self.Root = CPhase("total")
+		self._stack = [self.Root]
+
+	def Start(self):
+		""" Start the root phase, and the memory tracing """
+		if self.TraceMemory and not tracemalloc.is_tracing():
+			tracemalloc.start()
+
+		self._Enter(self.Root)
+
+	def Stop(self):
+		""" Stop all running phases, and the memory tracing """
+		while self._stack:
+			self._Exit(self._stack[-1])
+		self._stack = [self.Root]
+
+		if self.TraceMemory and tracemalloc.is_tracing():
+			tracemalloc.stop()
+
+	@contextmanager
+	def Phase(self, name):
+		""" Context manager timing the nested phase name of the running phase """
+		phase = self._stack[-1].Child(name)
+		self._Enter(phase)
+		try:
+			yield phase
+		finally:
+			self._Exit(phase)
+
+	def Count(self, name, value=1):
+		""" Add value to the counter name of the running phase """
+		counters = self._stack[-1].counters
+		counters[name] = counters.get(name, 0) + value
+
+	def Elapsed(self, *names):
+		"""
+		Return the elapsed time in seconds of the phase given by the names
+		of its path from the root, e.g. Elapsed("solution", "factorization"),
+		including the running time of the phase if it is running
+		"""
+		phase = self.Root
+		for name in names:
+			if name not in phase.phases:
+				return 0.0
+			phase = phase.phases[name]
+
+		if phase._t0 is None:
+			return phase.time
+
+		return phase.time + time.perf_counter() - phase._t0
+
+	def Report(self):
+		""" Return the profile of the run as a dictionary """
+		return self.Root.Report()
+
+	def WriteJSON(self, filename, **info):
+		"""
+		Write the profile in JSON format to filename
+
+		:param info: items added to the profile, e.g. the input file name
+		"""
+		profile = dict(info)
+		profile["profile"] = self.Report()
+
+		with open(filename, 'w') as profile_file:
+			json.dump(profile, profile_file, indent=1)
+
+	def _Enter(self, phase):
+		if self.TraceMemory and tracemalloc.is_tracing():
+			# Close the peak of the running phases so far, and start the
+			# peak of the new phase from the current traced memory
+			self._UpdatePeaks()
+			phase._peak = tracemalloc.get_traced_memory()[0]
+
+		if phase is not self.Root:
+			self._stack.append(phase)
+		phase.calls += 1
+		phase._t0 = time.perf_counter()
+
+	def _Exit(self, phase):
+		phase.time += time.perf_counter() - phase._t0
+		phase._t0 = None
+
+		if self.TraceMemory and tracemalloc.is_tracing():
+			self._UpdatePeaks()
+			phase.memory = max(phase.memory or 0, phase._peak)
+
+		self._stack.pop()
+
+	def _UpdatePeaks(self):
+		""" Propagate the traced peak since the last update to the running phases """
+		peak = tracemalloc.get_traced_memory()[1]
+		for phase in self._stack:
+			phase._peak = max(phase._peak, peak)
+
+		tracemalloc.reset_peak()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+/*****************************************************************************/
+/*  STAPpy : A python FEM code sharing the same input data file with STAP90  */
+/*     Computational Dynamics Laboratory                                     */
+/*     School of Aerospace Engineering, Tsinghua University                  */
+/*                                                                           */
+/*     Created on Mon Jun 22, 2020                                           */
+/*                                                                           */
+/*     @author: thurcni@163.com, xzhang@tsinghua.edu.cn                      */
+/*     http://www.comdyn.cn/                                                 */
+/*****************************************************************************/
+"""
+from collections import deque
+import numpy as np
+
+# dictionary: Define available nodal reordering methods
+ReorderingMethods = {'none': 'INPUT ORDER',
+					 'rcm': 'REVERSE CUTHILL-MCKEE'}
+
+
+def NodalGraph(NUMNP, Connectivity):
+	"""
+	Build the nodal graph of the mesh in compressed sparse row format
+
+	:param NUMNP: (int) number of nodes
+	:param Connectivity: (list(np.ndarray)) one (NUME, NEN) array of node
+		indices (numbering starting from 0) for each element group
+	:return: (pointers, adjacency) neighbours of node n are
+		adjacency[pointers[n]:pointers[n+1]]
+	"""
+	edges = [np.empty((0, 2), dtype=np.int64)]
+	for nodes in Connectivity:
+		NEN = nodes.shape[1]
+		for a in range(NEN):
+			for b in range(NEN):
+				if a != b:
+					edges.append(nodes[:, [a, b]])
+
+	edges = np.unique(np.concatenate(edges), axis=0)
+	edges = edges[edges[:, 0] != edges[:, 1]]
+
+	pointers = np.zeros(NUMNP + 1, dtype=np.int64)
+	np.cumsum(np.bincount(edges[:, 0], minlength=NUMNP), out=pointers[1:])
+
+	return pointers, edges[:, 1]
+
+
+def ConnectedComponents(NUMNP, Connectivity):
+	"""
+	Label the connected components of the mesh: the nodes of each element
+	are joined to its first node, and the trees of the joined nodes are
+	hooked onto the smaller root and compressed until no edge joins two
+	trees
+
+	:param NUMNP: (int) number of nodes
+	:param Connectivity: (list(np.ndarray)) one (NUME, NEN) array of node
+		indices (numbering starting from 0) for each element group
+	:return: (np.ndarray) component of each node, numbered from 0
+	"""
+	edges = [np.empty((0, 2), dtype=np.int64)]
+	for nodes in Connectivity:
+		for a in range(1, nodes.shape[1]):
+			edges.append(nodes[:, [0, a]])
+	edges = np.concatenate(edges)
+
+	parent = np.arange(NUMNP)
+	while True:
+		# Roots of the two nodes of each edge
+		first, second = parent[edges[:, 0]], parent[edges[:, 1]]
+		joined = first != second
+		if not joined.any():
+			break
+
+		edges = edges[joined]
+		np.minimum.at(parent, np.maximum(first, second)[joined],
+					  np.minimum(first, second)[joined])
+
+		# Point every node to its root
+		while True:
+			grandparent = parent[parent]
+			if (grandparent == parent).all():
+				break
+			parent = grandparent
+
+	return np.unique(parent, return_inverse=True)[1]
+
+
+def _LevelStructure(root, pointers, adjacency, visited):
+	""" Breadth first search from root, return the list of levels """
+	levels = [[root]]
+	mark = {root}
+	while True:
+		level = []
+		for node in levels[-1]:
+			for neighbour in adjacency[pointers[node]:pointers[node + 1]]:
+				if neighbour not in mark and not visited[neighbour]:
+					mark.add(neighbour)
+					level.append(neighbour)
+		if not level:
+			return levels
+		levels.append(level)
+
+
+def _PseudoPeripheralNode(root, pointers, adjacency, visited, degree):
+	"""
+	Find a pseudo-peripheral node of the component containing root
+	(George and Liu algorithm)
+	"""
+	levels = _LevelStructure(root, pointers, adjacency, visited)
+	while True:
+		last = levels[-1]
+		candidate = last[int(np.argmin(degree[last]))]
+		candidate_levels = _LevelStructure(candidate, pointers, adjacency, visited)
+		if len(candidate_levels) <= len(levels):
+			return root
+		root, levels = candidate, candidate_levels
+
+
+def ReverseCuthillMcKee(pointers, adjacency):
+	"""
+	Reverse Cuthill-McKee ordering of a graph in compressed sparse row
+	format. Every connected component is started from a pseudo-peripheral
+	node, and neighbours are visited in order of increasing degree.
+
+	:return: (np.ndarray) order, order[k] is the node placed at position k
+	"""
+	NUMNP = len(pointers) - 1
+	degree = np.diff(pointers)
+	visited = np.zeros(NUMNP, dtype=bool)
+	order = []
+
+	for start in np.argsort(degree, kind='stable'):
+		if visited[start]:
+			continue
+
+		root = _PseudoPeripheralNode(start, pointers, adjacency, visited, degree)
+
+		visited[root] = True
+		queue = deque([root])
+		while queue:
+			node = queue.popleft()
+			order.append(node)
+
+			neighbours = adjacency[pointers[node]:pointers[node + 1]]
+			neighbours = neighbours[~visited[neighbours]]
+			neighbours = neighbours[np.argsort(degree[neighbours], kind='stable')]
+
+			visited[neighbours] = True
+			queue.extend(neighbours.tolist())
+
+	return np.array(order[::-1], dtype=np.int64)
+
+
+def RenumberEquations(bcode, order):
+	"""
+	Renumber the equations so that the DOFs of the nodes are numbered
+	in the given nodal order
+
+	:param bcode: (np.ndarray) (NUMNP, NDF) equation numbers (0 : fixed)
+	:param order: (np.ndarray) order[k] is the node numbered at position k
+	:return: (np.ndarray) map from old to new equation numbers, with
+		map[0] = 0 so that it can be applied directly to bcode
+	"""
+	equations = bcode[order].ravel()
+	equations = equations[equations > 0]
+
+	equation_map = np.zeros(bcode.max() + 1, dtype=np.int64)
+	equation_map[equations] = np.arange(1, len(equations) + 1)
+
+	return equation_map
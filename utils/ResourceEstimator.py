@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+/*****************************************************************************/
+/*  STAPpy : A python FEM code sharing the same input data file with STAP90  */
+/*     Computational Dynamics Laboratory                                     */
+/*     School of Aerospace Engineering, Tsinghua University                  */
+/*                                                                           */
+/*     Created on Mon Jun 22, 2020                                           */
+/*                                                                           */
+/*     @author: thurcni@163.com, xzhang@tsinghua.edu.cn                      */
+/*     http://www.comdyn.cn/                                                 */
+/*****************************************************************************/
+"""
+import numpy as np
+
+# Bytes of a double entry and of an int64 index
+_DOUBLE = 8
+_INDEX = 8
+
+# Entries of the column blocks of CSkylineMatrix.Multiply for each load case
+_MULTIPLY_CHUNK = 2048
+
+
+class CResourceEstimate(object):
+	"""
+	CResourceEstimate class predicts the cost of the skyline solution from
+	the column heights alone, before the stiffness matrix is allocated:
+	the number of matrix elements, the floating point operations of the
+	LDLT factorization and of the back substitution, and the peak memory
+	of every phase of the in core, out of core or mixed precision skyline
+	solution.
+	"""
+	def __init__(self, ColumnHeights, NLCASE, LocationMatrices, ModelBytes=0):
+		"""
+		:param ColumnHeights: (np.ndarray) column heights of the skyline
+		:param NLCASE: (int) number of load cases
+		:param LocationMatrices: (list(np.ndarray)) one (NUME, ND) array
+			of location matrices for each element group
+		:param ModelBytes: (int) memory of the nodal and element data
+		"""
+		H = np.asarray(ColumnHeights, dtype=np.int64)
+
+		self.NEQ = len(H)
+		self.NWK = int(H.sum()) + self.NEQ
+		self.MK = int(H.max(initial=0)) + 1
+		self.NLCASE = NLCASE
+
+		# Column j is reduced with dot products of length at most 1, ...,
+		# Hj-1 (a multiplication and an addition per term), then divided
+		# by the pivots and the pivot updated: Hj^2 + 2Hj operations
+		self.FactorizationFlops = int((H*H + 2*H).sum())
+
+		# Forward reduction and back substitution with each off-diagonal
+		# entry, and a division by each pivot
+		self.BackSubstitutionFlops = 4*(self.NWK - self.NEQ) + self.NEQ
+
+		# Number of elements, entries of the packed element matrices of the
+		# largest group and number of elements of the largest group
+		self._NUME = sum(len(LM) for LM in LocationMatrices)
+		self._GroupEntries = max([len(LM)*LM.shape[1]*(LM.shape[1] + 1)//2
+								  for LM in LocationMatrices], default=0)
+		self._LargestGroup = max([len(LM) for LM in LocationMatrices], default=0)
+
+		self._ModelBytes = ModelBytes
+
+	def Memory(self, Storage='skyline', BlockSize=None, MixedPrecision=False):
+		"""
+		Return the predicted peak memory in bytes of each phase: 'assembly',
+		'factorization', 'solution' and 'stress'
+
+		:param Storage: (str) 'skyline' or 'outofcore', whose resident
+			matrix entries are two column blocks of BlockSize entries
+		:param MixedPrecision: (bool) in core skyline factorized by the
+			mixed precision solver (see solver.MixedPrecisionSolver)
+		"""
+		# Entries of the packed element matrices of the largest group
+		E = self._GroupEntries
+
+		if Storage == 'outofcore':
+			Matrix = 2*min(BlockSize, self.NWK)*_DOUBLE
+			# The pivots are kept in core
+			FactorBytes = self.NEQ*_DOUBLE
+			# The active entries are sorted by index and scattered block by
+			# block: about seven arrays of the size of the element matrices
+			# and a block of the skyline
+			ScatterBytes = 7*E*_DOUBLE + min(BlockSize, self.NWK)*_DOUBLE
+		else:
+			Matrix = self.NWK*_DOUBLE
+			FactorBytes = 0
+			# The element matrices, their scatter indices and the copies of
+			# their active entries, with a skyline of sums from the scatter
+			ScatterBytes = 4*E*_DOUBLE + self.NWK*_DOUBLE
+
+		# Element matrices with the temporaries of ScatterIndex: about
+		# seven arrays of the size of the element matrices
+		AssemblyBytes = max(7*E*_DOUBLE, ScatterBytes)
+
+		# Model, column heights, diagonal addresses and force matrix
+		Resident = self._ModelBytes + (2*self.NEQ + 1)*_INDEX + \
+				   self.NEQ*self.NLCASE*_DOUBLE + Matrix
+
+		# Element stresses of all load cases, with the displacements of all
+		# DOFs and the temporaries of the largest group while they are
+		# calculated
+		StressBytes = self._NUME*self.NLCASE*_DOUBLE + self.NEQ*self.NLCASE*_DOUBLE + \
+					  self._LargestGroup*(3*self.NLCASE + 10)*_DOUBLE
+
+		SolutionBytes = FactorBytes
+		if MixedPrecision:
+			# The factors are a single precision copy of the skyline, or a
+			# double precision copy if the solver falls back to the double
+			# precision factorization
+			FactorBytes = self.NWK*_DOUBLE
+
+			# Copies of the forces, displacements, residuals and the product
+			# K*u with its temporaries, and the column block of the product
+			# with about eight arrays of its entries and load cases
+			ChunkEntries = max(_MULTIPLY_CHUNK, 64*self.NLCASE)
+			SolutionBytes = FactorBytes + 6*self.NEQ*self.NLCASE*_DOUBLE + \
+							8*min(ChunkEntries, self.NWK*self.NLCASE)*_DOUBLE
+
+		return {'assembly': Resident + AssemblyBytes,
+				'factorization': Resident + FactorBytes,
+				'solution': Resident + SolutionBytes,
+				'stress': Resident + StressBytes}
+
+	def PeakMemory(self, Storage='skyline', BlockSize=None, MixedPrecision=False):
+		""" Return the predicted peak memory in bytes over all phases """
+		return max(self.Memory(Storage, BlockSize, MixedPrecision).values())
@@ -13,7 +13,66 @@
 /*****************************************************************************/
 """
 import numpy as np
-import sys
+import tempfile
+
+
+def PackedDOFs(ND):
+	"""
+	Return the element DOFs (i, j), i <= j, of each entry of a packed
+	element stiffness matrix, which stores the upper triangular matrix
+	column by column starting from the diagonal element
+	"""
+	j = np.repeat(np.arange(ND), np.arange(1, ND + 1))
+	i = j - np.arange(len(j)) + j*(j + 1)//2
+
+	return i, j
+
+
+def SkylineColumnHeights(N, LocationMatrices):
+	"""
+	Calculate the column heights of the skyline of the elements with the
+	given location matrices, without allocating the skyline matrix
+
+	:param N: (int) number of equations
+	:param LocationMatrices: (list(np.ndarray)) one (NUME, ND) array of
+		location matrices for each element group
+	:return: (np.ndarray) column height of each equation
+	"""
+	ColumnHeights = np.zeros(N, dtype=np.int64)
+
+	for LM in LocationMatrices:
+		active = LM > 0
+
+		# Row number of the first non-zero element of each element
+		first = np.where(active, LM, np.iinfo(np.int64).max).min(axis=1)
+
+		np.maximum.at(ColumnHeights, LM[active] - 1, (LM - first[:, np.newaxis])[active])
+
+	return ColumnHeights
+
+
+def SkylineScatterIndex(DiagonalAddress, LocationMatrices):
+	"""
+	Map every entry of the packed element stiffness matrices of the
+	elements with the given location matrices to its index in the data
+	of the skyline with the given diagonal addresses
+
+	:param LocationMatrices: (np.ndarray) (NUME, ND) location matrices
+	:return: (np.ndarray) (NUME, ND*(ND+1)/2) indices in the data of the
+		skyline, -1 for the entries of DOFs without equation number
+	"""
+	i, j = PackedDOFs(LocationMatrices.shape[1])
+
+	Li = LocationMatrices[:, i]
+	Lj = LocationMatrices[:, j]
+
+	upper = np.maximum(Li, Lj)
+	lower = np.minimum(Li, Lj)
+
+	index = DiagonalAddress[np.maximum(upper - 1, 0)] + (upper - lower) - 1
+	index[lower == 0] = -1
+
+	return index
 
 
 class CSkylineMatrix(object):
@@ -37,10 +96,17 @@ class CSkylineMatrix(object):
 		self._data = None
 
 		# Column hights
-		self._ColumnHeights = np.zeros(N, dtype=np.int)
+		self._ColumnHeights = np.zeros(N, dtype=np.int64)
 
 		# Diagonal address of all columns in data_
-		self._DiagonalAddress = np.zeros(N+1, dtype=np.int)
+		self._DiagonalAddress = np.zeros(N+1, dtype=np.int64)
+
+		# Object owning the memory of _data if it is not a NumPy array
+		self._DataOwner = None
+
+		# Maximum number of entries of a column block if _data is kept
+		# out of core in a memory-mapped scratch file, None if in core
+		self._BlockSize = None
 
 	def Index(self, i, j):
 		""" Return the index in self._data of (i, j) in K """
@@ -59,10 +125,158 @@ class CSkylineMatrix(object):
 		index = self.Index(i, j)
 		self._data[index] = value
 
-	def Allocate(self):
-		""" Allocate storage for the matrix """
+	def Allocate(self, BlockSize=None, ScratchFolder=None):
+		"""
+		Allocate storage for the matrix
+
+		:param BlockSize: (int) if given, _data is memory-mapped to a scratch
+			file and processed in column blocks of at most BlockSize entries
+		:param ScratchFolder: (str) folder of the scratch file, which is
+			deleted when it is closed (default: the temporary folder)
+		"""
+		self._NWK = self._DiagonalAddress[self._NEQ] - self._DiagonalAddress[0]
+		self._BlockSize = BlockSize
+
+		if BlockSize is None:
+			self._data = np.zeros(self._NWK, dtype=np.double)
+		else:
+			scratch = tempfile.TemporaryFile(dir=ScratchFolder)
+			self._data = np.memmap(scratch, dtype=np.double, mode='w+',
+								   shape=(max(self._NWK, 1),))[:self._NWK]
+
+	def Restore(self, data, ColumnHeights, DiagonalAddress):
+		""" Define the matrix from stored _data, _ColumnHeights and _DiagonalAddress """
+		self._data = data
+		self._ColumnHeights = ColumnHeights
+		self._DiagonalAddress = DiagonalAddress
+
 		self._NWK = self._DiagonalAddress[self._NEQ] - self._DiagonalAddress[0]
-		self._data = np.zeros(self._NWK, dtype=np.double)
+		self.CalculateMaximumHalfBandwidth()
+
+	def AsType(self, dtype):
+		""" Return a copy of the matrix with _data converted to dtype """
+		K = CSkylineMatrix(self._NEQ)
+		K.Restore(self._data.astype(dtype), self._ColumnHeights, self._DiagonalAddress)
+
+		return K
+
+	def Multiply(self, x, Absolute=False, ChunkSize=2048):
+		"""
+		Return K*x, evaluated from the skyline columns as U*x + U(T)*x - diag(K)*x
+		for all columns of x in one pass. The columns of K are multiplied by
+		blocks of about ChunkSize/NRHS entries (at least 64), which bounds
+		the temporary arrays whatever NWK
+
+		:param x: (np.ndarray) vector of length NEQ, or (NEQ, NRHS) matrix
+		:param Absolute: (bool) multiply by |K|, the entrywise absolute value
+		"""
+		X = x.reshape(self._NEQ, -1)
+		NRHS = X.shape[1]
+		Y = np.zeros(X.shape, dtype=np.double)
+
+		DiagonalAddress = self._DiagonalAddress
+		for first, last in self.EntryBlocks(max(ChunkSize//NRHS, 64)):
+			a = DiagonalAddress[first] - 1
+			b = DiagonalAddress[last] - 1
+			data = np.abs(self._data[a:b]) if Absolute else self._data[a:b]
+
+			# Column and row (numbering starting from 0) of each entry
+			columns = np.repeat(np.arange(first, last), self._ColumnHeights[first:last] + 1)
+			rows = columns - (np.arange(a, b) - (DiagonalAddress[columns] - 1))
+
+			# U(T)*x: sum over the entries of each column
+			Y[first:last] += np.add.reduceat(data[:, np.newaxis]*X[rows],
+											 DiagonalAddress[first:last] - 1 - a, axis=0)
+
+			# U*x: scatter to the rows, all columns of x in one bincount
+			low = rows.min()
+			index = (rows - low)[:, np.newaxis]*NRHS + np.arange(NRHS)
+			Y[low:last] += np.bincount(index.ravel(), weights=(data[:, np.newaxis]*X[columns]).ravel(),
+									   minlength=(last - low)*NRHS).reshape(-1, NRHS)
+
+		diagonal = self._data[DiagonalAddress[:self._NEQ] - 1]
+		Y -= (np.abs(diagonal) if Absolute else diagonal)[:, np.newaxis]*X
+
+		return Y.reshape(x.shape)
+
+	def EntryBlocks(self, MaxEntries):
+		"""
+		Split the columns into blocks of consecutive columns of about
+		MaxEntries entries (more if a column is longer)
+
+		:return: (list) (first, last) columns of each block, numbering
+			starting from 0, last excluded
+		"""
+		starts = np.unique(np.searchsorted(self._DiagonalAddress[:self._NEQ],
+										   np.arange(1, self._NWK + 1, MaxEntries),
+										   side='right') - 1)
+		bounds = np.append(starts, self._NEQ)
+
+		return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+	def IsOutOfCore(self):
+		""" Return True if _data is kept in a memory-mapped scratch file """
+		return self._BlockSize is not None
+
+	def GetBlockSize(self):
+		return self._BlockSize
+
+	def ColumnBlocks(self):
+		"""
+		Split the columns into blocks of consecutive columns storing at most
+		BlockSize entries (a longer column forms a block of its own)
+
+		:return: (list) (first, last) columns of each block (numbering
+			starting from 1)
+		"""
+		blocks = []
+		first = 1
+		for j in range(1, self._NEQ + 1):
+			if self._DiagonalAddress[j] - self._DiagonalAddress[first - 1] > self._BlockSize \
+					and j > first:
+				blocks.append((first, j - 1))
+				first = j
+
+		if self._NEQ:
+			blocks.append((first, self._NEQ))
+
+		return blocks
+
+	def ReadColumnBlock(self, first, last):
+		""" Return an in-core copy of columns first:last of _data """
+		return np.array(self._data[self._DiagonalAddress[first - 1] - 1:
+								   self._DiagonalAddress[last] - 1])
+
+	def WriteColumnBlock(self, first, last, block):
+		""" Write columns first:last of _data from an in-core block """
+		self._data[self._DiagonalAddress[first - 1] - 1:
+				   self._DiagonalAddress[last] - 1] = block
+
+		if isinstance(self._data, np.memmap):
+			self._data.flush()
+
+	def Column(self, j):
+		"""
+		Return a view of column j (numbering starting from 1) in self._data.
+		The column is stored from the diagonal element upward, i.e. the
+		kth entry of the view is K(j-k, j), k = 0:ColumnHeights[j-1]
+		"""
+		return self._data[self._DiagonalAddress[j - 1] - 1:
+						  self._DiagonalAddress[j] - 1]
+
+	def GetData(self):
+		""" Return pointer to the _data """
+		return self._data
+
+	def SetData(self, data, owner=None):
+		"""
+		Replace _data by an array of the same size, e.g. in shared memory
+
+		:param owner: object owning the memory of data (e.g. its shared
+			memory block), kept alive with the matrix
+		"""
+		self._data = data
+		self._DataOwner = owner
 
 	def GetColumnHeights(self):
 		""" Return pointer to the _ColumnHeights """
@@ -87,52 +301,62 @@ class CSkylineMatrix(object):
 		"""
 		return self._NWK
 
-	def CalculateColumnHeight(self, LocationMatrix, ND):
+	def CalculateColumnHeights(self, LocationMatrices):
 		"""
-		Calculate the column height, used with the skyline storage scheme
+		Calculate the column heights, used with the skyline storage scheme,
+		from the location matrices of all element groups at once (see
+		SkylineColumnHeights)
 		"""
-		# Look for the row number of the first non-zero element
-		nfisrtrow = sys.maxsize
-		for i in range(ND):
-			if LocationMatrix[i] and LocationMatrix[i] < nfisrtrow:
-				nfisrtrow = LocationMatrix[i]
-
-		# Calculate the column height contributed by this element
-		for i in range(ND):
-			column = LocationMatrix[i]
-			if not column:
-				continue
-
-			Height = column - nfisrtrow
-			if self._ColumnHeights[column - 1] < Height:
-				self._ColumnHeights[column - 1] = Height
+		self._ColumnHeights[:] = SkylineColumnHeights(self._NEQ, LocationMatrices)
 
 	def CalculateMaximumHalfBandwidth(self):
 		""" Maximum half bandwidth ( = max(ColumnHeights) + 1 ) """
 		self._MK = self._ColumnHeights.max() + 1
 
-	def Assembly(self, Matrix, LocationMatrix, ND):
+	def ScatterIndex(self, LocationMatrices):
 		"""
-		Assemble the banded global stiffness matrix (skyline storage scheme)
+		Map every entry of the packed element stiffness matrices of an
+		element group to its index in self._data
+
+		:param LocationMatrices: (np.ndarray) (NUME, ND) location matrices
+			of all elements in the group
+		:return: (np.ndarray) (NUME, ND*(ND+1)/2) indices in self._data,
+			-1 for the entries of DOFs without equation number
 		"""
-		# Assemble global stiffness matrix
-		for j in range(ND):
-			# Global equation number corresponding to jth DOF of the element
-			Lj = LocationMatrix[j]
-			if not Lj:
-				continue
+		return SkylineScatterIndex(self._DiagonalAddress, LocationMatrices)
 
-			# Address of diagonal element of column j
-			# in the one dimensional element stiffness matrix
-			DiagjElement = int((j + 1)*j/2 + 1)
+	def AssembleGroup(self, Matrices, ScatterIndex):
+		"""
+		Assemble the packed element stiffness matrices of a whole element
+		group in one scatter-add
+
+		:param Matrices: (np.ndarray) (NUME, ND*(ND+1)/2) packed element
+			stiffness matrices
+		:param ScatterIndex: (np.ndarray) indices returned by ScatterIndex
+		"""
+		active = ScatterIndex >= 0
 
-			for i in range(j + 1):
-				# Global equation number corresponding to ith DOF of the element
-				Li = LocationMatrix[i]
-				if not Li:
-					continue
+		if self._BlockSize is None:
+			self._data += np.bincount(ScatterIndex[active], weights=Matrices[active],
+									  minlength=self._NWK)
+			return
 
-				self._data[self.Index(Li, Lj)] += Matrix[DiagjElement + j - i - 1]
+		# Out of core, scatter-add the entries falling in each block of
+		# _data in turn, so that only one block is updated at a time
+		index = ScatterIndex[active]
+		order = np.argsort(index, kind='stable')
+		index = index[order]
+		values = Matrices[active][order]
+
+		for first in range(0, self._NWK, self._BlockSize):
+			last = min(first + self._BlockSize, self._NWK)
+			lo, hi = np.searchsorted(index, [first, last])
+			if hi > lo:
+				self._data[first:last] += np.bincount(index[lo:hi] - first,
+													  weights=values[lo:hi],
+													  minlength=last - first)
+
+		self._data.flush()
 
 	def CalculateDiagnoalAddress(self):
 		"""
@@ -143,6 +367,7 @@ class CSkylineMatrix(object):
 		:return: None
 		"""
 		self._DiagonalAddress[0] = 1
-		for col in range(1, self._NEQ+1):
-			self._DiagonalAddress[col] = self._DiagonalAddress[col - 1] \
-										 + self._ColumnHeights[col - 1] + 1
+		np.cumsum(self._ColumnHeights + 1, out=self._DiagonalAddress[1:])
+		self._DiagonalAddress[1:] += 1
+
+		self._NWK = self._DiagonalAddress[self._NEQ] - self._DiagonalAddress[0]
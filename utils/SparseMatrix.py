@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+/*****************************************************************************/
+/*  STAPpy : A python FEM code sharing the same input data file with STAP90  */
+/*     Computational Dynamics Laboratory                                     */
+/*     School of Aerospace Engineering, Tsinghua University                  */
+/*                                                                           */
+/*     Created on Mon Jun 22, 2020                                           */
+/*                                                                           */
+/*     @author: thurcni@163.com, xzhang@tsinghua.edu.cn                      */
+/*     http://www.comdyn.cn/                                                 */
+/*****************************************************************************/
+"""
+import sys
+sys.path.append('../')
+from utils.SkylineMatrix import PackedDOFs
+import numpy as np
+
+try:
+	import scipy.sparse
+except ImportError:
+	scipy = None
+
+
+class CSparseMatrix(object):
+	"""
+	CSparseMatrix class is used to store the upper triangular part of the
+	FEM stiffness matrix in compressed sparse column (CSC) format. Only
+	the entries coupled by an element are stored, so the storage does not
+	fill in below the skyline.
+	"""
+	def __init__(self, N):
+		super().__init__()
+
+		# Dimension of the stiffness matrix
+		self._NEQ = N
+
+		# Maximum half bandwith
+		self._MK = 0
+
+		# Number of stored (upper triangular) entries
+		self._NWK = 0
+
+		# Values of the stored entries, column by column
+		self._data = None
+
+		# Row numbers (numbering starting from 1) of the stored entries
+		self._RowIndex = np.zeros(0, dtype=np.int64)
+
+		# Entries of column j are _data[_ColumnPointer[j-1]:_ColumnPointer[j]]
+		self._ColumnPointer = np.zeros(N + 1, dtype=np.int64)
+
+		# Column numbers (numbering starting from 1) of the stored entries
+		self._ColumnIndex = np.zeros(0, dtype=np.int64)
+
+		# Sorted keys (see _Keys) of the stored entries
+		self._keys = np.zeros(0, dtype=np.int64)
+
+	def _Keys(self, rows, columns):
+		""" Sortable key of entries (rows, columns), numbering starting from 1 """
+		return columns*(self._NEQ + 1) + rows
+
+	def CalculatePattern(self, LocationMatrices):
+		"""
+		Calculate the sparsity pattern from the location matrices of all
+		element groups
+
+		:param LocationMatrices: (list(np.ndarray)) (NUME, ND) location
+			matrices of each element group
+		"""
+		keys = [self._Keys(np.arange(1, self._NEQ + 1), np.arange(1, self._NEQ + 1))]
+		for LM in LocationMatrices:
+			i, j = PackedDOFs(LM.shape[1])
+			rows = np.minimum(LM[:, i], LM[:, j]).ravel()
+			columns = np.maximum(LM[:, i], LM[:, j]).ravel()
+			active = rows > 0
+			keys.append(self._Keys(rows[active], columns[active]))
+
+		self._keys = np.unique(np.concatenate(keys))
+
+		self._ColumnIndex = self._keys//(self._NEQ + 1)
+		self._RowIndex = self._keys - self._ColumnIndex*(self._NEQ + 1)
+		np.cumsum(np.bincount(self._ColumnIndex - 1, minlength=self._NEQ),
+				  out=self._ColumnPointer[1:])
+
+		self._NWK = len(self._keys)
+		self._MK = int((self._ColumnIndex - self._RowIndex).max(initial=0)) + 1
+
+	def Allocate(self):
+		""" Allocate storage for the matrix """
+		self._data = np.zeros(self._NWK, dtype=np.double)
+
+	def GetData(self):
+		""" Return pointer to the _data """
+		return self._data
+
+	def GetRowIndex(self):
+		""" Return pointer to the _RowIndex """
+		return self._RowIndex
+
+	def GetColumnIndex(self):
+		""" Return pointer to the _ColumnIndex """
+		return self._ColumnIndex
+
+	def GetColumnPointer(self):
+		""" Return pointer to the _ColumnPointer """
+		return self._ColumnPointer
+
+	def Diagonal(self):
+		""" Return the diagonal of the matrix, the last entry of each column """
+		return self._data[self._ColumnPointer[1:] - 1]
+
+	def GetMaximumHalfBandwidth(self):
+		""" Return the maximum half bandwidth """
+		return self._MK
+
+	def dim(self):
+		""" Return the dimension of the stiffness matrix """
+		return self._NEQ
+
+	def size(self):
+		""" Return the number of stored entries """
+		return self._NWK
+
+	def ScatterIndex(self, LocationMatrices):
+		"""
+		Map every entry of the packed element stiffness matrices of an
+		element group to its index in self._data
+
+		:param LocationMatrices: (np.ndarray) (NUME, ND) location matrices
+			of all elements in the group
+		:return: (np.ndarray) (NUME, ND*(ND+1)/2) indices in self._data,
+			-1 for the entries of DOFs without equation number
+		"""
+		i, j = PackedDOFs(LocationMatrices.shape[1])
+
+		Li = LocationMatrices[:, i]
+		Lj = LocationMatrices[:, j]
+
+		lower = np.minimum(Li, Lj)
+		index = np.searchsorted(self._keys, self._Keys(lower, np.maximum(Li, Lj)))
+		index[lower == 0] = -1
+
+		return index
+
+	def AssembleGroup(self, Matrices, ScatterIndex):
+		"""
+		Assemble the packed element stiffness matrices of a whole element
+		group in one scatter-add
+
+		:param Matrices: (np.ndarray) (NUME, ND*(ND+1)/2) packed element
+			stiffness matrices
+		:param ScatterIndex: (np.ndarray) indices returned by ScatterIndex
+		"""
+		active = ScatterIndex >= 0
+		self._data += np.bincount(ScatterIndex[active], weights=Matrices[active],
+								  minlength=self._NWK)
+
+	def Multiply(self, x):
+		"""
+		Return K*x, evaluated from the upper triangular part as
+		U*x + U(T)*x - diag(K)*x
+
+		:param x: (np.ndarray) vector of length NEQ
+		"""
+		rows = self._RowIndex - 1
+		columns = self._ColumnIndex - 1
+
+		return np.bincount(rows, weights=self._data*x[columns], minlength=self._NEQ) \
+			+ np.bincount(columns, weights=self._data*x[rows], minlength=self._NEQ) \
+			- self.Diagonal()*x
+
+	def ToCSC(self):
+		""" Return the full symmetric matrix as a scipy.sparse.csc_matrix """
+		if scipy is None:
+			raise ImportError("CSparseMatrix.ToCSC requires SciPy")
+
+		upper = scipy.sparse.csc_matrix(
+			(self._data, self._RowIndex - 1, self._ColumnPointer),
+			shape=(self._NEQ, self._NEQ))
+
+		return (upper + scipy.sparse.triu(upper, k=1, format='csc').T).tocsc()